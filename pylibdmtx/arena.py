@@ -0,0 +1,103 @@
+"""Reusable storage for decoded payloads.
+
+`decode_batch(images, arena=arena)` copies the payload of each barcode from
+libdmtx's message into the arena and returns `memoryview`s of it, rather than
+creating a `bytes` per barcode. Views are valid until the arena is `reset`,
+after which its memory is reused.
+"""
+from ctypes import addressof, c_char, memmove
+
+__all__ = ['PayloadArena']
+
+
+class PayloadArena(object):
+    """Payloads held in a list of fixed-size chunks.
+
+    Args:
+        chunk_size (int): Bytes in each chunk. A payload larger than this has
+            a chunk of its own.
+    """
+    def __init__(self, chunk_size=1 << 20):
+        if chunk_size < 1:
+            raise ValueError('Invalid chunk_size [{0}]'.format(chunk_size))
+        self.chunk_size = chunk_size
+        # (bytearray, its address) of each chunk
+        self._chunks = []
+        # Index of the chunk being written and the offset in it
+        self._chunk = 0
+        self._offset = 0
+        # (chunk index, start, end) of each payload, in order
+        self._spans = []
+        self._nbytes = 0
+
+    def __len__(self):
+        """The number of bytes of payloads written since the last `reset`.
+        """
+        return self._nbytes
+
+    @property
+    def capacity(self):
+        """The number of bytes in all chunks.
+        """
+        return sum(len(chunk) for chunk, _ in self._chunks)
+
+    def _reserve(self, n):
+        """Makes the current chunk one with `n` bytes free.
+        """
+        while self._chunk < len(self._chunks):
+            if len(self._chunks[self._chunk][0]) - self._offset >= n:
+                return
+            self._chunk += 1
+            self._offset = 0
+
+        chunk = bytearray(max(n, self.chunk_size))
+        address = addressof((c_char * len(chunk)).from_buffer(chunk))
+        self._chunks.append((chunk, address))
+
+    def write(self, source, n):
+        """Copies `n` bytes from `source` into the arena.
+
+        Args:
+            source: A ctypes pointer or address.
+            n (int):
+
+        Returns:
+            memoryview: Of the copy.
+        """
+        self._reserve(n)
+        chunk, address = self._chunks[self._chunk]
+        start = self._offset
+        memmove(address + start, source, n)
+        self._offset += n
+        self._nbytes += n
+        self._spans.append((self._chunk, start, self._offset))
+        return memoryview(chunk)[start:self._offset]
+
+    def pop(self):
+        """Forgets the last payload written, so that its memory is reused.
+        """
+        index, start, end = self._spans.pop()
+        self._chunk, self._offset = index, start
+        self._nbytes -= end - start
+
+    def getvalue(self, start=0):
+        """Returns, as one `bytes`, the payloads written from the `start`th
+        onwards.
+        """
+        return b''.join(
+            memoryview(self._chunks[index][0])[begin:end]
+            for index, begin, end in self._spans[start:]
+        )
+
+    @property
+    def count(self):
+        """The number of payloads written since the last `reset`.
+        """
+        return len(self._spans)
+
+    def reset(self):
+        """Forgets all payloads, so that their memory is reused. Views
+        returned by `write` will see new payloads.
+        """
+        self._chunk = self._offset = self._nbytes = 0
+        self._spans = []
@@ -0,0 +1,2 @@
+"""Performance measurements of pylibdmtx. Run each module with `python -m`.
+"""
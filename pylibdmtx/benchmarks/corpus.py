@@ -0,0 +1,189 @@
+"""A deterministic synthetic corpus of Data Matrix images.
+
+Symbols are written with `encode` and then rotated, scaled, blurred, made
+noisy or arranged on canvases of several symbols. The same `seed` always
+gives the same images, so timings are comparable across releases and
+libdmtx builds.
+
+Requires Pillow.
+"""
+import random
+from collections import namedtuple
+
+from pylibdmtx.pylibdmtx import encode
+
+__all__ = ['PAYLOADS', 'Sample', 'cluttered', 'generate', 'symbol']
+
+# Name, image and the payloads of the symbols in the image
+Sample = namedtuple('Sample', 'name image payloads')
+
+PAYLOADS = [
+    b'NHMUK 010123456',
+    b'010950110153000317251231101234567',
+    b'https://data.nhm.ac.uk/object/dd7a2cf5',
+    b'BMNH(E) 1234567',
+    b'Collected 12 May 1987',
+    b'PART*0012345>REV*B',
+    b'Stegosaurus',
+    b'Plesiosaurus',
+]
+
+
+def symbol(data, module_size=5, margin_size=10):
+    """Returns a greyscale `PIL.Image` of `data` encoded as a Data Matrix.
+    """
+    from PIL import Image
+
+    encoded = encode(
+        data, module_size=module_size, margin_size=margin_size, bpp=8
+    )
+    return Image.frombytes(
+        'L', (encoded.width, encoded.height), encoded.pixels
+    )
+
+
+def _rotate(image, degrees):
+    from PIL import Image
+    return image.rotate(
+        degrees, resample=Image.BICUBIC, expand=True, fillcolor=255
+    )
+
+
+def _scale(image, factor):
+    from PIL import Image
+    width, height = image.size
+    return image.resize(
+        (int(width * factor), int(height * factor)), Image.BILINEAR
+    )
+
+
+def _blur(image, radius):
+    from PIL import ImageFilter
+    return image.filter(ImageFilter.GaussianBlur(radius))
+
+
+def _noise(image, amount, rng):
+    """Returns `image` blended with uniform noise from `rng`.
+    """
+    from PIL import Image
+
+    width, height = image.size
+    n = width * height
+    noise = Image.frombytes(
+        'L', image.size, bytes(bytearray(rng.getrandbits(8) for _ in range(n)))
+    )
+    return Image.blend(image, noise, amount)
+
+
+def _canvas(images, columns, gap=20):
+    """Returns a white image with `images` laid out in a grid of `columns`.
+    """
+    from PIL import Image
+
+    cell = max(max(image.size) for image in images) + gap
+    rows = (len(images) + columns - 1) // columns
+    canvas = Image.new('L', (columns * cell, rows * cell), 255)
+    for index, image in enumerate(images):
+        row, column = divmod(index, columns)
+        canvas.paste(image, (column * cell, row * cell))
+    return canvas
+
+
+def generate(seed=0):
+    """Returns the corpus.
+
+    Args:
+        seed (int): Seed of the random choices of payloads and noise.
+
+    Returns:
+        :obj:`list` of :obj:`Sample`: Images are mode 'L'.
+    """
+    rng = random.Random(seed)
+    payloads = list(PAYLOADS)
+    rng.shuffle(payloads)
+    data = payloads[0]
+    clean = symbol(data)
+
+    samples = [
+        Sample('clean', clean, [data]),
+        Sample('small-modules', symbol(data, module_size=2, margin_size=4),
+               [data]),
+        Sample('rotate-15', _rotate(clean, 15), [data]),
+        Sample('rotate-45', _rotate(clean, 45), [data]),
+        Sample('blur-1', _blur(clean, 1), [data]),
+        Sample('noise-20', _noise(clean, 0.2, rng), [data]),
+        Sample('rotate-30-blur-1-noise-10',
+               _noise(_blur(_rotate(clean, 30), 1), 0.1, rng), [data]),
+    ]
+    for factor in (2, 4, 8):
+        samples.append(
+            Sample('scale-{0}'.format(factor), _scale(clean, factor), [data])
+        )
+    for count, columns in ((4, 2), (8, 4)):
+        chosen = payloads[:count]
+        samples.append(Sample(
+            'canvas-{0}'.format(count),
+            _canvas([symbol(d) for d in chosen], columns),
+            chosen
+        ))
+    return samples
+
+
+def cluttered(seed=0, count=4, size=(2000, 1500), symbols=3):
+    """Returns large images that are mostly background, lines and text with a
+    few symbols - some rotated - at random places.
+
+    Args:
+        seed (int): Seed of the random choices.
+        count (int): Number of images.
+        size (tuple): (width, height) of each image.
+        symbols (int): Number of symbols in each image.
+
+    Returns:
+        :obj:`list` of :obj:`Sample`: Images are mode 'L'.
+    """
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    width, height = size
+    samples = []
+    for index in range(count):
+        image = Image.new('L', size, 255)
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            draw.text(
+                (rng.randrange(width), rng.randrange(height)),
+                'Specimen {0} collected {1} May 19{2:02d}'.format(
+                    rng.randrange(100000), rng.randrange(1, 31),
+                    rng.randrange(100)
+                ),
+                fill=rng.randrange(80)
+            )
+        for _ in range(15):
+            draw.line(
+                [(rng.randrange(width), rng.randrange(height)),
+                 (rng.randrange(width), rng.randrange(height))],
+                fill=rng.randrange(150), width=rng.randrange(1, 4)
+            )
+
+        # Symbols in cells of a grid, so that they do not overlap
+        payloads = rng.sample(PAYLOADS, symbols)
+        cells = rng.sample(range(12), symbols)
+        for data, cell in zip(payloads, cells):
+            row, column = divmod(cell, 4)
+            image_symbol = _rotate(
+                symbol(data, module_size=rng.choice((2, 3, 4))),
+                rng.choice((0, 0, 15, 45))
+            )
+            left = column * width // 4 + rng.randrange(
+                max(width // 4 - image_symbol.width, 1)
+            )
+            top = row * height // 3 + rng.randrange(
+                max(height // 3 - image_symbol.height, 1)
+            )
+            image.paste(image_symbol, (left, top))
+
+        samples.append(
+            Sample('cluttered-{0}'.format(index), image, payloads)
+        )
+    return samples
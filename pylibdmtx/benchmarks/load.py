@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""Measures how `decode` or `encode` throughput scales with the number of
+threads or processes, and the memory held by each worker.
+
+    python -m pylibdmtx.benchmarks.load [--op decode|encode]
+        [--mode thread|process] [--workers 1,2,4] [--duration SECONDS]
+        [--json]
+
+For each number of workers, every worker calls the operation over the
+synthetic corpus in a loop for `duration` seconds. Reported are the total
+throughput, latency percentiles, the speedup and scaling efficiency relative
+to a single worker, the peak resident set size of a worker (of the process
+when using threads) and the growth of the resident set size during the run,
+which includes memory allocated by libdmtx.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from pylibdmtx.benchmarks.corpus import generate, PAYLOADS
+from pylibdmtx.pylibdmtx import decode, encode
+
+OPERATIONS = ['decode', 'encode']
+MODES = ['thread', 'process']
+
+
+def _rss():
+    """Returns the current resident set size in bytes, or `None` if it can not
+    be read on this platform.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss():
+    """Returns the peak resident set size in bytes of this process, or `None`.
+    """
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if 'darwin' == sys.platform else 1024 * peak
+
+
+def _items(op, seed):
+    """Returns the arguments of each call of `op`.
+    """
+    if 'decode' == op:
+        return [
+            (sample.image.tobytes(), sample.image.width, sample.image.height)
+            for sample in generate(seed)
+            # Timeouts and misses would dominate the latencies
+            if not sample.name.startswith(('noise', 'rotate', 'canvas-8'))
+        ]
+    else:
+        return list(PAYLOADS)
+
+
+def _work(op, items, duration):
+    """Calls `op` over `items` in a loop for `duration` seconds. Returns a
+    dict of latencies and memory.
+    """
+    fn = decode if 'decode' == op else encode
+    rss_start = _rss()
+    latencies = []
+    end = time.time() + duration
+    index = 0
+    while time.time() < end:
+        start = time.time()
+        fn(items[index % len(items)])
+        latencies.append(time.time() - start)
+        index += 1
+    rss_end = _rss()
+    return {
+        'latencies': latencies,
+        'peak_rss': _peak_rss(),
+        'rss_growth': (
+            rss_end - rss_start if rss_start is not None else None
+        ),
+    }
+
+
+def _process_worker(args):
+    op, seed, duration = args
+    return _work(op, _items(op, seed), duration)
+
+
+def _run_processes(op, workers, duration, seed):
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(_process_worker, [(op, seed, duration)] * workers)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _run_threads(op, workers, duration, seed):
+    items = _items(op, seed)
+    results = [None] * workers
+
+    def target(index):
+        results[index] = _work(op, items, duration)
+
+    threads = [
+        threading.Thread(target=target, args=(index,))
+        for index in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(op, mode, workers, duration, seed=0):
+    """Returns a dict of the throughput, latencies and memory of `workers`
+    threads or processes calling `op` for `duration` seconds.
+    """
+    if op not in OPERATIONS:
+        raise ValueError('Invalid op [{0}]'.format(op))
+    elif mode not in MODES:
+        raise ValueError('Invalid mode [{0}]'.format(mode))
+    elif workers < 1:
+        raise ValueError('Invalid workers [{0}]'.format(workers))
+
+    run = _run_threads if 'thread' == mode else _run_processes
+    results = run(op, workers, duration, seed)
+
+    latencies = sorted(l for r in results for l in r['latencies'])
+    peaks = [r['peak_rss'] for r in results if r['peak_rss'] is not None]
+    growths = [r['rss_growth'] for r in results if r['rss_growth'] is not None]
+    mb = 1024.0 * 1024.0
+    return {
+        'op': op,
+        'mode': mode,
+        'workers': workers,
+        'duration': duration,
+        'calls': len(latencies),
+        'per_second': len(latencies) / float(duration),
+        'p50_ms': 1000.0 * _percentile(latencies, 0.5) if latencies else None,
+        'p90_ms': 1000.0 * _percentile(latencies, 0.9) if latencies else None,
+        'p99_ms': 1000.0 * _percentile(latencies, 0.99) if latencies else None,
+        'max_ms': 1000.0 * latencies[-1] if latencies else None,
+        'peak_rss_mb': max(peaks) / mb if peaks else None,
+        'rss_growth_mb': max(growths) / mb if growths else None,
+    }
+
+
+def run(op, mode, workers, duration, seed=0):
+    """Returns a list of the results of `measure` for each of `workers`, with
+    the speedup and efficiency relative to the first.
+    """
+    results = [measure(op, mode, n, duration, seed) for n in workers]
+    base = results[0]
+    for result in results:
+        if base['per_second']:
+            speedup = result['per_second'] / base['per_second']
+            result['speedup'] = speedup
+            result['efficiency'] = (
+                speedup * base['workers'] / result['workers']
+            )
+        else:
+            result['speedup'] = result['efficiency'] = None
+    return results
+
+
+def _format(value, spec):
+    return '' if value is None else format(value, spec)
+
+
+def _print_table(results):
+    columns = (
+        ('workers', 'workers', 'd'), ('calls/s', 'per_second', '.1f'),
+        ('speedup', 'speedup', '.2f'), ('eff', 'efficiency', '.2f'),
+        ('p50 ms', 'p50_ms', '.3f'), ('p90 ms', 'p90_ms', '.3f'),
+        ('p99 ms', 'p99_ms', '.3f'), ('rss MB', 'peak_rss_mb', '.1f'),
+        ('grow MB', 'rss_growth_mb', '.1f'),
+    )
+    print(' '.join('{0:>9}'.format(title) for title, _, _ in columns))
+    for result in results:
+        print(' '.join(
+            '{0:>9}'.format(_format(result[key], spec))
+            for _, key, spec in columns
+        ))
+
+
+def _workers(value):
+    try:
+        workers = [int(n) for n in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'should be comma-separated integers: [{0}]'.format(value)
+        )
+    if not workers or min(workers) < 1:
+        raise argparse.ArgumentTypeError(
+            'should be at least 1: [{0}]'.format(value)
+        )
+    return workers
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    cpus = multiprocessing.cpu_count()
+    default_workers = [1]
+    while 2 * default_workers[-1] <= cpus:
+        default_workers.append(2 * default_workers[-1])
+
+    parser = argparse.ArgumentParser(
+        description='Measures scaling of throughput and memory with workers'
+    )
+    parser.add_argument('--op', choices=OPERATIONS, default='decode')
+    parser.add_argument('--mode', choices=MODES, default='process')
+    parser.add_argument(
+        '--workers', type=_workers, default=default_workers,
+        help='Comma-separated numbers of workers; default is powers of 2 up '
+             'to the number of CPUs'
+    )
+    parser.add_argument(
+        '--duration', type=float, default=10.0,
+        help='Seconds for which each number of workers is run'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0, help='Seed of the corpus'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Write results as JSON'
+    )
+    args = parser.parse_args(args)
+
+    results = run(args.op, args.mode, args.workers, args.duration, args.seed)
+    if args.json:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    else:
+        _print_table(results)
+
+
+if __name__ == '__main__':
+    main()
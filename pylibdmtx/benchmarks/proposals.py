@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""Compares `decode` of a whole image with `decode` within the regions found
+by `pylibdmtx.proposals`.
+
+    python -m pylibdmtx.benchmarks.proposals [IMAGE ...] [--repeat N]
+        [--seed N] [--fallback] [--json]
+
+Images are those given or, if none are, synthetic cluttered images. Reported
+for each image are the best times of `propose`, of decoding within the
+proposals and of decoding the whole image, the speedup and the recall - the
+fraction of the barcodes found in the whole image that were also found
+within the proposals.
+
+Requires numpy and Pillow.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import timeit
+
+from pylibdmtx import proposals
+from pylibdmtx.benchmarks.corpus import cluttered, Sample
+from pylibdmtx.pylibdmtx import decode
+
+
+def _best_ms(fn, repeat):
+    """Returns (result of `fn`, best ms over `repeat` calls).
+    """
+    result = fn()
+    return result, 1000.0 * min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def measure(sample, repeat, fallback=False):
+    """Returns a dict of the timings and recall of proposals for `sample`.
+    """
+    image = sample.image
+    full, full_ms = _best_ms(lambda: decode(image), repeat)
+    found, propose_ms = _best_ms(lambda: proposals.propose(image), repeat)
+    within, within_ms = _best_ms(
+        lambda: proposals.decode(image, fallback=fallback), repeat
+    )
+
+    # Barcodes of the whole image are the reference, so that images without
+    # known payloads can be measured
+    reference = set(d.data for d in full).union(sample.payloads)
+    read = set(d.data for d in within)
+    return {
+        'sample': sample.name,
+        'width': image.width,
+        'height': image.height,
+        'proposals': len(found),
+        'proposal_area': (
+            float(sum(p.width * p.height for p in found)) /
+            (image.width * image.height)
+        ),
+        'propose_ms': propose_ms,
+        'proposals_ms': within_ms,
+        'full_ms': full_ms,
+        'speedup': full_ms / within_ms if within_ms else None,
+        'expected': len(reference),
+        'full_found': len(reference.intersection(d.data for d in full)),
+        'found': len(reference.intersection(read)),
+        'recall': (
+            float(len(reference.intersection(read))) / len(reference)
+            if reference else None
+        ),
+    }
+
+
+def run(samples, repeat, fallback=False):
+    """Returns a list of dicts, as returned by `measure`, one per sample.
+    """
+    return [measure(sample, repeat, fallback) for sample in samples]
+
+
+def _samples(paths):
+    """Returns a `Sample` with no known payloads for each of `paths`.
+    """
+    from PIL import Image
+
+    return [Sample(path, Image.open(path).convert('L'), []) for path in paths]
+
+
+def _print_table(results):
+    print('{0:<24} {1:>5} {2:>6} {3:>9} {4:>9} {5:>9} {6:>7} {7:>7}'.format(
+        'sample', 'props', 'area', 'propose', 'within', 'full', 'speedup',
+        'recall'
+    ))
+    for r in results:
+        print(
+            '{0:<24} {1:>5} {2:>6.1%} {3:>9.1f} {4:>9.1f} {5:>9.1f} {6:>7} '
+            '{7:>7}'.format(
+                r['sample'][-24:], r['proposals'], r['proposal_area'],
+                r['propose_ms'], r['proposals_ms'], r['full_ms'],
+                '{0:.1f}x'.format(r['speedup']) if r['speedup'] else '',
+                '{0}/{1}'.format(r['found'], r['expected'])
+            )
+        )
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        description='Compares decoding within proposals with decoding whole '
+                    'images'
+    )
+    parser.add_argument(
+        'images', nargs='*',
+        help='Images to measure; default is synthetic cluttered images'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='Number of timed calls of each measurement'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0, help='Seed of the synthetic images'
+    )
+    parser.add_argument(
+        '--fallback', action='store_true',
+        help='Decode the whole image if nothing is found within proposals'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Write results as JSON'
+    )
+    args = parser.parse_args(args)
+
+    samples = _samples(args.images) if args.images else cluttered(args.seed)
+    results = run(samples, args.repeat, args.fallback)
+    if args.json:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    else:
+        _print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Compares the symbol size and encoding time of each encoding scheme over
+realistic payloads.
+
+    python -m pylibdmtx.benchmarks.schemes [--repeat N] [--json]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import timeit
+
+from pylibdmtx.pylibdmtx import encode_matrix, ENCODING_SCHEME_NAMES
+from pylibdmtx.pylibdmtx_error import PyLibDMTXError
+
+# Name and payload
+PAYLOADS = [
+    ('gs1-numeric', b'010950110153000317251231101234567'),
+    ('catalogue-number', b'NHMUK 010123456'),
+    ('upper-alphanumeric', b'BMNH(E) 1234567 SPECIMEN LABEL'),
+    ('x12-part-number', b'PART*0012345>REV*B'),
+    ('url', b'https://data.nhm.ac.uk/object/dd7a2cf5-63e5-4b5d'),
+    ('sentence', b'Collected by hand from leaf litter, 12 May 1987'),
+    ('utf-8', u'Esp\xe9cimen n\xfamero 12 \u2013 M\xe1laga'.encode('utf-8')),
+    ('binary', bytes(bytearray(range(256)))[:96]),
+    ('long-text', b'Lorem ipsum dolor sit amet, consectetur adipiscing ' * 8),
+]
+
+
+def measure(data, scheme, repeat):
+    """Returns a dict of the symbol size and the best encoding time in
+    milliseconds of `data` using `scheme`, or of the error.
+    """
+    try:
+        matrix = encode_matrix(data, scheme=scheme)
+    except PyLibDMTXError as e:
+        return {'error': str(e)}
+
+    seconds = min(timeit.repeat(
+        lambda: encode_matrix(data, scheme=scheme), number=1, repeat=repeat
+    ))
+    return {
+        'rows': matrix.rows,
+        'cols': matrix.cols,
+        'modules': matrix.rows * matrix.cols,
+        'ms': 1000.0 * seconds,
+    }
+
+
+def run(repeat, payloads=PAYLOADS, schemes=ENCODING_SCHEME_NAMES):
+    """Returns a list of dicts, one per payload and scheme.
+    """
+    results = []
+    for name, data in payloads:
+        for scheme in schemes:
+            result = {'payload': name, 'bytes': len(data), 'scheme': scheme}
+            result.update(measure(data, scheme, repeat))
+            results.append(result)
+    return results
+
+
+def _print_table(results):
+    print('{0:<20} {1:<9} {2:>9} {3:>9}'.format(
+        'payload', 'scheme', 'symbol', 'ms'
+    ))
+    for result in results:
+        if 'error' in result:
+            symbol, ms = 'fail', ''
+        else:
+            symbol = '{0}x{1}'.format(result['rows'], result['cols'])
+            ms = '{0:.3f}'.format(result['ms'])
+        print('{0:<20} {1:<9} {2:>9} {3:>9}'.format(
+            result['payload'], result['scheme'], symbol, ms
+        ))
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        description='Compares symbol size and encoding time of each scheme'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=20,
+        help='Number of timed encodings of each payload; the best is reported'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Write results as JSON'
+    )
+    args = parser.parse_args(args)
+
+    results = run(args.repeat)
+    if args.json:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    else:
+        _print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+"""Times `decode` and `encode` over the synthetic corpus.
+
+    python -m pylibdmtx.benchmarks.suite [--repeat N] [--json] [--output FILE]
+        [--compare BASELINE]
+
+`decode` is timed on every sample of the corpus and, from a baseline of a
+PIL image at 24 bpp with default arguments, with one of bpp, `shrink`,
+`timeout`, `max_count` or the type of input varied at a time. `encode` is
+timed for every scheme and a range of sizes.
+
+Results written with `--output` can be given to `--compare` to report the
+ratio of each timing to that of an earlier release or libdmtx build.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+
+import pylibdmtx
+from pylibdmtx.benchmarks.corpus import generate, PAYLOADS
+from pylibdmtx.pylibdmtx import decode, encode, ENCODING_SCHEME_NAMES
+from pylibdmtx.pylibdmtx_error import PyLibDMTXError
+from pylibdmtx.wrapper import dmtxVersion
+
+# Sizes at which `encode` is timed
+ENCODE_SIZES = ['ShapeAuto', '24x24', '48x48', '104x104', '16x48']
+
+
+def _time(fn, repeat):
+    """Returns (result of `fn`, best ms, median ms) over `repeat` calls.
+    """
+    result = fn()
+    times = sorted(timeit.repeat(fn, number=1, repeat=repeat))
+    return result, 1000.0 * times[0], 1000.0 * times[len(times) // 2]
+
+
+def _decode_inputs(image):
+    """Returns a dict of the ways `image` can be passed to `decode`.
+    """
+    inputs = {
+        'pil': image,
+        'tuple': (image.tobytes(), image.width, image.height),
+    }
+    try:
+        import numpy as np
+    except ImportError:
+        pass
+    else:
+        inputs['numpy'] = np.asarray(image)
+    return inputs
+
+
+def _decode_cases(samples):
+    """Yields (case, sample, params, image) of each decode measurement.
+    """
+    by_name = dict((sample.name, sample) for sample in samples)
+
+    for sample in samples:
+        yield 'corpus', sample, {}, sample.image.convert('RGB')
+
+    clean = by_name['clean']
+    for mode, bpp in (('L', 8), ('RGB', 24), ('RGBX', 32)):
+        yield 'bpp', clean, {'bpp': bpp}, clean.image.convert(mode)
+
+    inputs = _decode_inputs(clean.image.convert('RGB'))
+    for name, image in sorted(inputs.items()):
+        yield 'input', clean, {'input': name}, image
+
+    large = by_name['scale-4']
+    for shrink in (1, 2, 4):
+        yield 'shrink', large, {'shrink': shrink}, large.image.convert('RGB')
+
+    canvas = by_name['canvas-8']
+    image = canvas.image.convert('RGB')
+    for timeout in (None, 50, 200):
+        yield 'timeout', canvas, {'timeout': timeout}, image
+    for max_count in (None, 1, 4):
+        yield 'max_count', canvas, {'max_count': max_count}, image
+
+
+def decode_results(samples, repeat):
+    """Returns a list of dicts of decode timings over `samples`.
+    """
+    results = []
+    for case, sample, params, image in _decode_cases(samples):
+        kwargs = dict(
+            (k, v) for k, v in params.items() if k not in ('bpp', 'input')
+        )
+        decoded, best, median = _time(lambda: decode(image, **kwargs), repeat)
+        found = set(d.data for d in decoded)
+        results.append({
+            'benchmark': 'decode',
+            'case': case,
+            'sample': sample.name,
+            'params': params,
+            'best_ms': best,
+            'median_ms': median,
+            'found': len(found),
+            'correct': len(found.intersection(sample.payloads)),
+            'expected': len(sample.payloads),
+        })
+    return results
+
+
+def encode_results(repeat, payloads=PAYLOADS[:3],
+                   schemes=ENCODING_SCHEME_NAMES, sizes=ENCODE_SIZES):
+    """Returns a list of dicts of encode timings.
+    """
+    results = []
+    for data in payloads:
+        for scheme in schemes:
+            for size in sizes:
+                result = {
+                    'benchmark': 'encode',
+                    'case': 'scheme-size',
+                    'sample': data.decode('ascii'),
+                    'params': {'scheme': scheme, 'size': size},
+                }
+                try:
+                    encoded, best, median = _time(
+                        lambda: encode(data, scheme=scheme, size=size), repeat
+                    )
+                except PyLibDMTXError as e:
+                    result['error'] = str(e)
+                else:
+                    result.update({
+                        'best_ms': best,
+                        'median_ms': median,
+                        'width': encoded.width,
+                    })
+                results.append(result)
+    return results
+
+
+def environment():
+    """Returns a dict describing the versions being measured.
+    """
+    return {
+        'pylibdmtx': pylibdmtx.__version__,
+        'libdmtx': dmtxVersion(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def run(repeat, seed=0):
+    """Returns a dict of the environment and the results of every measurement.
+    """
+    samples = generate(seed)
+    return {
+        'environment': environment(),
+        'seed': seed,
+        'repeat': repeat,
+        'results': decode_results(samples, repeat) + encode_results(repeat),
+    }
+
+
+def _key(result):
+    return (
+        result['benchmark'], result['case'], result['sample'],
+        json.dumps(result['params'], sort_keys=True)
+    )
+
+
+def compare(baseline, current):
+    """Returns a list of (key, baseline ms, current ms, ratio) for the
+    measurements in both `baseline` and `current`, as returned by `run`.
+    """
+    before = dict(
+        (_key(r), r['best_ms']) for r in baseline['results'] if 'best_ms' in r
+    )
+    comparison = []
+    for result in current['results']:
+        key = _key(result)
+        if key in before and 'best_ms' in result:
+            ratio = result['best_ms'] / before[key] if before[key] else None
+            comparison.append((key, before[key], result['best_ms'], ratio))
+    return comparison
+
+
+def _label(result):
+    params = ','.join(
+        '{0}={1}'.format(k, v) for k, v in sorted(result['params'].items())
+    )
+    return '{0}:{1}:{2}'.format(result['case'], result['sample'], params)
+
+
+def _print_table(results):
+    print('{0:<6} {1:<56} {2:>9} {3:>9} {4:>7}'.format(
+        '', 'case', 'best ms', 'median', 'read'
+    ))
+    for result in results['results']:
+        if 'error' in result:
+            best, median, read = 'fail', '', ''
+        else:
+            best = '{0:.3f}'.format(result['best_ms'])
+            median = '{0:.3f}'.format(result['median_ms'])
+            read = (
+                '{0}/{1}'.format(result['correct'], result['expected'])
+                if 'decode' == result['benchmark'] else ''
+            )
+        print('{0:<6} {1:<56} {2:>9} {3:>9} {4:>7}'.format(
+            result['benchmark'], _label(result)[:56], best, median, read
+        ))
+
+
+def _print_comparison(comparison):
+    print('{0:<70} {1:>9} {2:>9} {3:>7}'.format(
+        'case', 'baseline', 'current', 'ratio'
+    ))
+    for key, before, after, ratio in comparison:
+        label = ':'.join(key)
+        print('{0:<70} {1:>9.3f} {2:>9.3f} {3:>7}'.format(
+            label[:70], before, after,
+            '{0:.2f}'.format(ratio) if ratio is not None else ''
+        ))
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        description='Times decode and encode over a synthetic corpus'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help='Number of timed calls of each measurement'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0, help='Seed of the corpus'
+    )
+    parser.add_argument(
+        '--json', action='store_true', help='Write results as JSON'
+    )
+    parser.add_argument(
+        '--output', help='Also write results as JSON to this file'
+    )
+    parser.add_argument(
+        '--compare', metavar='BASELINE',
+        help='Report ratios to the results in this JSON file'
+    )
+    args = parser.parse_args(args)
+
+    results = run(args.repeat, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            comparison = compare(json.load(f), results)
+        if args.json:
+            json.dump(
+                [
+                    {'key': list(key), 'baseline_ms': before,
+                     'current_ms': after, 'ratio': ratio}
+                    for key, before, after, ratio in comparison
+                ],
+                sys.stdout, indent=1
+            )
+            print()
+        else:
+            _print_comparison(comparison)
+    elif args.json:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    else:
+        _print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Memoization of `encode` results in memory and, optionally, on disk.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from collections import namedtuple, OrderedDict
+
+from .pylibdmtx import (
+    encode, Encoded, _encoded_pixels, _scheme, _symbol_size
+)
+
+__all__ = ['CacheStats', 'EncodeCache']
+
+# Counters of an EncodeCache
+CacheStats = namedtuple(
+    'CacheStats', 'hits disk_hits misses evictions entries bytes hit_rate'
+)
+
+# Header of files in the on-disk store: magic, width, height and bpp
+_HEADER = struct.Struct('<4sIIB')
+_MAGIC = b'DMTX'
+
+
+def _replace(src, dst):
+    """Renames `src` to `dst` atomically, replacing any existing `dst`.
+    """
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        # Python 2. os.rename replaces atomically on POSIX but fails on
+        # Windows if `dst` exists - in which case it was written by another
+        # process and, as the store is content-addressed, is the same
+        try:
+            os.rename(src, dst)
+        except OSError:
+            if not os.path.exists(dst):
+                raise
+            os.unlink(src)
+
+
+class EncodeCache(object):
+    """Memoizes `encode`.
+
+    Results are held in a least-recently-used in-memory store that is bounded
+    by the total size of their pixels. If `directory` is given, results are
+    also written to a content-addressed store in that directory, which can be
+    shared by many processes; files are replaced atomically so concurrent
+    writers are safe. The on-disk store is not bounded.
+
+    Args:
+        max_bytes (int): Maximum total bytes of pixels held in memory.
+        directory (str): Directory of the on-disk store, or `None`.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = self._disk_hits = self._misses = self._evictions = 0
+
+    def encode(self, data, scheme=None, size=None, module_size=None,
+               margin_size=None, bpp=24, output='bytes'):
+        """Returns `encode(data, ...)`, computing it only if not already
+        cached. Arguments are as for `encode`.
+
+        Returns:
+            Encoded: As `encode`. 'memoryview' and 'numpy' pixels are copies
+            that the caller may modify.
+        """
+        key = self._key(data, scheme, size, module_size, margin_size, bpp)
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                # Most recently used entries are last
+                self._entries[key] = self._entries.pop(key)
+                self._hits += 1
+
+        if encoded is None:
+            encoded = self._read(key)
+            if encoded is not None:
+                with self._lock:
+                    self._disk_hits += 1
+            else:
+                encoded = encode(
+                    data, scheme=scheme, size=size, module_size=module_size,
+                    margin_size=margin_size, bpp=bpp
+                )
+                with self._lock:
+                    self._misses += 1
+                self._write(key, encoded)
+            self._add(key, encoded)
+
+        if 'bytes' == output:
+            return encoded
+        else:
+            return encoded._replace(pixels=_encoded_pixels(
+                bytearray(encoded.pixels), encoded.width, encoded.height,
+                encoded.bpp, output
+            ))
+
+    def stats(self):
+        """Returns the counters of this cache.
+
+        Returns:
+            CacheStats: `hit_rate` is the fraction of calls to `encode`
+            answered from either store.
+        """
+        with self._lock:
+            calls = self._hits + self._disk_hits + self._misses
+            return CacheStats(
+                hits=self._hits, disk_hits=self._disk_hits,
+                misses=self._misses, evictions=self._evictions,
+                entries=len(self._entries), bytes=self._bytes,
+                hit_rate=(
+                    float(self._hits + self._disk_hits) / calls
+                    if calls else 0.0
+                )
+            )
+
+    def clear(self):
+        """Empties the in-memory store and resets the counters. The on-disk
+        store is left as is.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = self._disk_hits = self._misses = self._evictions = 0
+
+    def _key(self, data, scheme, size, module_size, margin_size, bpp):
+        """Returns the hex digest that identifies an encoding of `data`.
+        """
+        options = '{0},{1},{2},{3},{4};'.format(
+            int(_scheme(scheme)), int(_symbol_size(size)), module_size,
+            margin_size, bpp
+        )
+        return hashlib.sha256(options.encode('ascii') + data).hexdigest()
+
+    def _add(self, key, encoded):
+        """Adds `encoded` to the in-memory store, evicting the least recently
+        used entries to stay within `max_bytes`.
+        """
+        nbytes = len(encoded.pixels)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = encoded
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.pixels)
+                self._evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read(self, key):
+        """Returns the Encoded for `key` from the on-disk store, or `None`.
+        """
+        if not self.directory:
+            return None
+
+        try:
+            with open(self._path(key), 'rb') as f:
+                contents = f.read()
+        except (IOError, OSError):
+            return None
+
+        if len(contents) < _HEADER.size:
+            return None
+        magic, width, height, bpp = _HEADER.unpack_from(contents)
+        if _MAGIC != magic:
+            return None
+        return Encoded(
+            width=width, height=height, bpp=bpp,
+            pixels=contents[_HEADER.size:]
+        )
+
+    def _write(self, key, encoded):
+        """Writes `encoded` to the on-disk store, if there is one. Errors,
+        such as a full disk or a read-only store, are ignored, as the result
+        is still held in memory.
+        """
+        if not self.directory:
+            return
+
+        path = self._path(key)
+        parent = os.path.dirname(path)
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # Created by another process, or not writable
+                pass
+
+        try:
+            fd, tmp = tempfile.mkstemp(dir=parent)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(_HEADER.pack(
+                        _MAGIC, encoded.width, encoded.height, encoded.bpp
+                    ))
+                    f.write(encoded.pixels)
+                _replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except (IOError, OSError):
+            # Not stored
+            pass
@@ -0,0 +1,308 @@
+"""Computes the number of codewords that libdmtx needs to encode data, and so
+the symbol sizes that it fits, without running the encoder.
+
+The counts follow libdmtx's single-scheme encoder, including its end-of-data
+rules. Where libdmtx can save a codeword at the very end of a C40, Text or
+X12 symbol, the count here may be one higher, so `fits` never reports a fit
+that `encode` would reject.
+"""
+import re
+from collections import namedtuple
+
+__all__ = [
+    'SCHEMES', 'SYMBOL_SIZES', 'SymbolSize', 'best_scheme', 'codewords',
+    'fits', 'smallest_size'
+]
+
+# Dimensions and data capacity of a symbol size
+SymbolSize = namedtuple('SymbolSize', 'name rows cols data_words')
+
+# In the order of DmtxSymbolSize; squares then rectangles
+SYMBOL_SIZES = [
+    SymbolSize('10x10', 10, 10, 3),
+    SymbolSize('12x12', 12, 12, 5),
+    SymbolSize('14x14', 14, 14, 8),
+    SymbolSize('16x16', 16, 16, 12),
+    SymbolSize('18x18', 18, 18, 18),
+    SymbolSize('20x20', 20, 20, 22),
+    SymbolSize('22x22', 22, 22, 30),
+    SymbolSize('24x24', 24, 24, 36),
+    SymbolSize('26x26', 26, 26, 44),
+    SymbolSize('32x32', 32, 32, 62),
+    SymbolSize('36x36', 36, 36, 86),
+    SymbolSize('40x40', 40, 40, 114),
+    SymbolSize('44x44', 44, 44, 144),
+    SymbolSize('48x48', 48, 48, 174),
+    SymbolSize('52x52', 52, 52, 204),
+    SymbolSize('64x64', 64, 64, 280),
+    SymbolSize('72x72', 72, 72, 368),
+    SymbolSize('80x80', 80, 80, 456),
+    SymbolSize('88x88', 88, 88, 576),
+    SymbolSize('96x96', 96, 96, 696),
+    SymbolSize('104x104', 104, 104, 816),
+    SymbolSize('120x120', 120, 120, 1050),
+    SymbolSize('132x132', 132, 132, 1304),
+    SymbolSize('144x144', 144, 144, 1558),
+    SymbolSize('8x18', 8, 18, 5),
+    SymbolSize('8x32', 8, 32, 10),
+    SymbolSize('12x26', 12, 26, 16),
+    SymbolSize('12x36', 12, 36, 22),
+    SymbolSize('16x36', 16, 36, 32),
+    SymbolSize('16x48', 16, 48, 49),
+]
+
+_SQUARES = SYMBOL_SIZES[:24]
+_RECTANGLES = SYMBOL_SIZES[24:]
+
+# Candidate sizes for each size request. libdmtx treats 'ShapeAuto' as
+# 'SquareAuto' when encoding.
+_REQUESTS = dict((s.name, [s]) for s in SYMBOL_SIZES)
+_REQUESTS.update(
+    ShapeAuto=_SQUARES, SquareAuto=_SQUARES, RectAuto=_RECTANGLES
+)
+
+# Single encoding schemes, in order of preference when they tie
+SCHEMES = ['Ascii', 'C40', 'Text', 'X12', 'Edifact', 'Base256']
+
+
+def _ctx_values(lower_case):
+    """Returns a translation table from bytes to the number of C40 (or Text,
+    if `lower_case`) values that encode them.
+    """
+    values = []
+    for c in range(256):
+        # Extended ASCII is prefixed by a two-value upper shift
+        count = 2 if c > 127 else 0
+        c &= 0x7f
+        if 32 == c or 48 <= c <= 57:
+            count += 1
+        elif not lower_case and 65 <= c <= 90:
+            count += 1
+        elif lower_case and 97 <= c <= 122:
+            count += 1
+        else:
+            count += 2
+        values.append(count)
+    return bytes(bytearray(values))
+
+
+_C40_VALUES = _ctx_values(False)
+_TEXT_VALUES = _ctx_values(True)
+_EXTENDED = bytes(bytearray(range(128, 256)))
+_X12_CHARS = b'\r*> 0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_EDIFACT_CHARS = bytes(bytearray(range(32, 95)))
+_DIGIT_PAIR = re.compile(b'[0-9]{2}')
+
+
+def _find_size(words, candidates):
+    """Returns the first of `candidates` that holds `words` data codewords, or
+    `None`.
+    """
+    if words > 0:
+        for size in candidates:
+            if words <= size.data_words:
+                return size
+    return None
+
+
+def _ascii_words(data):
+    """Returns the number of ASCII codewords that encode `data`.
+    """
+    extended = len(data) - len(data.translate(None, _EXTENDED))
+    return len(data) + extended - len(_DIGIT_PAIR.findall(data))
+
+
+def _ascii(data, candidates):
+    return _ascii_words(data), _find_size(_ascii_words(data), candidates)
+
+
+def _ctx(data, candidates, table):
+    """C40, Text and X12: three values in every two codewords after a latch.
+    `table` translates bytes to numbers of values; `None` for X12, where every
+    character is a single value.
+    """
+    if table is None:
+        n_values = len(data)
+    else:
+        n_values = sum(bytearray(data.translate(table)))
+    words = 1 + 2 * (n_values // 3)
+    partial = n_values % 3
+    if 0 == partial:
+        # Unlatch to pad, if there is room, does not change the size
+        size = _find_size(words, candidates)
+        if size and size.data_words > words:
+            words += 1
+        return words, size
+
+    if table is not None:
+        # C40 and Text: two leftover values are completed with a shift if
+        # that does not need a larger symbol
+        size1 = _find_size(words + 1, candidates)
+        size2 = _find_size(words + 2, candidates)
+        if 2 == partial and size1 is size2:
+            return words + 2, size2
+        # Otherwise the characters of the leftover values are unlatched and
+        # written as ASCII
+        last = data[-1:]
+        if 2 == partial and 1 == sum(bytearray(last.translate(table))):
+            last = data[-2:]
+    else:
+        last = data[-partial:]
+
+    words += 1 + _ascii_words(last)
+    return words, _find_size(words, candidates)
+
+
+def _x12(data, candidates):
+    if data.translate(None, _X12_CHARS):
+        return None, None
+    return _ctx(data, candidates, None)
+
+
+def _edifact(data, candidates):
+    """Four six-bit values in every three codewords after a latch.
+    """
+    if data.translate(None, _EDIFACT_CHARS):
+        return None, None
+
+    n = len(data)
+    # libdmtx checks after every value whether the rest of the data can be
+    # written as ASCII to exactly fill the symbol; that is only possible with
+    # at most four characters left.
+    for count in range(max(0, n - 4) // 4 * 4, n + 1, 4):
+        words = 1 + 3 * (count // 4)
+        ascii_words = _ascii_words(data[count:])
+        if ascii_words < 3:
+            size = _find_size(words + ascii_words, candidates)
+            if size and ascii_words <= size.data_words - words < 3:
+                return words + ascii_words, size
+
+    words = 1 + 3 * (n // 4) + n % 4
+    size = _find_size(words, candidates)
+    if n % 4 or not size or size.data_words > words:
+        # Explicit unlatch - a value that needs a new codeword unless it
+        # completes a group of four
+        words += 0 if 3 == n % 4 else 1
+        size = _find_size(words, candidates)
+    return words, size
+
+
+def _base256(data, candidates):
+    """A latch and a one or two byte length header followed by the data.
+    """
+    n = len(data)
+    if n > 249:
+        # A one byte header of zero means 'to the end of the symbol'
+        size = _find_size(n + 2, candidates)
+        if size and size.data_words == n + 2:
+            return n + 2, size
+    words = n + (2 if n <= 249 else 3)
+    return words, _find_size(words, candidates)
+
+
+_SCHEME_FUNCTIONS = {
+    'ascii': _ascii,
+    'c40': lambda data, candidates: _ctx(data, candidates, _C40_VALUES),
+    'text': lambda data, candidates: _ctx(data, candidates, _TEXT_VALUES),
+    'x12': _x12,
+    'edifact': _edifact,
+    'base256': _base256,
+}
+
+
+def _candidates(size):
+    size = size if size else 'ShapeAuto'
+    try:
+        return _REQUESTS[size]
+    except KeyError:
+        raise ValueError('Invalid size [{0}]'.format(size))
+
+
+def _encode(data, scheme, size):
+    """Returns (scheme, codewords, SymbolSize) of the encoding of `data` that
+    libdmtx would produce. The last two are `None` if `data` can not be
+    encoded.
+    """
+    scheme = scheme if scheme else 'Ascii'
+    candidates = _candidates(size)
+    auto = scheme.lower() in ('autobest', 'autofast')
+    if not auto and scheme.lower() not in _SCHEME_FUNCTIONS:
+        raise ValueError('Invalid scheme [{0}]'.format(scheme))
+
+    if not data:
+        # libdmtx does not encode empty data
+        return scheme, None, None
+    elif auto:
+        # The best single scheme. libdmtx's AutoBest can mix schemes so may
+        # need fewer codewords.
+        results = [_encode(data, s, size) for s in SCHEMES]
+        encodable = [r for r in results if r[2]]
+        if encodable:
+            return min(
+                encodable,
+                key=lambda r: (SYMBOL_SIZES.index(r[2]), r[1])
+            )
+        else:
+            return scheme, None, None
+    else:
+        words, symbol = _SCHEME_FUNCTIONS[scheme.lower()](data, candidates)
+        return scheme, words if symbol else None, symbol
+
+
+def codewords(data, scheme=None, size=None):
+    """Returns the number of data codewords, before padding, that libdmtx
+    writes to encode `data`.
+
+    Args:
+        data (bytes):
+        scheme (str): One of `ENCODING_SCHEME_NAMES`; `None` for 'Ascii'.
+            'AutoBest' and 'AutoFast' give the count of the best single
+            scheme.
+        size (str): One of `ENCODING_SIZE_NAMES`; `None` for 'ShapeAuto'.
+
+    Returns:
+        int: The number of codewords or `None` if `data` can not be encoded
+        using `scheme` in a symbol of `size`.
+
+    Raises:
+        ValueError: If `scheme` or `size` is not recognised.
+    """
+    return _encode(data, scheme, size)[1]
+
+
+def fits(data, scheme=None, size=None):
+    """Returns `True` if `data` can be encoded using `scheme` in a symbol of
+    `size`. Arguments are as for `codewords`.
+    """
+    return _encode(data, scheme, size)[2] is not None
+
+
+def smallest_size(data, scheme=None, shape=None):
+    """Returns the smallest symbol that holds `data` encoded using `scheme`.
+
+    Args:
+        data (bytes):
+        scheme (str): As for `codewords`.
+        shape (str): 'ShapeAuto' or 'SquareAuto' for a square symbol,
+            'RectAuto' for a rectangular symbol; `None` for 'ShapeAuto'.
+
+    Returns:
+        str: One of `ENCODING_SIZE_NAMES` or `None` if `data` is too large.
+    """
+    symbol = _encode(data, scheme, shape)[2]
+    return symbol.name if symbol else None
+
+
+def best_scheme(data, size=None):
+    """Returns the single scheme that encodes `data` in the smallest symbol of
+    `size`, using the fewest codewords.
+
+    Args:
+        data (bytes):
+        size (str): As for `codewords`.
+
+    Returns:
+        str: One of `SCHEMES`, or `None` if no scheme can encode `data`.
+    """
+    scheme, words, symbol = _encode(data, 'AutoFast', size)
+    return scheme if symbol else None
@@ -0,0 +1,167 @@
+"""Columnar results of `decode_batch`, for very many barcodes.
+
+Rather than a `Decoded` namedtuple per barcode, `ColumnarDecoded` holds
+arrays: the index of the image of each barcode, the offsets of each payload
+in a single buffer of concatenated payloads and a structured array of
+geometry. These convert to pandas and Arrow without creating a Python object
+per barcode.
+
+Requires numpy. `to_arrow` requires pyarrow and `to_pandas` requires pandas.
+"""
+from array import array
+from functools import partial
+
+import numpy as np
+
+from .arena import PayloadArena
+
+__all__ = ['ColumnarDecoded', 'GEOMETRY_DTYPE']
+
+# Rect, vertices, as in `Rect_vertices`, and the number of rows and columns of
+# modules of each barcode
+GEOMETRY_DTYPE = np.dtype([
+    ('left', np.int32), ('top', np.int32),
+    ('width', np.int32), ('height', np.int32),
+    ('x0', np.int32), ('y0', np.int32), ('x1', np.int32), ('y1', np.int32),
+    ('x2', np.int32), ('y2', np.int32), ('x3', np.int32), ('y3', np.int32),
+    ('rows', np.int32), ('cols', np.int32),
+])
+
+# Values appended by _Builder for each barcode: x0 to y3, rows and cols
+_VALUES = 10
+
+try:
+    _int64s = partial(array, 'q')
+    _int64s()
+except ValueError:
+    # Python 2 has no array of long long, and C longs are 32 bits on Windows
+    _int64s = list
+
+
+class ColumnarDecoded(object):
+    """Barcodes decoded from a sequence of images.
+
+    Attributes:
+        image_index (numpy.ndarray): int64 index, in the sequence of images,
+            of the image of each barcode.
+        offsets (numpy.ndarray): int64 offsets, one more than the number of
+            barcodes; the data of barcode `i` is
+            `payloads[offsets[i]:offsets[i + 1]]`.
+        payloads (bytes): The data of every barcode, concatenated.
+        geometry (numpy.ndarray): `GEOMETRY_DTYPE` of each barcode.
+    """
+    def __init__(self, image_index, offsets, payloads, geometry):
+        self.image_index = image_index
+        self.offsets = offsets
+        self.payloads = payloads
+        self.geometry = geometry
+
+    def __len__(self):
+        return len(self.image_index)
+
+    def data(self, i):
+        """Returns the data of barcode `i` as bytes.
+        """
+        return self.payloads[self.offsets[i]:self.offsets[i + 1]]
+
+    def decoded(self, i, return_vertices=False):
+        """Returns barcode `i` as a `Decoded`, as `decode` would.
+        """
+        from .pylibdmtx import Decoded, Rect, Rect_vertices
+
+        g = self.geometry[i]
+        if return_vertices:
+            rect = Rect_vertices(*(
+                (int(g['x{0}'.format(n)]), int(g['y{0}'.format(n)]))
+                for n in range(4)
+            ))
+        else:
+            rect = Rect(
+                int(g['left']), int(g['top']), int(g['width']),
+                int(g['height'])
+            )
+        return Decoded(self.data(i), rect)
+
+    def to_arrow(self):
+        """Returns a `pyarrow.Table` with columns `image_index`, `data`
+        (large_binary, sharing `payloads`) and each field of `geometry`.
+        """
+        import pyarrow as pa
+
+        data = pa.Array.from_buffers(
+            pa.large_binary(), len(self),
+            [None, pa.py_buffer(self.offsets), pa.py_buffer(self.payloads)]
+        )
+        columns = [pa.array(self.image_index), data]
+        columns.extend(
+            pa.array(np.ascontiguousarray(self.geometry[name]))
+            for name in GEOMETRY_DTYPE.names
+        )
+        return pa.Table.from_arrays(
+            columns, names=['image_index', 'data'] + list(GEOMETRY_DTYPE.names)
+        )
+
+    def to_pandas(self, data=True):
+        """Returns a `pandas.DataFrame` with columns `image_index`, each field
+        of `geometry` and, if `data`, `data`. Data is held in a pyarrow-backed
+        column if pyarrow is installed and as bytes objects otherwise.
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame(self.geometry)
+        frame.insert(0, 'image_index', self.image_index)
+        if data:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                values = [self.data(i) for i in range(len(self))]
+            else:
+                values = pd.arrays.ArrowExtensionArray(
+                    self.to_arrow().column('data')
+                )
+            frame.insert(1, 'data', values)
+        return frame
+
+
+class _Builder(object):
+    """Accumulates barcodes in flat buffers, without an object per barcode.
+    Data should be written to `arena` before being appended.
+    """
+    def __init__(self, arena=None):
+        self.arena = PayloadArena() if arena is None else arena
+        self._first = self.arena.count
+        self._image_index = _int64s()
+        self._offsets = _int64s([0])
+        self._values = array('i')
+
+    def append(self, index, data, vertices, rows, cols):
+        self._image_index.append(index)
+        self._offsets.append(self._offsets[-1] + len(data))
+        for x, y in vertices:
+            self._values.append(x)
+            self._values.append(y)
+        self._values.append(rows)
+        self._values.append(cols)
+
+    def build(self):
+        values = np.frombuffer(self._values, dtype=np.intc).reshape(
+            -1, _VALUES
+        )
+        xs, ys = values[:, 0:8:2], values[:, 1:8:2]
+        geometry = np.empty(len(values), dtype=GEOMETRY_DTYPE)
+        geometry['left'] = xs.min(axis=1)
+        geometry['top'] = ys.min(axis=1)
+        geometry['width'] = xs.max(axis=1) - geometry['left']
+        geometry['height'] = ys.max(axis=1) - geometry['top']
+        for n in range(4):
+            geometry['x{0}'.format(n)] = xs[:, n]
+            geometry['y{0}'.format(n)] = ys[:, n]
+        geometry['rows'] = values[:, 8]
+        geometry['cols'] = values[:, 9]
+
+        return ColumnarDecoded(
+            image_index=np.asarray(self._image_index, dtype=np.int64),
+            offsets=np.asarray(self._offsets, dtype=np.int64),
+            payloads=self.arena.getvalue(self._first),
+            geometry=geometry
+        )
@@ -0,0 +1,223 @@
+"""Accounting of the native libdmtx objects created by pylibdmtx.
+
+Disabled by default, when it costs one test per native object. Enable it
+with `enable()` or by setting the environment variable
+`PYLIBDMTX_DIAGNOSTICS=1` before importing pylibdmtx:
+
+    >>> from pylibdmtx import diagnostics
+    >>> diagnostics.enable()
+    >>> decode(image)
+    >>> diagnostics.stats()['DmtxDecode'].peak_bytes
+
+Bytes are those of the native structure plus the buffers it refers to:
+the pixels of a `DmtxImage`, the per-pixel `cache` of a `DmtxDecode`, the
+arrays of a `DmtxMessage` and the message and image of a `DmtxEncode`. The
+pixels of a `DmtxImage` belong to the Python object that was decoded; they
+are counted because they are held for the life of the image.
+
+Objects that are still live when the interpreter exits are reported on
+stderr.
+"""
+from __future__ import print_function
+
+import atexit
+import os
+import sys
+import threading
+from collections import namedtuple
+from ctypes import addressof, sizeof
+
+__all__ = [
+    'KINDS', 'NativeStats', 'disable', 'enable', 'enabled', 'leaks',
+    'reset', 'stats', 'summary'
+]
+
+# Types of native object that are counted
+KINDS = ['DmtxImage', 'DmtxDecode', 'DmtxRegion', 'DmtxMessage', 'DmtxEncode']
+
+# Counters of a type of native object
+NativeStats = namedtuple(
+    'NativeStats', 'live peak created destroyed bytes peak_bytes'
+)
+
+_ENABLED = False
+_lock = threading.Lock()
+# Address of each live object to (kind, bytes)
+_live = {}
+# Kind to a list of counters in the order of NativeStats
+_counters = {}
+_atexit_registered = False
+
+
+def _buffer_bytes(kind, contents):
+    """Returns the number of bytes of the buffers that `contents`, a native
+    object of `kind`, refers to.
+    """
+    if 'DmtxImage' == kind:
+        return contents.width * contents.height * contents.bytesPerPixel
+    elif 'DmtxDecode' == kind:
+        image = contents.image.contents
+        scale = contents.scale or 1
+        return (image.width // scale) * (image.height // scale)
+    elif 'DmtxMessage' == kind:
+        return contents.arraySize + contents.codeSize + contents.outputSize
+    elif 'DmtxEncode' == kind:
+        nbytes = 0
+        if contents.message:
+            nbytes += sizeof(contents.message.contents)
+            nbytes += _buffer_bytes('DmtxMessage', contents.message.contents)
+        if contents.image:
+            nbytes += sizeof(contents.image.contents)
+            image = contents.image.contents
+            nbytes += image.height * image.rowSizeBytes
+        return nbytes
+    else:
+        return 0
+
+
+def _bytes(kind, pointer):
+    contents = pointer.contents
+    return sizeof(contents) + _buffer_bytes(kind, contents)
+
+
+def _reset_counters():
+    for kind in KINDS:
+        _counters[kind] = [0, 0, 0, 0, 0, 0]
+
+
+_reset_counters()
+
+
+def _created(kind, pointer):
+    """Records the creation of the native object at `pointer`.
+    """
+    if not _ENABLED or not pointer:
+        return
+    nbytes = _bytes(kind, pointer)
+    with _lock:
+        _live[addressof(pointer.contents)] = (kind, nbytes)
+        counters = _counters[kind]
+        counters[0] += 1
+        counters[1] = max(counters[1], counters[0])
+        counters[2] += 1
+        counters[4] += nbytes
+        counters[5] = max(counters[5], counters[4])
+
+
+def _updated(kind, pointer):
+    """Records a change in the size of the buffers of the native object at
+    `pointer`.
+    """
+    if not _ENABLED or not pointer:
+        return
+    nbytes = _bytes(kind, pointer)
+    with _lock:
+        address = addressof(pointer.contents)
+        if address in _live:
+            counters = _counters[kind]
+            counters[4] += nbytes - _live[address][1]
+            counters[5] = max(counters[5], counters[4])
+            _live[address] = (kind, nbytes)
+
+
+def _destroyed(pointer):
+    """Records that the native object at `pointer` is about to be destroyed.
+    """
+    if not _ENABLED or not pointer:
+        return
+    with _lock:
+        entry = _live.pop(addressof(pointer.contents), None)
+        if entry:
+            kind, nbytes = entry
+            counters = _counters[kind]
+            counters[0] -= 1
+            counters[3] += 1
+            counters[4] -= nbytes
+
+
+def enable(report_leaks=True):
+    """Starts counting native objects.
+
+    Args:
+        report_leaks (bool): If to write the objects that are still live to
+            stderr when the interpreter exits.
+    """
+    global _ENABLED, _atexit_registered
+    _ENABLED = True
+    if report_leaks and not _atexit_registered:
+        atexit.register(_report_leaks)
+        _atexit_registered = True
+
+
+def disable():
+    """Stops counting native objects. Counts are kept until `reset`.
+    """
+    global _ENABLED
+    _ENABLED = False
+
+
+def enabled():
+    """Returns `True` if native objects are being counted.
+    """
+    return _ENABLED
+
+
+def reset():
+    """Resets the counters. Objects that are live are forgotten.
+    """
+    with _lock:
+        _live.clear()
+        _reset_counters()
+
+
+def stats():
+    """Returns the counts of each type of native object.
+
+    Returns:
+        dict: Of type name, one of `KINDS`, to `NativeStats`.
+    """
+    with _lock:
+        return dict(
+            (kind, NativeStats(*_counters[kind])) for kind in KINDS
+        )
+
+
+def leaks():
+    """Returns the number of live objects of each type that has any.
+
+    Returns:
+        dict: Of type name to the number of live objects.
+    """
+    return dict(
+        (kind, s.live) for kind, s in stats().items() if s.live
+    )
+
+
+def summary():
+    """Returns a table of `stats` as a str.
+    """
+    row = '{0:<12} {1:>6} {2:>6} {3:>9} {4:>9} {5:>10} {6:>10}'
+    current = stats()
+    lines = [row.format(
+        'type', 'live', 'peak', 'created', 'destroyed', 'bytes', 'peak bytes'
+    )]
+    lines.extend(row.format(kind, *current[kind]) for kind in KINDS)
+    return '\n'.join(lines)
+
+
+def _report_leaks():
+    found = leaks()
+    if _ENABLED and found:
+        print(
+            'pylibdmtx: native objects not destroyed at exit: {0}'.format(
+                ', '.join(
+                    '{0} {1}'.format(found[kind], kind)
+                    for kind in KINDS if kind in found
+                )
+            ),
+            file=sys.stderr
+        )
+
+
+if os.environ.get('PYLIBDMTX_DIAGNOSTICS', '').lower() in ('1', 'true'):
+    enable()
@@ -0,0 +1,225 @@
+"""Decoding in supervised worker processes with a hard time limit.
+
+The `timeout` argument of `decode` is only checked between regions, so a
+pathological image can hold a worker for much longer. `IsolatedDecoder` runs
+`decode` in worker processes and kills a worker that does not return within
+`hard_timeout` seconds, raising `PyLibDMTXTimeout`. A warm spare process
+replaces it at once, so the cost of a kill is small.
+
+    >>> with IsolatedDecoder(workers=4, hard_timeout=2) as decoder:
+    ...     decoder.decode(image, max_count=1)
+"""
+import multiprocessing
+import os
+import signal
+import threading
+
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+from .pylibdmtx_error import PyLibDMTXError, PyLibDMTXTimeout
+
+__all__ = ['IsolatedDecoder']
+
+# Seconds to wait for a new worker to load libdmtx
+_START_TIMEOUT = 60
+
+# Seconds to wait for a worker to exit on SIGTERM before it is sent SIGKILL
+_KILL_TIMEOUT = 1
+
+
+def _serve(conn):
+    """The loop of a worker process: decodes each (pixels, width, height,
+    kwargs) received on `conn` and sends back (True, results) or
+    (False, exception).
+    """
+    from .pylibdmtx import decode
+
+    conn.send('ready')
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        pixels, width, height, kwargs = request
+        try:
+            response = (True, decode((pixels, width, height), **kwargs))
+        except Exception as e:
+            response = (False, e)
+        conn.send(response)
+    conn.close()
+
+
+class _Worker(object):
+    """A worker process and the parent's end of its pipe. `target` is the
+    loop of the process, which is given the child's end and should send
+    'ready' once it has loaded libdmtx.
+    """
+    def __init__(self, context, target=_serve):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=target, args=(child,))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def wait_ready(self):
+        """Blocks until the worker has loaded libdmtx.
+
+        Raises:
+            PyLibDMTXError: If the worker did not start.
+        """
+        if not self.ready:
+            try:
+                if not self.conn.poll(_START_TIMEOUT):
+                    raise EOFError()
+                self.ready = 'ready' == self.conn.recv()
+            except (EOFError, OSError):
+                self.ready = False
+            if not self.ready:
+                self.kill()
+                raise PyLibDMTXError('Could not start worker process')
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(_KILL_TIMEOUT)
+        if self.process.is_alive() and hasattr(signal, 'SIGKILL'):
+            # SIGTERM is not acted on by a stopped worker, or one with a
+            # handler that is stuck in libdmtx
+            os.kill(self.process.pid, signal.SIGKILL)
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self.process.join(1)
+        self.kill()
+
+
+class IsolatedDecoder(object):
+    """Runs `decode` in supervised worker processes.
+
+    Args:
+        workers (int): Number of worker processes, which is the number of
+            images that can be decoded at the same time.
+        hard_timeout (float): Seconds after which a decode is abandoned and
+            its worker killed; `None` for no limit.
+        spare (bool): If to keep a started worker ready to replace one that
+            is killed.
+        context: A `multiprocessing` context, or `None` for the default.
+    """
+    def __init__(self, workers=1, hard_timeout=10.0, spare=True,
+                 context=None):
+        if workers < 1:
+            raise ValueError('Invalid workers [{0}]'.format(workers))
+        elif hard_timeout is not None and hard_timeout <= 0:
+            raise ValueError('Invalid hard_timeout [{0}]'.format(hard_timeout))
+
+        self.hard_timeout = hard_timeout
+        self.kills = 0
+        self._context = context if context else multiprocessing
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._workers = []
+        self._closed = False
+        for _ in range(workers):
+            worker = self._start()
+            self._idle.put(worker)
+        self._spare = self._start() if spare else None
+        for worker in self._workers:
+            worker.wait_ready()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start(self):
+        worker = _Worker(self._context)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker):
+        """Kills `worker` and returns its replacement, the spare if there is
+        one.
+        """
+        worker.kill()
+        with self._lock:
+            self._workers.remove(worker)
+            replacement, self._spare = self._spare, None
+        if replacement is None:
+            replacement = self._start()
+        else:
+            self._spare = self._start()
+        return replacement
+
+    def decode(self, image, hard_timeout=None, **kwargs):
+        """Decodes `image` in a worker process.
+
+        Args:
+            image: As for `decode`.
+            hard_timeout (float): Seconds for this call; `None` for the
+                limit given to the constructor.
+            **kwargs: Arguments to `decode`.
+
+        Returns:
+            :obj:`list` of :obj:`Decoded`: As `decode`.
+
+        Raises:
+            PyLibDMTXTimeout: If `image` was not decoded in time.
+            PyLibDMTXError: If the worker failed, or as `decode`.
+        """
+        from .pylibdmtx import _pixel_data
+
+        if self._closed:
+            raise PyLibDMTXError('IsolatedDecoder is closed')
+
+        limit = self.hard_timeout if hard_timeout is None else hard_timeout
+        pixels, width, height, bpp = _pixel_data(image)
+        worker = self._idle.get()
+        try:
+            worker.wait_ready()
+            worker.conn.send((pixels, width, height, kwargs))
+            if not worker.conn.poll(limit):
+                with self._lock:
+                    self.kills += 1
+                raise PyLibDMTXTimeout(
+                    'Decode did not finish within {0} seconds'.format(limit)
+                )
+            try:
+                success, result = worker.conn.recv()
+            except (EOFError, OSError):
+                raise PyLibDMTXError('Worker process died while decoding')
+        except BaseException:
+            # The worker may still be decoding, or be dead
+            self._idle.put(self._replace(worker))
+            raise
+        else:
+            self._idle.put(worker)
+
+        if success:
+            return result
+        else:
+            raise result
+
+    def close(self):
+        """Stops all worker processes.
+        """
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._spare = None
+        for worker in workers:
+            worker.stop()
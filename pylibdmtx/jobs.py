@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""Resumable decoding of very many images, listed in a manifest, by any
+number of processes on any number of machines that share a filesystem.
+
+    python -m pylibdmtx.jobs MANIFEST OUTPUT [--chunk-size N] [-j JOBS]
+        [--lease SECONDS] [--path-column NAME] [--pages] [--status]
+        [--<decode args>]
+
+The manifest is a text file of paths, one per line, or a CSV file with a
+column of paths. It is divided into chunks of `chunk_size` images. A process
+claims a chunk by creating a claim file in `OUTPUT/claims`, decodes its images
+over a pool of worker processes and writes their results, as the JSON lines
+of `read_datamatrix --json`, to a temporary file that it then renames to
+`OUTPUT/shards/chunk-NNNNNNNN.jsonl`. A chunk whose shard exists is done; the
+shards are the checkpoint.
+
+The claim file is touched every few seconds while its chunk is decoded, by
+a thread, so that a chunk with slow images keeps its claim. A claim that has
+not been touched for `lease` seconds - its process died or its machine was
+rebooted - is taken over by creating a claim of the next generation, which
+only one process can do. Restarting a job, or starting it on more machines,
+continues with the chunks that are neither done nor claimed.
+"""
+from __future__ import print_function
+
+import argparse
+import csv
+import errno
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from .reader import DECODE_ARGUMENTS, DECODE_TYPES, read_image
+
+__all__ = ['progress', 'run']
+
+# Name of the claim and shard files of a chunk
+_CHUNK = 'chunk-{0:08d}'
+
+# Seconds between touches of a claim
+_HEARTBEAT = 5.0
+
+
+def _manifest(path, path_column):
+    """Yields the paths of the images in the manifest at `path`.
+    """
+    if path.lower().endswith('.csv') and sys.version_info[0] < 3:
+        # csv reads only bytes on Python 2
+        with open(path, 'rb') as f:
+            for row in csv.DictReader(f):
+                yield row[path_column].decode('utf-8')
+        return
+
+    with io.open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            for row in csv.DictReader(f):
+                yield row[path_column]
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def _chunks(paths, chunk_size):
+    """Yields (index, list of paths) of each chunk of `paths`.
+    """
+    chunk = []
+    index = 0
+    for path in paths:
+        chunk.append(path)
+        if chunk_size == len(chunk):
+            yield index, chunk
+            chunk = []
+            index += 1
+    if chunk:
+        yield index, chunk
+
+
+def _create(path, owner):
+    """Creates the file `path`, which must not exist, holding `owner`.
+    Returns False if it exists.
+    """
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except OSError as e:
+        if errno.EEXIST == e.errno:
+            return False
+        raise
+    with os.fdopen(fd, 'w') as f:
+        f.write(owner)
+    return True
+
+
+def _claim(claims, name, owner, lease):
+    """Returns the path of a new claim of chunk `name` by `owner`, or `None`
+    if another process holds a claim that has not expired.
+    """
+    generation = 0
+    while True:
+        path = os.path.join(claims, '{0}.{1}'.format(name, generation))
+        if _create(path, owner):
+            return path
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except OSError:
+            # Claims are never removed, so this is unexpected
+            return None
+        if age < lease:
+            return None
+        # Expired; try to take over with the next generation
+        generation += 1
+
+
+@contextmanager
+def _heartbeat(claim):
+    """Touches the file `claim` every `_HEARTBEAT` seconds, from a thread,
+    until the context exits.
+    """
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(_HEARTBEAT):
+            try:
+                os.utime(claim, None)
+            except OSError:
+                # Tried again at the next beat
+                pass
+
+    thread = threading.Thread(target=beat)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def _results(tasks, pool):
+    """Yields the results of `read_image` for each of `tasks`, in order.
+    """
+    if pool is None:
+        return (read_image(task) for task in tasks)
+    else:
+        return pool.imap(read_image, tasks, chunksize=1)
+
+
+def run(manifest, output, chunk_size=1000, jobs=1, lease=600.0,
+        path_column='path', pages=False, **kwargs):
+    """Decodes the images in `manifest` that are not done and not claimed by
+    another process.
+
+    Args:
+        manifest (str): Path of a text file of paths, one per line, or of a
+            CSV file, if it ends in '.csv'.
+        output (str): Directory of claims and shards, created if needed.
+        chunk_size (int): Number of images in each chunk. Must be the same
+            for all processes that share `output`.
+        jobs (int): Number of worker processes.
+        lease (float): Seconds after which a claim that has not been touched
+            may be taken over.
+        path_column (str): Column of paths in a CSV manifest.
+        pages (bool): If to decode every page of multi-page images.
+        **kwargs: Arguments to `decode`.
+
+    Returns:
+        dict: Numbers of chunks written and skipped, because they were done
+        or claimed, and of images and errors in the chunks written.
+    """
+    if chunk_size < 1:
+        raise ValueError('Invalid chunk_size [{0}]'.format(chunk_size))
+    elif jobs < 1:
+        raise ValueError('Invalid jobs [{0}]'.format(jobs))
+
+    claims = os.path.join(output, 'claims')
+    shards = os.path.join(output, 'shards')
+    for directory in (claims, shards):
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Created by another process
+                if not os.path.isdir(directory):
+                    raise
+
+    owner = '{0}-{1}-{2}'.format(
+        socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8]
+    )
+    summary = {'written': 0, 'skipped': 0, 'images': 0, 'errors': 0}
+
+    if jobs > 1:
+        from multiprocessing import Pool
+        pool = Pool(jobs)
+    else:
+        pool = None
+
+    try:
+        for index, paths in _chunks(_manifest(manifest, path_column),
+                                    chunk_size):
+            name = _CHUNK.format(index)
+            shard = os.path.join(shards, name + '.jsonl')
+            if os.path.exists(shard):
+                summary['skipped'] += 1
+                continue
+
+            claim = _claim(claims, name, owner, lease)
+            if not claim or os.path.exists(shard):
+                summary['skipped'] += 1
+                continue
+
+            temporary = '{0}.{1}.tmp'.format(shard, owner)
+            with _heartbeat(claim):
+                with io.open(temporary, 'w', encoding='utf-8') as f:
+                    tasks = ((path, kwargs, pages) for path in paths)
+                    for result, data in _results(tasks, pool):
+                        summary['errors'] += 'error' in result
+                        f.write(u'{0}\n'.format(
+                            json.dumps(result, sort_keys=True)
+                        ))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            # Atomic; the chunk is now done
+            os.rename(temporary, shard)
+            summary['written'] += 1
+            summary['images'] += len(paths)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return summary
+
+
+def _chunk_names(directory, suffix=''):
+    """Returns the set of names of chunks of the files in `directory` that end
+    with `suffix`.
+    """
+    if not os.path.isdir(directory):
+        return set()
+    return set(
+        f.split('.')[0] for f in os.listdir(directory) if f.endswith(suffix)
+    )
+
+
+def progress(output):
+    """Returns a dict of the numbers of chunks done and claimed but not done
+    in `output`.
+    """
+    done = _chunk_names(os.path.join(output, 'shards'), '.jsonl')
+    claimed = _chunk_names(os.path.join(output, 'claims'))
+    return {'done': len(done), 'in_progress': len(claimed - done)}
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        description='Resumable decoding of the images in a manifest'
+    )
+    parser.add_argument(
+        'manifest',
+        help="File of paths, one per line, or a CSV file ending '.csv'"
+    )
+    parser.add_argument('output', help='Directory of claims and shards')
+    parser.add_argument(
+        '--chunk-size', type=int, default=1000,
+        help='Images in each chunk; the same for all processes of a job'
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='Number of worker processes; default is 1'
+    )
+    parser.add_argument(
+        '--lease', type=float, default=600.0,
+        help='Seconds after which an untouched claim is taken over'
+    )
+    parser.add_argument(
+        '--path-column', default='path', help='Column of paths in a CSV file'
+    )
+    parser.add_argument(
+        '--pages', action='store_true',
+        help='Read every page of multi-page images'
+    )
+    parser.add_argument(
+        '--status', action='store_true',
+        help='Report the numbers of chunks done and in progress and exit'
+    )
+    for name, help in DECODE_ARGUMENTS:
+        parser.add_argument(
+            '--' + name.replace('_', '-'), type=DECODE_TYPES.get(name, int),
+            help=help
+        )
+    args = parser.parse_args(args)
+
+    if args.status:
+        print(json.dumps(progress(args.output), sort_keys=True))
+        return 0
+
+    kwargs = dict(
+        (name, getattr(args, name)) for name, _ in DECODE_ARGUMENTS
+        if getattr(args, name) is not None
+    )
+    summary = run(
+        args.manifest, args.output, args.chunk_size, args.jobs, args.lease,
+        args.path_column, args.pages, **kwargs
+    )
+    print(json.dumps(summary, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,426 @@
+"""A pipeline of vectorised preprocessing stages - crop, downsample, contrast
+normalisation, adaptive threshold, invert - run on an image before it is
+decoded.
+
+Stages write into buffers that the pipeline keeps and reuses from one image to
+the next, or change the pixels in place, so that a run allocates no
+full-size intermediates once the pipeline has seen an image of the same size.
+The time taken by each stage is recorded, and `compare` decodes sample images
+through every combination of stages to find the cheapest that still reads
+them.
+
+    >>> from pylibdmtx.preprocess import Downsample, Normalise, Pipeline
+    >>> pipeline = Pipeline([Downsample(2), Normalise()])
+    >>> pipeline.decode(image, max_count=1)
+    [Decoded(data=b'Stegosaurus', rect=Rect(left=4, top=6, width=96, ...))]
+    >>> pipeline.timings
+    [('grey', 0.0003), ('Downsample', 0.0011), ('Normalise', 0.0004),
+     ('decode', 0.0215)]
+
+Requires numpy.
+"""
+import itertools
+import timeit
+from collections import namedtuple
+
+import numpy as np
+
+from . import pylibdmtx
+from .pylibdmtx import (
+    _bpp, _is_array, _pixel_data, Decoded, Rect, Rect_vertices
+)
+
+__all__ = [
+    'Crop', 'Downsample', 'Invert', 'Normalise', 'Pipeline', 'Stage',
+    'Threshold', 'Trial', 'compare',
+]
+
+# Results of decoding sample images through one combination of stages: the
+# stages, the number of images in which a barcode was read and the seconds
+# taken to preprocess and decode them all
+Trial = namedtuple('Trial', 'stages decoded seconds')
+
+
+class _Buffers(object):
+    """Arrays, by key, that are reused while their shape and dtype are
+    unchanged.
+    """
+    def __init__(self):
+        self._arrays = {}
+
+    def get(self, key, shape, dtype):
+        array = self._arrays.get(key)
+        if array is None or array.shape != shape or array.dtype != dtype:
+            array = self._arrays[key] = np.empty(shape, dtype=dtype)
+        return array
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self._arrays.values())
+
+
+class Stage(object):
+    """The base of the steps of a `Pipeline`, which is abstract.
+
+    Subclasses define `apply(pixels, buffers)`, which is given a 2D uint8
+    array of grey pixels and a `_Buffers` and returns the pixels after the
+    stage: a view of them, new values in a buffer from `buffers` or, if
+    `in_place`, the same array with its values changed. Subclasses that
+    crop or scale also define `origin`.
+    """
+    # If `apply` changes the values of the array that it is given
+    in_place = False
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def __repr__(self):
+        return '{0}({1})'.format(self.name, ', '.join(
+            '{0}={1!r}'.format(k, v) for k, v in sorted(vars(self).items())
+        ))
+
+    def origin(self, shape):
+        """Returns (left, bottom, factor) of the output of the stage for an
+        input of `shape`: a point (x, y) in the output is at
+        (left + factor * x, bottom + factor * y) in the input, with y
+        measured from the bottom, as are the rects returned by `decode`.
+        """
+        return 0, 0, 1
+
+
+class Crop(Stage):
+    """A part of the image, without copying.
+
+    Args:
+        left, top, width, height (int): Pixels of the part, in the
+            coordinates of the rects returned by `decode`, as for its `roi`
+            argument. Clipped to the image.
+    """
+    def __init__(self, left, top, width, height):
+        self.roi = (left, top, width, height)
+
+    def _bounds(self, shape):
+        """Returns the (row, col, rows, cols) of the part of an array of
+        `shape`.
+        """
+        height, width = shape
+        left, top, roi_width, roi_height = self.roi
+        x0, y0 = max(left, 0), max(top, 0)
+        x1 = min(left + roi_width, width)
+        y1 = min(top + roi_height, height)
+        if x0 >= x1 or y0 >= y1:
+            raise ValueError(
+                'Invalid crop [{0}]: not within the image of {1} x '
+                '{2}'.format(self.roi, width, height)
+            )
+        # Rows of the array are from the top
+        return height - y1, x0, y1 - y0, x1 - x0
+
+    def apply(self, pixels, buffers):
+        row, col, rows, cols = self._bounds(pixels.shape)
+        return pixels[row:row + rows, col:col + cols]
+
+    def origin(self, shape):
+        row, col, rows, cols = self._bounds(shape)
+        return col, shape[0] - (row + rows), 1
+
+
+class Downsample(Stage):
+    """The mean of each `factor` x `factor` block of pixels. Rows and columns
+    beyond the last whole block are dropped.
+    """
+    def __init__(self, factor=2):
+        if factor < 1:
+            raise ValueError('Invalid factor [{0}]'.format(factor))
+        self.factor = factor
+
+    def apply(self, pixels, buffers):
+        factor = self.factor
+        rows, cols = pixels.shape[0] // factor, pixels.shape[1] // factor
+        blocks = pixels[:rows * factor, :cols * factor].reshape(
+            rows, factor, cols, factor
+        )
+        sums = buffers.get('sums', (rows, cols), np.uint32)
+        blocks.sum(axis=(1, 3), dtype=np.uint32, out=sums)
+        # Round to nearest
+        np.add(sums, factor * factor // 2, out=sums)
+        out = buffers.get('out', (rows, cols), np.uint8)
+        np.floor_divide(sums, factor * factor, out=out, casting='unsafe')
+        return out
+
+    def origin(self, shape):
+        # Dropped rows are at the bottom
+        return 0, shape[0] % self.factor, self.factor
+
+
+class Normalise(Stage):
+    """Stretches the contrast so that the `low` and `high` percentiles of the
+    grey values become black and white.
+    """
+    in_place = True
+
+    def __init__(self, low=1.0, high=99.0):
+        if not 0 <= low < high <= 100:
+            raise ValueError('Invalid percentiles [{0}, {1}]'.format(
+                low, high
+            ))
+        self.low, self.high = low, high
+
+    def apply(self, pixels, buffers):
+        # Percentiles of a sample of the pixels
+        low, high = np.percentile(pixels[::4, ::4], (self.low, self.high))
+        if high <= low:
+            return pixels
+        # In a float32 buffer, as a lookup table would index with intp
+        values = buffers.get('values', pixels.shape, np.float32)
+        np.subtract(pixels, np.float32(low), out=values)
+        np.multiply(values, np.float32(255.0 / (high - low)), out=values)
+        np.clip(values, 0, 255, out=values)
+        np.rint(values, out=values)
+        np.copyto(pixels, values, casting='unsafe')
+        return pixels
+
+
+class Threshold(Stage):
+    """Black pixels that are darker by more than `offset` than the mean of
+    the `block` x `block` pixels around them, and white others.
+    """
+    in_place = True
+
+    def __init__(self, block=31, offset=10):
+        if block < 1:
+            raise ValueError('Invalid block [{0}]'.format(block))
+        self.block, self.offset = block, offset
+
+    def apply(self, pixels, buffers):
+        height, width = pixels.shape
+        radius = self.block // 2
+
+        # Sums over the block, clipped to the image, from the cumulative
+        # sums of the columns and then of the rows
+        columns = buffers.get('columns', (height + 1, width), np.int32)
+        columns[0] = 0
+        np.cumsum(pixels, axis=0, dtype=np.int32, out=columns[1:])
+        rows_end = np.minimum(np.arange(height) + radius + 1, height)
+        rows_start = np.maximum(np.arange(height) - radius, 0)
+        vertical = buffers.get('vertical', (height, width), np.int32)
+        below = buffers.get('below', (height, width), np.int32)
+        np.take(columns, rows_end, axis=0, out=vertical, mode='clip')
+        np.take(columns, rows_start, axis=0, out=below, mode='clip')
+        np.subtract(vertical, below, out=vertical)
+
+        rows = buffers.get('rows', (height, width + 1), np.int64)
+        rows[:, 0] = 0
+        np.cumsum(vertical, axis=1, dtype=np.int64, out=rows[:, 1:])
+        cols_end = np.minimum(np.arange(width) + radius + 1, width)
+        cols_start = np.maximum(np.arange(width) - radius, 0)
+        sums = buffers.get('sums', (height, width), np.int64)
+        scaled = buffers.get('scaled', (height, width), np.int64)
+        np.take(rows, cols_end, axis=1, out=sums, mode='clip')
+        np.take(rows, cols_start, axis=1, out=scaled, mode='clip')
+        np.subtract(sums, scaled, out=sums)
+
+        # Dark if (pixel + offset) * area < sum, avoiding division
+        np.add(pixels, self.offset, out=scaled, dtype=np.int64)
+        np.multiply(scaled, (rows_end - rows_start)[:, None], out=scaled)
+        np.multiply(scaled, cols_end - cols_start, out=scaled)
+        dark = buffers.get('dark', (height, width), np.bool_)
+        np.less(scaled, sums, out=dark)
+
+        pixels.fill(255)
+        np.copyto(pixels, 0, where=dark)
+        return pixels
+
+
+class Invert(Stage):
+    """Light symbols on a dark background made dark on light.
+    """
+    in_place = True
+
+    def apply(self, pixels, buffers):
+        np.subtract(255, pixels, out=pixels)
+        return pixels
+
+
+class Pipeline(object):
+    """Stages run in turn on greyscale copies or views of images.
+
+    The array returned by a run, and the buffers behind it, are reused by
+    the next run, so a pipeline should be used by one thread at a time.
+
+    Args:
+        stages: A sequence of `Stage`.
+
+    Raises:
+        ValueError: If a stage does not define `apply`.
+    """
+    def __init__(self, stages):
+        self.stages = list(stages)
+        for stage in self.stages:
+            if not callable(getattr(stage, 'apply', None)):
+                raise ValueError(
+                    'Invalid stage [{0!r}]: should define apply'.format(stage)
+                )
+        # Buffers of the conversion to grey, of copies made before in-place
+        # stages, of each stage and of the copy made for decode
+        self._buffers = {}
+        # (name, seconds) of the conversion to grey, each stage and, after
+        # `decode`, decoding, in the last run
+        self.timings = []
+
+    def _get(self, key):
+        buffers = self._buffers.get(key)
+        if buffers is None:
+            buffers = self._buffers[key] = _Buffers()
+        return buffers
+
+    @property
+    def nbytes(self):
+        """The number of bytes of all buffers.
+        """
+        return sum(b.nbytes for b in self._buffers.values())
+
+    def _grey(self, image):
+        """Returns (`image` as a 2D uint8 array, True if the array is one of
+        the pipeline's buffers rather than a view of `image`).
+        """
+        if _is_array(image) or 'PIL.' in str(type(image)):
+            # A view of a uint8 array, where _pixel_data would copy it
+            array = np.asarray(image)
+            if np.uint8 != array.dtype:
+                array = array.astype(np.uint8)
+            height, width = array.shape[:2]
+            channels = _bpp(array.size, width, height) // 8
+        else:
+            pixels, width, height, bpp = _pixel_data(image)
+            channels = bpp // 8
+            array = np.frombuffer(pixels, dtype=np.uint8)
+        array = array.reshape(height, width, channels)
+        if channels < 3:
+            return array[:, :, 0], False
+
+        # Integer luma weights that sum to 256
+        buffers = self._get('grey')
+        luma = buffers.get('luma', (height, width), np.uint16)
+        weighted = buffers.get('weighted', (height, width), np.uint16)
+        np.multiply(array[:, :, 0], 77, out=luma, dtype=np.uint16)
+        for channel, weight in ((1, 150), (2, 29)):
+            np.multiply(
+                array[:, :, channel], weight, out=weighted, dtype=np.uint16
+            )
+            np.add(luma, weighted, out=luma)
+        np.right_shift(luma, 8, out=luma)
+        grey = buffers.get('grey', (height, width), np.uint8)
+        np.copyto(grey, luma, casting='unsafe')
+        return grey, True
+
+    def run(self, image):
+        """Returns `image`, as given to `decode`, after all stages, and the
+        (left, bottom, factor) of the result in the coordinates of `image` -
+        see `Stage.origin`.
+
+        The result is valid until the next run.
+        """
+        timings = []
+        start = timeit.default_timer()
+        pixels, owned = self._grey(image)
+        timings.append(('grey', timeit.default_timer() - start))
+
+        left, bottom, scale = 0, 0, 1
+        for index, stage in enumerate(self.stages):
+            start = timeit.default_timer()
+            if stage.in_place and not owned:
+                # Never change the caller's pixels
+                copy = self._get(('copy', index)).get(
+                    'copy', pixels.shape, np.uint8
+                )
+                np.copyto(copy, pixels)
+                pixels, owned = copy, True
+            x, y, factor = stage.origin(pixels.shape)
+            result = stage.apply(pixels, self._get(index))
+            # A view of the input of the stage is owned only if its input is
+            owned = owned or not np.may_share_memory(result, pixels)
+            pixels = result
+            left, bottom = left + scale * x, bottom + scale * y
+            scale *= factor
+            timings.append((stage.name, timeit.default_timer() - start))
+
+        self.timings = timings
+        return pixels, (left, bottom, scale)
+
+    def __call__(self, image):
+        """Returns `image`, as given to `decode`, after all stages.
+        """
+        return self.run(image)[0]
+
+    def _decodable(self, pixels):
+        """Returns the result of a run as (pixels, width, height), which
+        `decode` reads without a copy.
+        """
+        if not (pixels.flags['C_CONTIGUOUS'] and pixels.flags['WRITEABLE']):
+            # A view of part of the caller's pixels, or of pixels that
+            # ctypes can not point into
+            contiguous = self._get('decode').get(
+                'pixels', pixels.shape, np.uint8
+            )
+            np.copyto(contiguous, pixels)
+            pixels = contiguous
+        height, width = pixels.shape
+        return pixels.reshape(-1), width, height
+
+    def decode(self, image, **kwargs):
+        """Decodes `image` after all stages.
+
+        Args:
+            image: As for `decode`.
+            **kwargs: Arguments to `decode`.
+
+        Returns:
+            :obj:`list` of :obj:`Decoded`: As `decode`, with rects or
+            vertices in the coordinates of `image`.
+        """
+        pixels, (left, bottom, scale) = self.run(image)
+        start = timeit.default_timer()
+        decoded = pylibdmtx.decode(self._decodable(pixels), **kwargs)
+        self.timings.append(('decode', timeit.default_timer() - start))
+
+        def point(x, y):
+            return left + scale * x, bottom + scale * y
+
+        results = []
+        for data, rect in decoded:
+            if isinstance(rect, Rect):
+                x, y = point(rect.left, rect.top)
+                rect = Rect(x, y, scale * rect.width, scale * rect.height)
+            else:
+                rect = Rect_vertices(*(point(*p) for p in rect))
+            results.append(Decoded(data, rect))
+        return results
+
+
+def compare(images, stages, **kwargs):
+    """Decodes `images` through every combination of `stages`, in their
+    order, including none of them.
+
+    Args:
+        images: A sequence of sample images, each as for `decode`.
+        stages: A sequence of `Stage`.
+        **kwargs: Arguments to `decode`.
+
+    Returns:
+        :obj:`list` of :obj:`Trial`: Best first - those that read a barcode
+        in the most images, the quickest first.
+    """
+    stages = list(stages)
+    trials = []
+    for count in range(len(stages) + 1):
+        for combination in itertools.combinations(stages, count):
+            pipeline = Pipeline(combination)
+            decoded, seconds = 0, 0.0
+            for image in images:
+                decoded += bool(pipeline.decode(image, **kwargs))
+                seconds += sum(s for _, s in pipeline.timings)
+            trials.append(Trial(list(combination), decoded, seconds))
+    trials.sort(key=lambda t: (-t.decoded, t.seconds))
+    return trials
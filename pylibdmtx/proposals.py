@@ -0,0 +1,254 @@
+"""Proposals of the regions of an image that might hold a Data Matrix, so that
+libdmtx need not scan all of a large image that is mostly background or text.
+
+A quick vectorised pass over the image finds cells that, with their
+neighbours, contain many edges and many dark pixels - the modules of a symbol
+rather than the thin strokes of text and lines. Connected groups of these
+cells, which are surrounded by cells that are not - the quiet zone - and that
+are of a plausible size and shape for a symbol are proposed. Proposals are
+ranked by the length of the solid dark lines that meet in them relative to
+their size - the L-shaped finder pattern of a symbol - and libdmtx then
+searches only within them.
+
+    >>> from pylibdmtx.proposals import decode, propose
+    >>> propose(image)
+    [Proposal(left=1210, top=388, width=112, height=104, score=0.93), ...]
+    >>> decode(image, fallback=True)
+
+Requires numpy.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import pylibdmtx
+from .pylibdmtx import _is_array, _pixel_data
+
+__all__ = ['Proposal', 'decode', 'propose']
+
+# A region in the coordinates of the rects returned by `decode` and its
+# finder score between 0 and 1
+Proposal = namedtuple('Proposal', 'left top width height score')
+
+
+def _grey(image, scratch=None):
+    """Returns `image`, as given to `decode`, as a 2D array of grey values,
+    and a list of the buffers from `scratch` that hold it.
+    """
+    pixels, width, height, bpp = _pixel_data(image, scratch)
+    buffers = [pixels] if scratch is not None and _is_array(image) else []
+    channels = bpp // 8
+    # A buffer from `scratch` may be longer than the pixels
+    array = np.frombuffer(
+        pixels, dtype=np.uint8, count=height * width * channels
+    ).reshape(height, width, channels)
+    if 1 == channels:
+        return array[:, :, 0], buffers
+
+    # The mean of the colours, truncated, without a float intermediate
+    shape = (height, width)
+    if scratch is None:
+        total, grey = np.empty(shape, np.uint16), np.empty(shape, np.uint8)
+    else:
+        buffers.append(scratch.acquire(2 * height * width))
+        buffers.append(scratch.acquire(height * width))
+        total = np.frombuffer(
+            buffers[-2], dtype=np.uint16, count=height * width
+        ).reshape(shape)
+        grey = np.frombuffer(
+            buffers[-1], dtype=np.uint8, count=height * width
+        ).reshape(shape)
+    np.sum(array[:, :, :3], axis=2, dtype=np.uint16, out=total)
+    np.floor_divide(total, 3, out=grey, casting='unsafe')
+    return grey, buffers
+
+
+def _cells(values, cell):
+    """Returns the mean of `values` over each `cell` x `cell` block and its
+    eight neighbouring blocks.
+    """
+    rows, cols = values.shape[0] // cell, values.shape[1] // cell
+    blocks = values[:rows * cell, :cols * cell].reshape(rows, cell, cols, cell)
+    means = blocks.mean(axis=(1, 3))
+    padded = np.pad(means, 1, mode='edge')
+    return sum(
+        padded[dy:dy + rows, dx:dx + cols]
+        for dy in range(3) for dx in range(3)
+    ) / 9.0
+
+
+def _features(grey, cell, contrast):
+    """Returns the edge density and dark fraction of each cell of `grey`.
+
+    A pixel is an edge if it differs by more than `contrast` from its right
+    or lower neighbour and dark if it is darker than halfway between the
+    darkest and lightest values in `grey`.
+    """
+    signed = grey.astype(np.int16)
+    edges = np.zeros(grey.shape, dtype=bool)
+    edges[:, :-1] = np.abs(np.diff(signed, axis=1)) > contrast
+    edges[:-1, :] |= np.abs(np.diff(signed, axis=0)) > contrast
+
+    # Percentiles of a sample, so that a few outlying pixels do not count
+    low, high = np.percentile(grey[::4, ::4], (1, 99))
+    dark = grey < (low + high) / 2.0
+    return _cells(edges, cell), _cells(dark, cell)
+
+
+def _components(mask):
+    """Returns the (row, col, rows, cols) bounding boxes of the 8-connected
+    groups of True cells in the 2D bool array `mask`.
+    """
+    # Spread the largest label of each group over the group
+    labels = np.where(mask, np.arange(1, mask.size + 1).reshape(mask.shape), 0)
+    height, width = mask.shape
+    while True:
+        padded = np.pad(labels, 1, mode='constant')
+        spread = labels.copy()
+        for dy in range(3):
+            for dx in range(3):
+                np.maximum(
+                    spread, padded[dy:dy + height, dx:dx + width], out=spread
+                )
+        spread[~mask] = 0
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+
+    rows, cols = np.nonzero(labels)
+    if not len(rows):
+        return []
+    _, group = np.unique(labels[rows, cols], return_inverse=True)
+    count = group.max() + 1
+    top = np.full(count, height)
+    left = np.full(count, width)
+    bottom = np.zeros(count, dtype=rows.dtype)
+    right = np.zeros(count, dtype=cols.dtype)
+    np.minimum.at(top, group, rows)
+    np.minimum.at(left, group, cols)
+    np.maximum.at(bottom, group, rows)
+    np.maximum.at(right, group, cols)
+    return [
+        (int(t), int(l), int(b - t + 1), int(r - l + 1))
+        for t, l, b, r in zip(top, left, bottom, right)
+    ]
+
+
+def _longest_run(dark):
+    """Returns the length of the longest run of True along the rows of the 2D
+    bool array `dark`.
+    """
+    if not dark.size:
+        return 0
+    index = np.arange(dark.shape[1])
+    last_light = np.maximum.accumulate(np.where(dark, -1, index), axis=1)
+    return int((index - last_light).max())
+
+
+def _finder_score(crop):
+    """Returns the shorter of the longest solid dark lines along the rows and
+    the columns of `crop`, or along its two diagonals, relative to its size -
+    the sides of an L.
+    """
+    dark = crop < (int(crop.min()) + int(crop.max())) // 2
+    axes = min(_longest_run(dark), _longest_run(dark.T))
+
+    # Diagonal lines, as of a symbol rotated by 45 degrees, through shears
+    # that make them vertical
+    height, width = dark.shape
+    rows = np.arange(height)[:, None]
+    diagonals = []
+    for offset in (rows, height - 1 - rows):
+        sheared = np.zeros((height, width + height), dtype=bool)
+        sheared[rows, np.arange(width)[None, :] + offset] = dark
+        diagonals.append(_longest_run(sheared.T))
+    return min(1.0, max(axes, 1.41 * min(diagonals)) / float(max(dark.shape)))
+
+
+def propose(image, cell=8, contrast=40, min_density=0.1, min_dark=0.25,
+            min_size=16, max_aspect=4.0, min_score=0.0, scratch=None):
+    """Returns proposed regions of `image` that might hold a Data Matrix,
+    most likely first.
+
+    Args:
+        image: As for `decode`.
+        cell (int): Pixels of the side of the square cells over which edge
+            density and dark fraction are computed. Each proposal is padded
+            by two cells.
+        contrast (int): Difference in grey value between adjacent pixels
+            that is an edge.
+        min_density (float): Fraction of the pixels around a cell that are
+            edges for the cell to be part of a proposal.
+        min_dark (float): Fraction of the pixels around a cell that are dark
+            for the cell to be part of a proposal.
+        min_size (int): Pixels of the shortest side of a proposal.
+        max_aspect (float): Largest ratio of the long to the short side of a
+            proposal. Data Matrix symbols are at most 3:1.
+        min_score (float): Smallest finder score of a proposal.
+        scratch (pylibdmtx.scratch.ScratchArena): If given, the conversion
+            of `image` to grey is made in buffers from this.
+
+    Returns:
+        :obj:`list` of :obj:`Proposal`:
+    """
+    if cell < 1:
+        raise ValueError('Invalid cell [{0}]'.format(cell))
+
+    grey, buffers = _grey(image, scratch)
+    try:
+        height, width = grey.shape
+        density, dark = _features(grey, cell, contrast)
+
+        proposals = []
+        mask = (density >= min_density) & (dark >= min_dark)
+        for row, col, rows, cols in _components(mask):
+            # Pad into the quiet zone, which the averaging over neighbours
+            # eats into
+            top, left = max((row - 2) * cell, 0), max((col - 2) * cell, 0)
+            bottom = min((row + rows + 2) * cell, height)
+            right = min((col + cols + 2) * cell, width)
+            short, longest = sorted((bottom - top, right - left))
+            if short < min_size or longest > max_aspect * short:
+                continue
+
+            score = _finder_score(grey[top:bottom, left:right])
+            if score >= min_score:
+                # libdmtx, and so the rects returned by decode, measure y
+                # from the bottom of the image
+                proposals.append(Proposal(
+                    left, height - bottom, right - left, bottom - top, score
+                ))
+    finally:
+        for buffer in buffers:
+            scratch.release(buffer)
+
+    proposals.sort(key=lambda p: p.score, reverse=True)
+    return proposals
+
+
+def decode(image, fallback=False, cell=8, contrast=40, min_density=0.1,
+           min_dark=0.25, min_size=16, max_aspect=4.0, min_score=0.0,
+           **kwargs):
+    """Decodes Data Matrix barcodes within the regions proposed for `image`.
+
+    Args:
+        image: As for `decode`.
+        fallback (bool): If to decode all of `image` if no barcode was found
+            within the proposals.
+        cell, contrast, min_density, min_dark, min_size, max_aspect,
+            min_score: As for `propose`.
+        **kwargs: Other arguments to `decode`, except `roi`. `scratch` is
+            also used by `propose`.
+
+    Returns:
+        :obj:`list` of :obj:`Decoded`: As `decode`.
+    """
+    proposals = propose(
+        image, cell, contrast, min_density, min_dark, min_size, max_aspect,
+        min_score, kwargs.get('scratch')
+    )
+    rois = [tuple(proposal[:4]) for proposal in proposals]
+    decoded = pylibdmtx.decode(image, roi=rois, **kwargs) if rois else []
+    if not decoded and fallback:
+        decoded = pylibdmtx.decode(image, **kwargs)
+    return decoded
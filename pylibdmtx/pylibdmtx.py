@@ -1,11 +1,15 @@
 from __future__ import print_function
 
-import ctypes
+import math
+import re
+from binascii import hexlify
 from collections import namedtuple
 from contextlib import contextmanager
-from ctypes import byref, cast, string_at
+from ctypes import byref, c_char, c_ubyte, cast, memmove, string_at
 from functools import partial
 
+from . import diagnostics
+from .capacity import best_scheme, SYMBOL_SIZES
 from .pylibdmtx_error import PyLibDMTXError
 from .wrapper import (
     c_ubyte_p, dmtxImageCreate, dmtxImageDestroy, dmtxDecodeCreate,
@@ -18,8 +22,9 @@ from .wrapper import (
 )
 
 __all__ = [
-    'decode', 'encode', 'Encoded', 'ENCODING_SCHEME_NAMES',
-    'ENCODING_SIZE_NAMES', 'EXTERNAL_DEPENDENCIES',
+    'decode', 'decode_batch', 'decode_pages', 'encode', 'encode_matrix',
+    'Encoded', 'ENCODING_OUTPUTS', 'ENCODING_SCHEME_NAMES',
+    'ENCODING_SIZE_NAMES', 'EXTERNAL_DEPENDENCIES', 'Matrix', 'verify',
 ]
 
 ENCODING_SCHEME_PREFIX = 'DmtxScheme'
@@ -29,6 +34,11 @@ ENCODING_SCHEME_NAMES = sorted(
     n.name[len(ENCODING_SCHEME_PREFIX):] for n in DmtxScheme
 )
 
+# Scheme values by lower-case name
+_SCHEMES = dict(
+    (n.name[len(ENCODING_SCHEME_PREFIX):].lower(), n) for n in DmtxScheme
+)
+
 # Not sorting encoding size names - would need to use natural sort order;
 # the existing order within DmtxSymbolSize is sensible.
 ENCODING_SIZE_NAMES = [
@@ -45,6 +55,9 @@ Decoded = namedtuple('Decoded', 'data rect')
 # Results of encoding data to an image
 Encoded = namedtuple('Encoded', 'width height bpp pixels')
 
+# Results of encoding data to a matrix of modules
+Matrix = namedtuple('Matrix', 'rows cols bits')
+
 # Crude mapping from bits-per-pixels to values in DmtxPackOrder enum
 _PACK_ORDER = {
     8: DmtxPackOrder.DmtxPack8bppK,
@@ -53,6 +66,29 @@ _PACK_ORDER = {
     32: DmtxPackOrder.DmtxPack32bppRGBX,
 }
 
+# Pixel packings that encode can write. libdmtx can not write 1bpp images so
+# those are rendered as 8bpp and packed by `_pack_1bpp`.
+_ENCODE_PACK_ORDER = {
+    1: DmtxPackOrder.DmtxPack8bppK,
+    8: DmtxPackOrder.DmtxPack8bppK,
+    24: DmtxPackOrder.DmtxPack24bppRGB,
+}
+
+# Types of `Encoded.pixels` that encode can return
+ENCODING_OUTPUTS = ['bytes', 'memoryview', 'numpy']
+
+# Translation tables from 8bpp grey values to b'0' and b'1', setting light
+# and dark pixels respectively
+_BITS_1BPP = b'0' * 128 + b'1' * 128
+_BITS_DARK = b'1' * 128 + b'0' * 128
+
+# Translation table from b'0' and b'1' to the grey values of 1bpp pixels
+_GREY_1BPP = bytes(bytearray(255 if b == ord('1') else 0 for b in range(256)))
+
+# libdmtx's defaults for encoding
+_DEFAULT_MODULE_SIZE = 5
+_DEFAULT_MARGIN_SIZE = 10
+
 
 @contextmanager
 def _image(pixels, width, height, pack):
@@ -75,9 +111,11 @@ def _image(pixels, width, height, pack):
     if not image:
         raise PyLibDMTXError('Could not create image')
     else:
+        diagnostics._created('DmtxImage', image)
         try:
             yield image
         finally:
+            diagnostics._destroyed(image)
             dmtxImageDestroy(byref(image))
 
 
@@ -100,9 +138,11 @@ def _decoder(image, shrink):
     if not decoder:
         raise PyLibDMTXError('Could not create decoder')
     else:
+        diagnostics._created('DmtxDecode', decoder)
         try:
             yield decoder
         finally:
+            diagnostics._destroyed(decoder)
             dmtxDecodeDestroy(byref(decoder))
 
 
@@ -119,10 +159,12 @@ def _region(decoder, timeout):
         DmtxRegion: The next region or None, if all regions have been found.
     """
     region = dmtxRegionFindNext(decoder, timeout)
+    diagnostics._created('DmtxRegion', region)
     try:
         yield region
     finally:
         if region:
+            diagnostics._destroyed(region)
             dmtxRegionDestroy(byref(region))
 
 
@@ -140,21 +182,27 @@ def _decoded_matrix_region(decoder, region, corrections):
         DmtxMessage: The message.
     """
     message = dmtxDecodeMatrixRegion(decoder, region, corrections)
+    diagnostics._created('DmtxMessage', message)
     try:
         yield message
     finally:
         if message:
+            diagnostics._destroyed(message)
             dmtxMessageDestroy(byref(message))
 
 
-def _decode_region(decoder, region, corrections, shrink, return_vertices=False):
+def _decode_region(decoder, region, corrections, shrink, arena=None):
     """Decodes and returns the value in a region.
 
     Args:
         region (DmtxRegion):
+        arena (PayloadArena): If given, the data is copied into this and
+            returned as a `memoryview`.
 
-    Yields:
-        Decoded or None: The decoded value.
+    Returns:
+        tuple or None: (data, vertices, symbol rows, symbol cols), where
+        vertices are the ((x, y) * 4) of the corners of the barcode, or None
+        if the region could not be decoded.
     """
     with _decoded_matrix_region(decoder, region, corrections) as msg:
         if msg:
@@ -176,29 +224,55 @@ def _decode_region(decoder, region, corrections, shrink, return_vertices=False):
             x01 = int((shrink * p01.X) + 0.5)
             y01 = int((shrink * p01.Y) + 0.5)
 
-            if return_vertices:
-                return Decoded(
-                    string_at(msg.contents.output),
-                    Rect_vertices((x00,y00), (x01,y01), (x10,y10), (x11,y11))
-                )
+            # The payload is outputIdx bytes, which may include NULs
+            output, length = msg.contents.output, msg.contents.outputIdx
+            if arena is None:
+                data = string_at(output, length)
             else:
-                min_x = min(x00, x11, x10, x01)
-                max_x = max(x00, x11, x10, x01)
-                min_y = min(y00, y11, y10, y01)
-                max_y = max(y00, y11, y10, y01)
-
-                return Decoded(
-                    string_at(msg.contents.output),
-                    Rect(min_x, min_y, max_x - min_x, max_y - min_y)
-                    )
+                data = arena.write(output, length)
 
+            return (
+                data,
+                ((x00, y00), (x01, y01), (x10, y10), (x11, y11)),
+                region.contents.symbolRows,
+                region.contents.symbolCols,
+            )
         else:
             return None
 
 
-def _pixel_data(image):
+def _decoded(data, vertices, return_vertices):
+    """Returns a `Decoded` of `data` and the rect or `vertices` of a barcode.
+    """
+    if return_vertices:
+        return Decoded(data, Rect_vertices(*vertices))
+    else:
+        xs = [x for x, y in vertices]
+        ys = [y for x, y in vertices]
+        min_x, min_y = min(xs), min(ys)
+        return Decoded(
+            data, Rect(min_x, min_y, max(xs) - min_x, max(ys) - min_y)
+        )
+
+
+def _is_array(image):
+    """Returns True if `image` is a numpy array.
+    """
+    # Different versions of imageio use a subclass of numpy.ndarray called
+    # either imageio.core.util.Image or imageio.core.util.Array.
+    image_type = str(type(image))
+    return 'numpy.ndarray' in image_type or 'imageio.core.util' in image_type
+
+
+def _pixel_data(image, scratch=None):
     """Returns (pixels, width, height, bpp)
 
+    Args:
+        scratch (pylibdmtx.scratch.ScratchArena): If given, numpy arrays are
+            converted into a buffer from this, which the caller releases,
+            rather than into new `bytes`. The buffer may be longer than the
+            pixels.
+
     Returns:
         :obj: `tuple` (pixels, width, height, bpp)
     """
@@ -209,6 +283,26 @@ def _pixel_data(image):
     if 'PIL.' in image_type:
         pixels = image.tobytes()
         width, height = image.size
+    elif scratch is not None and _is_array(image):
+        import numpy as np
+
+        # Checked before a buffer is taken from the arena
+        height, width = image.shape[:2]
+        bpp = _bpp(image.size, width, height)
+
+        # Converted, as by astype('uint8'), straight into the buffer
+        pixels = scratch.acquire(image.size)
+        try:
+            np.copyto(
+                np.frombuffer(
+                    pixels, dtype=np.uint8, count=image.size
+                ).reshape(image.shape),
+                image, casting='unsafe'
+            )
+        except BaseException:
+            scratch.release(pixels)
+            raise
+        return pixels, width, height, bpp
     elif 'numpy.ndarray' in image_type or 'imageio.core.util' in image_type:
         # Different versions of imageio use a subclass of numpy.ndarray
         # called either imageio.core.util.Image or imageio.core.util.Array.
@@ -234,21 +328,189 @@ def _pixel_data(image):
                 ).format(len(pixels), (width * height))
             )
 
-    # Compute bits-per-pixel
-    bpp = 8 * len(pixels) // (width * height)
+    return pixels, width, height, _bpp(len(pixels), width, height)
+
+
+def _bpp(nbytes, width, height):
+    """Returns the bits-per-pixel of `nbytes` of pixels of `width` x `height`.
+
+    Raises:
+        PyLibDMTXError: If libdmtx can not read pixels of that size.
+    """
+    bpp = 8 * nbytes // (width * height)
     if bpp not in _PACK_ORDER:
         raise PyLibDMTXError(
             'Unsupported bits-per-pixel: [{0}] Should be one of {1}'.format(
                 bpp, sorted(_PACK_ORDER.keys())
             )
         )
+    return bpp
+
+
+def _roi_properties(roi, width, height, shrink):
+    """Returns the (property, value) pairs that limit the scan to `roi`.
+
+    Args:
+        roi (tuple): (left, top, width, height) in pixels.
+        width (int): Width of the image.
+        height (int): Height of the image.
+        shrink (int):
+
+    Raises:
+        PyLibDMTXError: If `roi` is not within the image.
+    """
+    left, top, roi_width, roi_height = roi
+    # Clip to the image; libdmtx's limits are inclusive and in shrunk pixels
+    x_min, y_min = max(left, 0), max(top, 0)
+    x_max = min(left + roi_width, width) - 1
+    y_max = min(top + roi_height, height) - 1
+    if x_min > x_max or y_min > y_max:
+        raise PyLibDMTXError(
+            'Invalid roi [{0}]: not within the image of {1} x {2}'.format(
+                roi, width, height
+            )
+        )
+    return [
+        (DmtxProperty.DmtxPropXmin, x_min // shrink),
+        (DmtxProperty.DmtxPropXmax, x_max // shrink),
+        (DmtxProperty.DmtxPropYmin, y_min // shrink),
+        (DmtxProperty.DmtxPropYmax, y_max // shrink),
+    ]
+
+
+def _rois(roi, width, height, shrink):
+    """Returns a list of the (property, value) pairs of each region of
+    interest in `roi`, as given to `decode`; one empty list for the whole
+    image if `roi` is `None`.
+    """
+    if roi is None:
+        return [[]]
+    elif roi and isinstance(roi[0], (list, tuple)):
+        return [_roi_properties(r, width, height, shrink) for r in roi]
+    else:
+        return [_roi_properties(roi, width, height, shrink)]
+
+
+def _centre(vertices):
+    """Returns the (x, y) mean of `vertices`.
+    """
+    return (
+        sum(x for x, y in vertices) / float(len(vertices)),
+        sum(y for x, y in vertices) / float(len(vertices))
+    )
+
+
+def _within(point, vertices):
+    """Returns True if `point` is within the quadrilateral of `vertices`, as
+    returned by `_decode_region`.
+    """
+    # Corners in order around the quadrilateral
+    corners = [vertices[i] for i in (0, 2, 3, 1)]
+    x, y = point
+    sides = [
+        (x1 - x0) * (y - y0) - (y1 - y0) * (x - x0)
+        for (x0, y0), (x1, y1) in zip(corners, corners[1:] + corners[:1])
+    ]
+    return all(side >= 0 for side in sides) or all(side <= 0 for side in sides)
+
+
+def _scan_levels(grid):
+    """Returns the number of levels of the scan grid `grid`, from its
+    coarsest to its finest.
+
+    Each level halves the extent of the one before - extents are 2**k - 1 -
+    and has four times as many cross patterns.
+    """
+    levels, extent = 0, grid.maxExtent
+    while extent and extent >= grid.minExtent:
+        levels += 1
+        extent //= 2
+    return levels
+
+
+def _scan_crosses(levels):
+    """Returns the number of cross patterns in the first `levels` levels of a
+    scan grid.
+    """
+    return (4 ** levels - 1) // 3
+
+
+def _scan_visited(grid):
+    """Returns the number of cross patterns of the scan grid `grid` that have
+    been visited.
+    """
+    if not grid.extent or grid.extent < grid.minExtent:
+        return _scan_crosses(_scan_levels(grid))
+
+    level, extent = 0, grid.maxExtent
+    while extent > grid.extent:
+        level += 1
+        extent //= 2
+    # The level has 2**level rows and columns of cross patterns
+    x = (grid.xCenter - grid.startPos) // grid.jumpSize
+    y = (grid.yCenter - grid.startPos) // grid.jumpSize
+    return _scan_crosses(level) + (y << level) + x
+
+
+def _limit_scan(grid, max_scan):
+    """Ends the scan of `grid` after the level in which `max_scan` of its
+    cross patterns will have been visited, so that `dmtxRegionFindNext` does
+    not scan far beyond them.
+
+    Returns:
+        int: The number of cross patterns to visit.
+    """
+    levels = _scan_levels(grid)
+    limit = int(math.ceil(max_scan * _scan_crosses(levels)))
+    last = 1
+    while last < levels and _scan_crosses(last) < limit:
+        last += 1
+    # Extents of later levels are less than this
+    grid.minExtent = max(grid.minExtent, grid.maxExtent >> (last - 1))
+    return limit
+
+
+def _acceptor(accept):
+    """Returns a function of decoded data that is `True` if it should be
+    accepted.
+
+    Args:
+        accept: A callable, a regular expression as a str, bytes or compiled
+            pattern or `None` to accept everything.
+
+    Raises:
+        PyLibDMTXError: If `accept` is not one of these.
+    """
+    if accept is None:
+        return None
+    elif isinstance(accept, (bytes, str)):
+        if isinstance(accept, str):
+            accept = accept.encode('utf-8')
+        return partial(_matches, re.compile(accept))
+    elif hasattr(accept, 'search') and hasattr(accept, 'pattern'):
+        return partial(_matches, accept)
+    elif callable(accept):
+        return accept
+    else:
+        raise PyLibDMTXError(
+            'Invalid accept [{0}]: should be a callable or a regular '
+            'expression'.format(accept)
+        )
+
 
-    return pixels, width, height, bpp
+def _matches(pattern, data):
+    if isinstance(pattern.pattern, bytes):
+        return pattern.search(data) is not None
+    else:
+        text = bytes(data).decode('utf-8', 'replace')
+        return pattern.search(text) is not None
 
 
 def decode(image, timeout=None, gap_size=None, shrink=1, shape=None,
            deviation=None, threshold=None, min_edge=None, max_edge=None,
-           corrections=None, max_count=None, return_vertices=False):
+           corrections=None, max_count=None, return_vertices=False,
+           accept=None, roi=None, max_regions=None, max_failures=None,
+           max_scan=None, scratch=None):
     """Decodes datamatrix barcodes in `image`.
 
     Args:
@@ -265,24 +527,276 @@ def decode(image, timeout=None, gap_size=None, shrink=1, shape=None,
         max_count (int): stop after reading this many barcodes. `None` to read
             as many as possible.
         return_vertices: If to return the coordinates of the four vertices of the datamatrix or just one + width/height
+        accept: Return only barcodes whose data is accepted by this callable,
+            which is given the data as bytes, or in which this regular
+            expression (str, bytes or compiled) is found. Other barcodes do
+            not count towards `max_count`, which defaults to 1 if `accept` is
+            given, so scanning stops at the first accepted barcode.
+        roi (tuple): (left, top, width, height) of the part of the image to
+            search, in the coordinates of the returned rects; a list of these
+            to search each in turn; or `None` to search all of the image.
+        max_regions (int): stop after trying to decode this many candidate
+            regions.
+        max_failures (int): stop after this many candidate regions could not
+            be decoded.
+        max_scan (float): stop after this fraction, greater than 0 and at
+            most 1, of the scan grid of the image, or of each `roi`, has been
+            searched.
+        scratch (pylibdmtx.scratch.ScratchArena): If given, numpy arrays
+            are converted to the pixels that libdmtx reads in a buffer from
+            this, reused from earlier calls, rather than in new `bytes`.
+
+    Unlike `timeout`, `max_regions`, `max_failures` and `max_scan` limit the
+    work done rather than the time it takes, so that the same image gives
+    the same results however busy the machine.
 
     Returns:
         :obj:`list` of :obj:`Decoded`: The values decoded from barcodes.
     """
+    return [
+        _decoded(data, vertices, return_vertices)
+        for data, vertices, rows, cols in _select(
+            image, timeout, gap_size, shrink, shape, deviation, threshold,
+            min_edge, max_edge, corrections, max_count, accept, roi,
+            max_regions=max_regions, max_failures=max_failures,
+            max_scan=max_scan, scratch=scratch
+        )
+    ]
+
+
+def decode_batch(images, columnar=False, timeout=None, gap_size=None,
+                 shrink=1, shape=None, deviation=None, threshold=None,
+                 min_edge=None, max_edge=None, corrections=None,
+                 max_count=None, return_vertices=False, accept=None,
+                 roi=None, arena=None, max_regions=None, max_failures=None,
+                 max_scan=None, scratch=None):
+    """Decodes datamatrix barcodes in each of `images`.
+
+    Args:
+        images: An iterable of images, each as for `decode`.
+        columnar (bool): If to return the barcodes of all images in arrays
+            rather than as lists of `Decoded`. Requires numpy.
+        arena (pylibdmtx.arena.PayloadArena): If given, data is copied from
+            libdmtx into this rather than into a new `bytes` per barcode. The
+            data of each `Decoded` is then a `memoryview` of the arena, valid
+            until it is `reset`. If `columnar`, payloads are concatenated
+            from the arena.
+        Other arguments are as for `decode`; `max_count` and the effort
+        limits apply to each image. `return_vertices` is ignored if
+        `columnar`, which holds both rects and vertices.
+
+    Returns:
+        :obj:`list` of :obj:`list` of :obj:`Decoded`: One list per image; or
+        `pylibdmtx.columnar.ColumnarDecoded` if `columnar`.
+    """
+    arguments = (
+        timeout, gap_size, shrink, shape, deviation, threshold, min_edge,
+        max_edge, corrections, max_count, accept, roi
+    )
+    limits = {
+        'max_regions': max_regions, 'max_failures': max_failures,
+        'max_scan': max_scan, 'scratch': scratch,
+    }
+    if columnar:
+        from .columnar import _Builder
+
+        builder = _Builder(arena)
+        for index, image in enumerate(images):
+            for data, vertices, rows, cols in _select(
+                    image, *arguments, arena=builder.arena, **limits):
+                builder.append(index, data, vertices, rows, cols)
+        return builder.build()
+    else:
+        return [
+            [
+                _decoded(data, vertices, return_vertices)
+                for data, vertices, rows, cols in _select(
+                    image, *arguments, arena=arena, **limits
+                )
+            ]
+            for image in images
+        ]
+
+
+# Modes of PIL images that decode reads; pages of other modes are converted to
+# greyscale by decode_pages
+_PAGE_MODES = ('L', 'RGB', 'RGBA', 'RGBX')
+
+# Types of paths given to decode_pages: str and unicode on Python 2
+_PATH_TYPES = (bytes, type(u''))
+
+
+def _pages(source):
+    """Yields (index, image) of each page of `source`, as given to
+    `decode_pages`, loading one page at a time.
+    """
+    if (isinstance(source, _PATH_TYPES) or hasattr(source, 'read') or
+            hasattr(source, '__fspath__')):
+        from PIL import Image
+
+        with Image.open(source) as image:
+            for page in _pages(image):
+                yield page
+    elif 'PIL.' in str(type(source)):
+        index = 0
+        while True:
+            try:
+                source.seek(index)
+            except EOFError:
+                break
+            if source.mode in _PAGE_MODES:
+                page = source
+            else:
+                page = source.convert('L')
+            # Copy the pixels, so that decoding can proceed in another thread
+            # while the next page is loaded
+            yield index, (page.tobytes(), page.width, page.height)
+            index += 1
+    else:
+        for index, image in enumerate(source):
+            yield index, image
+
+
+def decode_pages(source, workers=1, **kwargs):
+    """Decodes datamatrix barcodes in each page of a multi-page image, such as
+    a TIFF stack or an animated image, or in each of a sequence of images,
+    such as the pages of a PDF rasterised by pdf2image.
+
+    Pages are loaded lazily, so that no more than `workers` + 1 pages are in
+    memory at once. Pages of a PIL image are read with `seek`, which leaves
+    it at the last page.
+
+    Args:
+        source: A path or file of an image that PIL can open, a `PIL.Image`
+            or an iterable of images, each as for `decode`.
+        workers (int): Number of pages to decode at once, in threads.
+        **kwargs: Arguments to `decode`, used for every page.
+
+    Yields:
+        tuple: (index of the page, :obj:`Decoded`), in order of page.
+    """
+    if workers < 1:
+        raise ValueError('Invalid workers [{0}]'.format(workers))
+
+    pages = _pages(source)
+    pool = None
+    try:
+        if 1 == workers:
+            for index, image in pages:
+                for decoded in decode(image, **kwargs):
+                    yield index, decoded
+        else:
+            from collections import deque
+            from multiprocessing.pool import ThreadPool
+
+            pool = ThreadPool(workers)
+            pending = deque()
+            for index, image in pages:
+                pending.append(
+                    (index, pool.apply_async(decode, (image,), kwargs))
+                )
+                if workers == len(pending):
+                    index, result = pending.popleft()
+                    for decoded in result.get():
+                        yield index, decoded
+            while pending:
+                index, result = pending.popleft()
+                for decoded in result.get():
+                    yield index, decoded
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        # Closes a file opened by _pages
+        pages.close()
+
+
+def _select(image, timeout, gap_size, shrink, shape, deviation, threshold,
+            min_edge, max_edge, corrections, max_count, accept, roi,
+            arena=None, max_regions=None, max_failures=None, max_scan=None,
+            scratch=None):
+    """Yields the accepted barcodes in `image`, up to `max_count`, as
+    returned by `_decode_region`. Arguments are as for `decode_batch`.
+    """
+    if max_count is not None and max_count < 1:
+        raise ValueError('Invalid max_count [{0}]'.format(max_count))
+    elif max_regions is not None and max_regions < 1:
+        raise ValueError('Invalid max_regions [{0}]'.format(max_regions))
+    elif max_failures is not None and max_failures < 1:
+        raise ValueError('Invalid max_failures [{0}]'.format(max_failures))
+    elif max_scan is not None and not 0 < max_scan <= 1:
+        raise ValueError('Invalid max_scan [{0}]'.format(max_scan))
+
+    accepted = _acceptor(accept)
+    if accepted is not None and max_count is None:
+        max_count = 1
+
+    symbols = _symbols(
+        image, timeout, gap_size, shrink, shape, deviation, threshold,
+        min_edge, max_edge, corrections, roi, arena, max_regions,
+        max_failures, max_scan, scratch
+    )
+    count = 0
+    try:
+        for symbol in symbols:
+            if accepted is None or accepted(symbol[0]):
+                yield symbol
+                count += 1
+
+                # Stop if we've reached maximum count
+                if max_count and count == max_count:
+                    break
+            elif arena is not None:
+                # Reuse the space of the rejected data
+                arena.pop()
+    finally:
+        # Destroys the native objects
+        symbols.close()
+
+
+def _symbols(image, timeout, gap_size, shrink, shape, deviation, threshold,
+             min_edge, max_edge, corrections, roi, arena=None,
+             max_regions=None, max_failures=None, max_scan=None,
+             scratch=None):
+    """Yields the barcodes in `image` as returned by `_decode_region`.
+    Arguments are as for `decode`. The native objects are destroyed, and the
+    scratch buffer released, when the generator is closed.
+    """
     dmtx_timeout = None
     if timeout:
         now = dmtxTimeNow()
         dmtx_timeout = dmtxTimeAdd(now, timeout)
 
-    if max_count is not None and max_count < 1:
-        raise ValueError('Invalid max_count [{0}]'.format(max_count))
+    pixels, width, height, bpp = _pixel_data(image, scratch)
+    try:
+        symbols = _scan(
+            pixels, width, height, bpp, dmtx_timeout, gap_size, shrink,
+            shape, deviation, threshold, min_edge, max_edge, corrections, roi,
+            arena, max_regions, max_failures, max_scan
+        )
+        try:
+            for symbol in symbols:
+                yield symbol
+        finally:
+            # The native image is destroyed before its pixels are reused
+            symbols.close()
+    finally:
+        if scratch is not None and _is_array(image):
+            scratch.release(pixels)
+
 
-    pixels, width, height, bpp = _pixel_data(image)
+def _scan(pixels, width, height, bpp, dmtx_timeout, gap_size, shrink, shape,
+          deviation, threshold, min_edge, max_edge, corrections, roi, arena,
+          max_regions, max_failures, max_scan):
+    """Yields the barcodes in `pixels` as returned by `_decode_region`.
+    """
+    if isinstance(pixels, bytes):
+        pointer = cast(pixels, c_ubyte_p)
+    else:
+        # A writable buffer, such as from a ScratchArena
+        pointer = cast((c_ubyte * len(pixels)).from_buffer(pixels), c_ubyte_p)
 
-    results = []
-    with _image(
-        cast(pixels, c_ubyte_p), width, height, _PACK_ORDER[bpp]
-    ) as img:
+    with _image(pointer, width, height, _PACK_ORDER[bpp]) as img:
         with _decoder(img, shrink) as decoder:
             properties = [
                 (DmtxProperty.DmtxPropScanGap, gap_size),
@@ -300,25 +814,54 @@ def decode(image, timeout=None, gap_size=None, shrink=1, shape=None,
             if not corrections:
                 corrections = DmtxUndefined
 
-            while True:
-                with _region(decoder, dmtx_timeout) as region:
-                    # Finished file or ran out of time before finding another
-                    # region
-                    if not region:
+            # Effort spent on the image, in all regions of interest
+            regions = failures = 0
+
+            # Vertices of the barcodes found, so that one that is in more
+            # than one region of interest is yielded once
+            found = []
+
+            # Search each region of interest in turn
+            for limits in _rois(roi, width, height, shrink):
+                for prop, value in limits:
+                    dmtxDecodeSetProp(decoder, prop, value)
+
+                # Setting properties reinitialises the scan grid
+                grid = decoder.contents.grid
+                if max_scan is not None:
+                    scan_limit = _limit_scan(grid, max_scan)
+
+                while True:
+                    with _region(decoder, dmtx_timeout) as region:
+                        # Finished region or ran out of time before finding
+                        # another
+                        if not region:
+                            break
+                        else:
+                            # Decoded
+                            regions += 1
+                            res = _decode_region(
+                                decoder, region, corrections, shrink, arena
+                            )
+                            if not res:
+                                failures += 1
+                            elif any(
+                                _within(_centre(res[1]), vertices)
+                                for vertices in found
+                            ):
+                                # Found in an earlier region of interest
+                                if arena is not None:
+                                    arena.pop()
+                            else:
+                                found.append(res[1])
+                                yield res
+
+                    if ((max_regions and regions >= max_regions) or
+                            (max_failures and failures >= max_failures)):
+                        return
+                    elif (max_scan is not None and
+                            _scan_visited(grid) >= scan_limit):
                         break
-                    else:
-                        # Decoded
-                        res = _decode_region(
-                            decoder, region, corrections, shrink, return_vertices
-                        )
-                        if res:
-                            results.append(res)
-
-                            # Stop if we've reached maximum count
-                            if max_count and len(results) == max_count:
-                                break
-
-    return results
 
 
 @contextmanager
@@ -327,33 +870,23 @@ def _encoder():
     if not encoder:
         raise PyLibDMTXError('Could not create encoder')
 
+    diagnostics._created('DmtxEncode', encoder)
     try:
         yield encoder
     finally:
+        diagnostics._destroyed(encoder)
         dmtxEncodeDestroy(byref(encoder))
 
 
-def encode(data, scheme=None, size=None):
-    """
-    Encodes `data` in a DataMatrix image.
-
-    For now bpp is the libdmtx default which is 24
+def _symbol_size(size):
+    """Returns the `DmtxSymbolSize` value for `size`.
 
     Args:
-        data: bytes instance
-        scheme: encoding scheme - one of `ENCODING_SCHEME_NAMES`, or `None`.
-            If `None`, defaults to 'Ascii'.
-        size: image dimensions - one of `ENCODING_SIZE_NAMES`, or `None`.
-            If `None`, defaults to 'ShapeAuto'.
-
-    Returns:
-        Encoded: with properties `(width, height, bpp, pixels)`.
-        You can use that result to build a PIL image:
-
-            Image.frombytes('RGB', (width, height), pixels)
+        size (str): One of `ENCODING_SIZE_NAMES` or `None` for 'ShapeAuto'.
 
+    Raises:
+        PyLibDMTXError: If `size` is not recognised.
     """
-
     size = size if size else 'ShapeAuto'
     size_name = '{0}{1}'.format(ENCODING_SIZE_PREFIX, size)
     if not hasattr(DmtxSymbolSize, size_name):
@@ -362,23 +895,76 @@ def encode(data, scheme=None, size=None):
                 size, ENCODING_SIZE_NAMES
             )
         )
-    size = getattr(DmtxSymbolSize, size_name)
+    return getattr(DmtxSymbolSize, size_name)
+
 
+def _scheme(scheme):
+    """Returns the `DmtxScheme` value for `scheme`.
+
+    Args:
+        scheme (str): One of `ENCODING_SCHEME_NAMES`, in any case, or `None`
+            for 'Ascii'.
+
+    Raises:
+        PyLibDMTXError: If `scheme` is not recognised.
+    """
     scheme = scheme if scheme else 'Ascii'
-    scheme_name = '{0}{1}'.format(
-        ENCODING_SCHEME_PREFIX, scheme.capitalize()
-    )
-    if not hasattr(DmtxScheme, scheme_name):
+    try:
+        return _SCHEMES[scheme.lower()]
+    except KeyError:
         raise PyLibDMTXError(
             'Invalid scheme [{0}]: should be one of {1}'.format(
                 scheme, ENCODING_SCHEME_NAMES
             )
         )
-    scheme = getattr(DmtxScheme, scheme_name)
 
+
+def _fast_scheme(data, size):
+    """Returns the single scheme that encodes `data` in the smallest symbol of
+    `size`, as computed by `capacity.best_scheme` without encoding.
+
+    libdmtx does not implement `DmtxSchemeAutoFast`; this stands in for it.
+
+    Args:
+        data (bytes):
+        size (str): One of `ENCODING_SIZE_NAMES` or `None` for 'ShapeAuto'.
+
+    Returns:
+        DmtxScheme: The scheme; 'Ascii' if no scheme fits.
+    """
+    return _SCHEMES[(best_scheme(data, size) or 'Ascii').lower()]
+
+
+@contextmanager
+def _encoded(data, scheme, size, module_size, margin_size, pack):
+    """A context manager for a `DmtxEncode` that has encoded `data`.
+
+    Args:
+        data (bytes):
+        scheme (DmtxScheme):
+        size (DmtxSymbolSize):
+        module_size (int or None):
+        margin_size (int or None):
+        pack (DmtxPackOrder):
+
+    Yields:
+        POINTER(DmtxEncode): The encoder, holding the image and region.
+
+    Raises:
+        PyLibDMTXError: If the data could not be encoded.
+    """
     with _encoder() as encoder:
-        dmtxEncodeSetProp(encoder, DmtxProperty.DmtxPropScheme, scheme)
-        dmtxEncodeSetProp(encoder, DmtxProperty.DmtxPropSizeRequest, size)
+        properties = [
+            (DmtxProperty.DmtxPropScheme, scheme),
+            (DmtxProperty.DmtxPropSizeRequest, size),
+            (DmtxProperty.DmtxPropModuleSize, module_size),
+            (DmtxProperty.DmtxPropMarginSize, margin_size),
+            (DmtxProperty.DmtxPropPixelPacking, pack),
+        ]
+
+        # Set only those properties with a non-None value
+        for prop, value in ((p, v) for p, v in properties if v is not None):
+            dmtxEncodeSetProp(encoder, prop, value)
 
         if dmtxEncodeDataMatrix(encoder, len(data), cast(data, c_ubyte_p)) == 0:
             raise PyLibDMTXError(
@@ -386,17 +972,281 @@ def encode(data, scheme=None, size=None):
                 'large enough to contain the data'
             )
 
-        w, h, bpp = map(
-            partial(dmtxImageGetProp, encoder[0].image),
-            (
-                DmtxProperty.DmtxPropWidth, DmtxProperty.DmtxPropHeight,
-                DmtxProperty.DmtxPropBitsPerPixel
+        # The encoder now holds a message and an image
+        diagnostics._updated('DmtxEncode', encoder)
+        yield encoder
+
+
+def _image_size(encoder):
+    """Returns (width, height, bpp) of the image held by `encoder`.
+    """
+    return tuple(map(
+        partial(dmtxImageGetProp, encoder[0].image),
+        (
+            DmtxProperty.DmtxPropWidth, DmtxProperty.DmtxPropHeight,
+            DmtxProperty.DmtxPropBitsPerPixel
+        )
+    ))
+
+
+def _pack_1bpp(pixels, width, height, bits=_BITS_1BPP):
+    """Packs 8bpp black-and-white `pixels` into 1bpp rows.
+
+    Bits are packed most-significant first and each row is padded to a whole
+    number of bytes. With the default `bits`, a set bit is a light pixel - the
+    layout of PIL's mode '1'.
+
+    Args:
+        pixels (bytes): 8bpp pixel data.
+        width (int):
+        height (int):
+        bits (bytes): Translation table from grey values to b'0' and b'1'.
+
+    Returns:
+        bytearray: The packed pixels.
+    """
+    row_bytes = (width + 7) // 8
+    pad = b'0' * (8 * row_bytes - width)
+    bits = pixels.translate(bits)
+    shifts = range(8 * (row_bytes - 1), -8, -8)
+    packed = bytearray()
+    for offset in range(0, width * height, width):
+        row = int(bits[offset:offset + width] + pad, 2)
+        packed.extend((row >> shift) & 0xff for shift in shifts)
+    return packed
+
+
+def _encoded_pixels(pixels, width, height, bpp, output):
+    """Returns `pixels` as the type of object given by `output`.
+
+    Args:
+        pixels (bytes or bytearray):
+        width (int):
+        height (int):
+        bpp (int): One of 1, 8 or 24.
+        output (str): One of `ENCODING_OUTPUTS`.
+
+    Returns:
+        :obj: `bytes`, `memoryview` or `numpy.ndarray`. Arrays have the shape
+        `(height, width, 3)` for 24bpp, `(height, width)` for 8bpp and
+        `(height, row bytes)` for 1bpp.
+    """
+    if 'bytes' == output:
+        return pixels if isinstance(pixels, bytes) else bytes(pixels)
+    elif 'memoryview' == output:
+        return memoryview(pixels)
+    else:
+        import numpy as np
+        if 24 == bpp:
+            shape = (height, width, 3)
+        elif 8 == bpp:
+            shape = (height, width)
+        else:
+            shape = (height, (width + 7) // 8)
+        return np.frombuffer(pixels, dtype=np.uint8).reshape(shape)
+
+
+def encode(data, scheme=None, size=None, module_size=None, margin_size=None,
+           bpp=24, output='bytes'):
+    """
+    Encodes `data` in a DataMatrix image.
+
+    Args:
+        data: bytes instance
+        scheme: encoding scheme - one of `ENCODING_SCHEME_NAMES`, or `None`.
+            If `None`, defaults to 'Ascii'. 'AutoBest' finds the combination
+            of schemes that gives the smallest symbol; 'AutoFast' picks the
+            single scheme that gives the smallest symbol, which is much
+            quicker but can give a larger symbol.
+        size: image dimensions - one of `ENCODING_SIZE_NAMES`, or `None`.
+            If `None`, defaults to 'ShapeAuto'.
+        module_size (int): pixels per module, or `None`. If `None`, defaults
+            to the libdmtx default of 5.
+        margin_size (int): pixels of quiet zone around the symbol, or `None`.
+            If `None`, defaults to the libdmtx default of 10.
+        bpp (int): bits-per-pixel of the image - 24 for RGB, 8 for greyscale
+            or 1 for black-and-white packed as PIL's mode '1'.
+        output (str): type of `pixels` - one of `ENCODING_OUTPUTS`.
+            'memoryview' and 'numpy' wrap a single writable copy of libdmtx's
+            pixel buffer; 'numpy' requires numpy.
+
+    Returns:
+        Encoded: with properties `(width, height, bpp, pixels)`.
+        You can use that result to build a PIL image:
+
+            Image.frombytes('RGB', (width, height), pixels)
+
+        or, for `bpp` values of 8 and 1, using modes 'L' and '1'.
+
+    """
+    symbol_size = _symbol_size(size)
+    scheme = _scheme(scheme)
+    if DmtxScheme.DmtxSchemeAutoFast == scheme:
+        scheme = _fast_scheme(data, size)
+
+    if bpp not in _ENCODE_PACK_ORDER:
+        raise PyLibDMTXError(
+            'Unsupported bits-per-pixel: [{0}] Should be one of {1}'.format(
+                bpp, sorted(_ENCODE_PACK_ORDER.keys())
             )
         )
-        size = w * h * bpp // 8
-        pixels = cast(
-            encoder[0].image[0].pxl, ctypes.POINTER(ctypes.c_ubyte * size)
+
+    if output not in ENCODING_OUTPUTS:
+        raise PyLibDMTXError(
+            'Invalid output [{0}]: should be one of {1}'.format(
+                output, ENCODING_OUTPUTS
+            )
         )
+
+    if module_size is not None and module_size < 1:
+        raise ValueError('Invalid module_size [{0}]'.format(module_size))
+
+    if margin_size is not None and margin_size < 0:
+        raise ValueError('Invalid margin_size [{0}]'.format(margin_size))
+
+    with _encoded(
+        data, scheme, symbol_size, module_size, margin_size,
+        _ENCODE_PACK_ORDER[bpp]
+    ) as encoder:
+        w, h, image_bpp = _image_size(encoder)
+        size = w * h * image_bpp // 8
+        pxl = encoder[0].image[0].pxl
+        if 1 == bpp:
+            pixels = _pack_1bpp(string_at(pxl, size), w, h)
+        elif 'bytes' == output:
+            pixels = string_at(pxl, size)
+        else:
+            # The only copy - the returned object wraps this buffer
+            pixels = bytearray(size)
+            memmove((c_char * size).from_buffer(pixels), pxl, size)
+
         return Encoded(
-            width=w, height=h, bpp=bpp, pixels=ctypes.string_at(pixels, size)
+            width=w, height=h, bpp=bpp,
+            pixels=_encoded_pixels(pixels, w, h, bpp, output)
         )
+
+
+def encode_matrix(data, scheme=None, size=None):
+    """Encodes `data` as the matrix of modules of a DataMatrix symbol.
+
+    The matrix is much smaller than an image and can be rendered at any scale
+    by the functions in `pylibdmtx.render`.
+
+    Args:
+        data: bytes instance
+        scheme: encoding scheme - one of `ENCODING_SCHEME_NAMES`, or `None`.
+            If `None`, defaults to 'Ascii'.
+        size: symbol size - one of `ENCODING_SIZE_NAMES`, or `None`.
+            If `None`, defaults to 'ShapeAuto'.
+
+    Returns:
+        Matrix: with properties `(rows, cols, bits)`. `bits` holds `rows` rows
+        of `cols` modules, packed most-significant bit first with each row
+        padded to a whole number of bytes. A set bit is a dark module. Rows
+        are in the same order as the rows of the image returned by `encode`.
+    """
+    symbol_size = _symbol_size(size)
+    scheme = _scheme(scheme)
+    if DmtxScheme.DmtxSchemeAutoFast == scheme:
+        scheme = _fast_scheme(data, size)
+
+    # Render one pixel per module without a margin; the image is then the
+    # module matrix itself.
+    with _encoded(
+        data, scheme, symbol_size, 1, 0,
+        DmtxPackOrder.DmtxPack8bppK
+    ) as encoder:
+        rows = encoder[0].region.symbolRows
+        cols = encoder[0].region.symbolCols
+        pixels = string_at(encoder[0].image[0].pxl, rows * cols)
+        return Matrix(
+            rows=rows, cols=cols,
+            bits=bytes(_pack_1bpp(pixels, cols, rows, _BITS_DARK))
+        )
+
+
+def _symbol_geometry(width, height, module_size, margin_size):
+    """Returns the index in `SYMBOL_SIZES` and the (rows, cols) of the symbol
+    in an image returned by `encode`.
+
+    Raises:
+        PyLibDMTXError: If the image is not of a symbol with these module and
+            margin sizes.
+    """
+    cols, x_rest = divmod(width - 2 * margin_size, module_size)
+    rows, y_rest = divmod(height - 2 * margin_size, module_size)
+    for index, symbol in enumerate(SYMBOL_SIZES):
+        if (rows, cols) == (symbol.rows, symbol.cols) and not x_rest + y_rest:
+            return index, rows, cols
+    raise PyLibDMTXError(
+        'Image of {0} x {1} is not of a symbol with module_size [{2}] and '
+        'margin_size [{3}]'.format(width, height, module_size, margin_size)
+    )
+
+
+def _encoded_image(encoded):
+    """Returns `encoded` as a tuple (pixels, width, height) for `decode`.
+    """
+    width, height = encoded.width, encoded.height
+    if 1 == encoded.bpp:
+        # Unpack rows to one grey byte per pixel
+        packed = bytes(bytearray(encoded.pixels))
+        row_bytes = (width + 7) // 8
+        pixels = b''.join(
+            '{0:0{1}b}'.format(
+                int(hexlify(packed[offset:offset + row_bytes]), 16),
+                8 * row_bytes
+            )[:width].encode('ascii').translate(_GREY_1BPP)
+            for offset in range(0, row_bytes * height, row_bytes)
+        )
+    elif isinstance(encoded.pixels, bytes):
+        pixels = encoded.pixels
+    else:
+        pixels = bytes(bytearray(encoded.pixels))
+    return pixels, width, height
+
+
+def verify(encoded, data, module_size=None, margin_size=None, timeout=None):
+    """Returns True if the symbol in `encoded` decodes to `data`.
+
+    Rather than scanning the whole image, as `decode` does, the decoder is
+    told the size of the symbol, the length of its edges and where it is -
+    all of which follow from the size of the image and the `module_size` and
+    `margin_size` that it was encoded with - so that it is much quicker.
+
+    Args:
+        encoded (Encoded): As returned by `encode`, of any `bpp` and
+            `output`.
+        data (bytes): The data that should be encoded.
+        module_size (int): As given to `encode`.
+        margin_size (int): As given to `encode`.
+        timeout (int): milliseconds
+
+    Returns:
+        bool: If the symbol was decoded and its data is `data`.
+
+    Raises:
+        PyLibDMTXError: If `encoded` is not of a symbol with `module_size`
+            and `margin_size`.
+    """
+    if module_size is None:
+        module_size = _DEFAULT_MODULE_SIZE
+    if margin_size is None:
+        margin_size = _DEFAULT_MARGIN_SIZE
+
+    index, rows, cols = _symbol_geometry(
+        encoded.width, encoded.height, module_size, margin_size
+    )
+
+    # Edges within a module of their encoded length, and a region a module
+    # larger than the symbol
+    shortest, longest = sorted((rows * module_size, cols * module_size))
+    roi = (
+        margin_size - module_size, margin_size - module_size,
+        (cols + 2) * module_size, (rows + 2) * module_size
+    )
+    symbols = _select(
+        _encoded_image(encoded), timeout, None, 1, index, None, None,
+        shortest - module_size, longest + module_size, None, 1, None, roi
+    )
+    return [data] == [decoded for decoded, _, _, _ in symbols]
@@ -1,2 +1,9 @@
 class PyLibDMTXError(Exception):
     pass
+
+
+class PyLibDMTXTimeout(PyLibDMTXError):
+    """Raised when an isolated decode does not finish within its hard time
+    limit.
+    """
+    pass
@@ -0,0 +1,170 @@
+"""A quick estimate of the quality of an image - its sharpness, contrast and
+clipped highlights - so that frames that libdmtx will not read, such as those
+blurred by motion or overexposed, can be skipped rather than searched until
+`timeout`.
+
+Scores are computed on a sparse grid of samples of the image, each with its
+neighbours to the right and below at full resolution, so that blur is
+measured at the scale of the pixels but the cost is that of a small image.
+
+    >>> from pylibdmtx.quality import decode, estimate
+    >>> estimate(frame)
+    Quality(sharpness=0.08, contrast=0.71, saturation=0.02)
+    >>> decode(frame, min_sharpness=0.15, max_count=1)
+    []
+
+Requires numpy.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import pylibdmtx
+from .pylibdmtx import _bpp, _is_array, _pixel_data
+
+__all__ = ['Quality', 'decode', 'estimate', 'screen']
+
+# Scores between 0 and 1: the sharpness of edges, highest for steps from one
+# pixel to the next and lower the more pixels they are blurred over; the
+# difference between the darkest and lightest grey relative to 255; and the
+# fraction of pixels that are clipped white
+Quality = namedtuple('Quality', 'sharpness contrast saturation')
+
+# Grey values at or above which pixels are clipped
+_CLIPPED = 253
+
+# Pixels between each sample and the far neighbours that it is compared with
+_REACH = 8
+
+
+def _array(image):
+    """Returns `image`, as given to `decode`, as a (height, width, channels)
+    uint8 array: a view of uint8 numpy arrays and of tuples, and a writable
+    copy of PIL images.
+    """
+    if 'PIL.' in str(type(image)):
+        array = np.array(image)
+    elif _is_array(image):
+        array = np.asarray(image)
+    else:
+        pixels, width, height, bpp = _pixel_data(image)
+        return np.frombuffer(pixels, dtype=np.uint8).reshape(
+            height, width, bpp // 8
+        )
+    if np.uint8 != array.dtype:
+        array = array.astype(np.uint8)
+    height, width = array.shape[:2]
+    return array.reshape(
+        height, width, _bpp(array.size, width, height) // 8
+    )
+
+
+def _samples(image, size):
+    """Returns 2D float arrays of the grey values of a grid of at most about
+    `size` samples along the longer side of `image`, and of the pixels one
+    and `_REACH` pixels to the right of and below each sample.
+    """
+    array = _array(image)
+    height, width, channels = array.shape
+    step = max(1, max(width, height) // size)
+    rows, cols = max(height - _REACH, 0), max(width - _REACH, 0)
+
+    def grey(dy, dx):
+        view = array[dy:dy + rows:step, dx:dx + cols:step]
+        if channels < 3:
+            # Grey, or grey and alpha
+            return view[:, :, 0].astype(np.float32)
+        else:
+            return view[:, :, :3].mean(axis=2, dtype=np.float32)
+
+    return (
+        grey(0, 0), grey(0, 1), grey(0, _REACH), grey(1, 0), grey(_REACH, 0)
+    )
+
+
+def estimate(image, size=256):
+    """Returns the `Quality` of `image`.
+
+    Args:
+        image: As for `decode`.
+        size (int): Number of samples along the longer side of the image.
+
+    Returns:
+        :obj:`Quality`:
+    """
+    if size < 1:
+        raise ValueError('Invalid size [{0}]'.format(size))
+    samples, right, far_right, below, far_below = _samples(image, size)
+    if not samples.size:
+        return Quality(0.0, 0.0, 0.0)
+
+    # Percentiles, so that a few outlying pixels do not count
+    low, high = np.percentile(samples, (1, 99))
+    contrast = (high - low) / 255.0
+    saturation = np.count_nonzero(samples >= _CLIPPED) / float(samples.size)
+
+    # Over an edge, a step between neighbours is as large as the step to the
+    # far neighbour and a blur spreads it over several pixels. Samples with
+    # little difference from their far neighbours - flat areas and noise -
+    # do not count. Motion blurs edges across its direction only, so the
+    # less sharp direction counts.
+    threshold = (high - low) / 4.0
+    sharpness = 1.0 if high > low else 0.0
+    for near, far in ((right, far_right), (below, far_below)):
+        near, far = near - samples, far - samples
+        edges = np.abs(far) > threshold
+        if high > low and edges.any():
+            sharpness = min(sharpness, _REACH * float(
+                np.square(near[edges]).sum() / np.square(far[edges]).sum()
+            ))
+
+    return Quality(sharpness, float(contrast), float(saturation))
+
+
+def screen(image, min_sharpness=0.15, min_contrast=0.2, max_saturation=0.95,
+           size=256):
+    """Returns (True if `image` might be read, its `Quality`).
+
+    Args:
+        image: As for `decode`.
+        min_sharpness (float): Lowest sharpness of an image that might be
+            read, or `None`.
+        min_contrast (float): Lowest contrast, or `None`.
+        max_saturation (float): Highest fraction of clipped pixels, or
+            `None`. A symbol on a white label may leave most of an image
+            white.
+        size (int): As for `estimate`.
+    """
+    quality = estimate(image, size)
+    passes = (
+        (min_sharpness is None or quality.sharpness >= min_sharpness) and
+        (min_contrast is None or quality.contrast >= min_contrast) and
+        (max_saturation is None or quality.saturation <= max_saturation)
+    )
+    return passes, quality
+
+
+def decode(image, min_sharpness=0.15, min_contrast=0.2, max_saturation=0.95,
+           size=256, **kwargs):
+    """Decodes Data Matrix barcodes in `image` if it passes `screen`.
+
+    Args:
+        image: As for `decode`.
+        min_sharpness, min_contrast, max_saturation, size: As for `screen`.
+        **kwargs: Arguments to `decode`.
+
+    Returns:
+        :obj:`list` of :obj:`Decoded`: As `decode`; empty if the image did
+        not pass.
+    """
+    array = _array(image)
+    passes, _ = screen(
+        array, min_sharpness, min_contrast, max_saturation, size
+    )
+    if not passes:
+        return []
+    elif array.flags['C_CONTIGUOUS'] and array.flags['WRITEABLE']:
+        # Read in place, rather than copied again by decode
+        height, width = array.shape[:2]
+        image = (array.reshape(-1), width, height)
+    return pylibdmtx.decode(image, **kwargs)
@@ -0,0 +1,196 @@
+"""Decoding of the symbols on the tubes in a rack, or in the wells of any
+fixed-layout plate.
+
+The image of the rack is divided into a grid of wells, and each well is
+decoded separately, in a pool of threads, with hints of the size of the symbol
+that it can hold. Wells that are not read are retried with more thorough
+arguments.
+
+    >>> from pylibdmtx.rack import decode_rack
+    >>> res = decode_rack(image, wells=96, bounds=(40, 30, 1200, 800))
+    >>> res['A1'].data
+    b'FR01234567'
+    >>> [well for well, decoded in res.items() if decoded is None]
+    ['H12']
+
+Requires numpy.
+"""
+import multiprocessing
+import string
+from collections import namedtuple, OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from .pylibdmtx import _pixel_data, _symbol_size, decode, Decoded, Rect
+
+__all__ = ['ATTEMPTS', 'Attempt', 'LAYOUTS', 'decode_rack', 'well_names']
+
+# (rows, columns) of standard racks
+LAYOUTS = {
+    24: (4, 6),
+    48: (6, 8),
+    96: (8, 12),
+    384: (16, 24),
+}
+
+# An attempt at reading a well: the fraction of the pitch by which the well is
+# grown on each side, if to give decode the size hints and other arguments to
+# decode
+Attempt = namedtuple('Attempt', 'padding hints kwargs')
+
+# The first attempt at every well and then the retries of those not read
+ATTEMPTS = [
+    Attempt(0.0, True, {'shrink': 2, 'timeout': 100}),
+    Attempt(0.0, True, {'timeout': 250}),
+    Attempt(0.25, False, {'timeout': 1000, 'threshold': 5}),
+]
+
+
+def well_names(rows, columns, mirror=False):
+    """Returns a list of lists of the names of the wells, such as 'A1', by
+    their position in the image - rows of the rack from top to bottom and
+    columns left to right, or right to left if `mirror`.
+    """
+    names = [
+        ['{0}{1}'.format(string.ascii_uppercase[row], column + 1)
+         for column in range(columns)]
+        for row in range(rows)
+    ]
+    if mirror:
+        names = [list(reversed(row)) for row in names]
+    return names
+
+
+def _array(image):
+    """Returns `image`, as given to `decode`, as an array of shape
+    (height, width, channels).
+    """
+    pixels, width, height, bpp = _pixel_data(image)
+    return np.frombuffer(pixels, dtype=np.uint8).reshape(
+        height, width, bpp // 8
+    )
+
+
+def _decode_well(task):
+    """Decodes one well. Returns (name, `Decoded` in the coordinates of the
+    whole image, or `None`).
+    """
+    name, pixels, box, attempt, hints = task
+    kwargs = {}
+    if attempt.hints:
+        # Edges are measured in shrunk pixels
+        shrink = attempt.kwargs.get('shrink', 1)
+        kwargs.update(
+            shape=hints['shape'],
+            min_edge=hints['min_edge'] // shrink,
+            max_edge=-(-hints['max_edge'] // shrink),
+        )
+    kwargs.update(attempt.kwargs)
+
+    left, top, width, height = box
+    well = np.ascontiguousarray(pixels[top:top + height, left:left + width])
+    res = decode(well, max_count=1, **kwargs)
+    if not res:
+        return name, None
+
+    # Rects are measured from the bottom of the image, as by libdmtx
+    rect = res[0].rect
+    bottom = pixels.shape[0] - (top + height)
+    return name, Decoded(
+        res[0].data,
+        Rect(rect.left + left, rect.top + bottom, rect.width, rect.height)
+    )
+
+
+def decode_rack(image, wells=96, bounds=None, mirror=False, size=None,
+                min_edge=None, max_edge=None, workers=None,
+                attempts=ATTEMPTS):
+    """Decodes the symbol in each well of a rack.
+
+    Args:
+        image: As for `decode`.
+        wells: A key of `LAYOUTS` or a tuple (rows, columns).
+        bounds (tuple): (left, top, width, height) in pixels of the wells in
+            the image, measured from the top, or `None` if the wells fill
+            the image.
+        mirror (bool): If the image is of the underside of the rack, so that
+            column 1 is on the right.
+        size (str): The size of the symbols - one of `ENCODING_SIZE_NAMES` -
+            or `None` if it is not known.
+        min_edge (int): Pixels of the shortest edge of a symbol, or `None`
+            for a fifth of the pitch of the wells.
+        max_edge (int): Pixels of the longest edge of a symbol, or `None` for
+            the pitch of the wells.
+        workers (int): Number of threads, or `None` for the number of CPUs.
+        attempts: A sequence of `Attempt`; wells are retried with each
+            attempt after the first until they are read.
+
+    Returns:
+        :obj:`OrderedDict`: of the name of each well, in the order 'A1',
+        'A2'..., to its `Decoded`, in the coordinates of the whole image, or
+        `None` if it was not read.
+    """
+    if isinstance(wells, int):
+        if wells not in LAYOUTS:
+            raise ValueError('Invalid wells [{0}]'.format(wells))
+        rows, columns = LAYOUTS[wells]
+    else:
+        rows, columns = wells
+    if workers is not None and workers < 1:
+        raise ValueError('Invalid workers [{0}]'.format(workers))
+
+    pixels = _array(image)
+    image_height, image_width = pixels.shape[:2]
+    left, top, width, height = (
+        bounds if bounds else (0, 0, image_width, image_height)
+    )
+    pitch_x, pitch_y = width / float(columns), height / float(rows)
+    pitch = min(pitch_x, pitch_y)
+    hints = {
+        'shape': _symbol_size(size) if size else None,
+        'min_edge': int(pitch / 5) if min_edge is None else min_edge,
+        'max_edge': int(pitch) if max_edge is None else max_edge,
+    }
+
+    def box(position, padding):
+        """Returns the (left, top, width, height) of a well, clipped to the
+        image.
+        """
+        row, column = position
+        x0 = max(int(left + (column - padding) * pitch_x), 0)
+        y0 = max(int(top + (row - padding) * pitch_y), 0)
+        x1 = min(int(left + (column + 1 + padding) * pitch_x), image_width)
+        y1 = min(int(top + (row + 1 + padding) * pitch_y), image_height)
+        return x0, y0, x1 - x0, y1 - y0
+
+    names = well_names(rows, columns, mirror)
+    positions = dict(
+        (name, (row, column))
+        for row, row_names in enumerate(names)
+        for column, name in enumerate(row_names)
+    )
+    results = dict((name, None) for name in positions)
+    pending = sorted(positions)
+
+    pool = ThreadPool(workers or multiprocessing.cpu_count())
+    try:
+        for attempt in attempts:
+            if not pending:
+                break
+            tasks = [
+                (name, pixels, box(positions[name], attempt.padding), attempt,
+                 hints)
+                for name in pending
+            ]
+            for name, decoded in pool.imap_unordered(_decode_well, tasks):
+                results[name] = decoded
+            pending = [name for name in pending if results[name] is None]
+    finally:
+        pool.close()
+        pool.join()
+
+    return OrderedDict(
+        (name, results[name])
+        for row in well_names(rows, columns) for name in row
+    )
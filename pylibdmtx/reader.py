@@ -0,0 +1,75 @@
+"""Reading of image files to results that can be written as JSON, shared by
+`read_datamatrix` and `pylibdmtx.jobs`.
+"""
+import time
+
+from base64 import b64encode
+
+from .pylibdmtx import decode, decode_pages
+
+__all__ = ['DECODE_ARGUMENTS', 'DECODE_TYPES', 'read_image']
+
+
+# Arguments of `decode` that are exposed as flags
+DECODE_ARGUMENTS = [
+    ('timeout', 'milliseconds to spend on each image'),
+    ('gap_size', None),
+    ('shrink', 'scale image down by this factor before decoding'),
+    ('shape', 'DmtxSymbolSize of the barcodes to look for'),
+    ('deviation', None),
+    ('threshold', None),
+    ('min_edge', None),
+    ('max_edge', None),
+    ('corrections', None),
+    ('max_count', 'stop after reading this many barcodes from each image'),
+    ('max_regions', 'stop after trying this many candidate regions'),
+    ('max_failures', 'stop after this many regions could not be decoded'),
+    ('max_scan', 'stop after searching this fraction of the image'),
+]
+
+# Types of the flags in DECODE_ARGUMENTS that are not int
+DECODE_TYPES = {'max_scan': float}
+
+
+def read_image(task):
+    """Decodes the image at `path` - every page of it if `pages` - returning a
+    dict that can be written as JSON and a list of the decoded data.
+
+    The worker of `read_datamatrix` and of `pylibdmtx.jobs`. It runs in
+    worker processes, so takes the single argument `task` of
+    (path, kwargs to `decode`, pages) and does not raise.
+    """
+    path, kwargs, pages = task
+    start = time.time()
+    result = {'path': path}
+    try:
+        if pages:
+            # Pages are loaded as they are decoded
+            loaded = start
+            barcodes = list(decode_pages(path, **kwargs))
+        else:
+            from PIL import Image
+            with Image.open(path) as image:
+                image.load()
+                loaded = time.time()
+                barcodes = [(None, d) for d in decode(image, **kwargs)]
+    except Exception as e:
+        result['error'] = '{0}: {1}'.format(type(e).__name__, e)
+        result['barcodes'] = []
+        barcodes = []
+    else:
+        result['barcodes'] = []
+        for page, barcode in barcodes:
+            item = {
+                'data': barcode.data.decode('utf-8', 'replace'),
+                'base64': b64encode(barcode.data).decode('ascii'),
+                'rect': barcode.rect._asdict(),
+            }
+            if pages:
+                item['page'] = page
+            result['barcodes'].append(item)
+        if not pages:
+            result['load_seconds'] = round(loaded - start, 6)
+        result['decode_seconds'] = round(time.time() - loaded, 6)
+    result['seconds'] = round(time.time() - start, 6)
+    return result, [barcode.data for page, barcode in barcodes]
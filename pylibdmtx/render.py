@@ -0,0 +1,161 @@
+"""Renders the module matrices returned by `encode_matrix` as vector paths and
+as images at any scale.
+"""
+import re
+from binascii import hexlify
+
+from .pylibdmtx import Encoded, _pack_1bpp
+from .pylibdmtx_error import PyLibDMTXError
+
+__all__ = ['pdf_path', 'raster', 'svg', 'svg_path']
+
+# A run of dark modules within a row
+_RUN = re.compile('1+')
+
+
+def _rows(matrix):
+    """Yields the rows of `matrix` as strings of '0' (light) and '1' (dark).
+    """
+    row_bytes = (matrix.cols + 7) // 8
+    fmt = '0{0}b'.format(8 * row_bytes)
+    for offset in range(0, matrix.rows * row_bytes, row_bytes):
+        row = matrix.bits[offset:offset + row_bytes]
+        yield format(int(hexlify(row), 16), fmt)[:matrix.cols]
+
+
+def _runs(matrix):
+    """Yields (row, start, length) of each horizontal run of dark modules.
+    """
+    for row, bits in enumerate(_rows(matrix)):
+        for run in _RUN.finditer(bits):
+            yield row, run.start(), run.end() - run.start()
+
+
+def _number(value):
+    """Formats `value` compactly, without a trailing '.0'.
+    """
+    return '{0:.4f}'.format(value).rstrip('0').rstrip('.')
+
+
+def svg_path(matrix, module_size=1, margin_size=2):
+    """Returns SVG path data that draws the dark modules of `matrix`.
+
+    Args:
+        matrix (Matrix): As returned by `encode_matrix`.
+        module_size (number): User units per module.
+        margin_size (number): User units of quiet zone left of and above the
+            symbol.
+
+    Returns:
+        str: Path data, with the origin at the top left.
+    """
+    return ''.join(
+        'M{0} {1}h{2}v{3}h-{2}z'.format(
+            _number(margin_size + col * module_size),
+            _number(margin_size + row * module_size),
+            _number(length * module_size),
+            _number(module_size)
+        )
+        for row, col, length in _runs(matrix)
+    )
+
+
+def svg(matrix, module_size=1, margin_size=2, dark='#000', light='#fff'):
+    """Returns an SVG document of `matrix`.
+
+    Args:
+        matrix (Matrix): As returned by `encode_matrix`.
+        module_size (number): User units per module.
+        margin_size (number): User units of quiet zone around the symbol.
+        dark (str): Fill colour of dark modules.
+        light (str): Fill colour of the background, or `None` for a
+            transparent background.
+
+    Returns:
+        str: The SVG document.
+    """
+    width = _number(2 * margin_size + matrix.cols * module_size)
+    height = _number(2 * margin_size + matrix.rows * module_size)
+    background = (
+        '<rect width="{0}" height="{1}" fill="{2}"/>'.format(
+            width, height, light
+        ) if light else ''
+    )
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{1}" '
+        'viewBox="0 0 {0} {1}" shape-rendering="crispEdges">'
+        '{2}<path fill="{3}" d="{4}"/></svg>'
+    ).format(
+        width, height, background, dark,
+        svg_path(matrix, module_size, margin_size)
+    )
+
+
+def pdf_path(matrix, module_size=1, margin_size=2):
+    """Returns PDF content stream operators that fill the dark modules of
+    `matrix` in the current fill colour.
+
+    Args:
+        matrix (Matrix): As returned by `encode_matrix`.
+        module_size (number): User space units per module.
+        margin_size (number): User space units of quiet zone around the
+            symbol.
+
+    Returns:
+        str: Operators with the origin at the bottom left of the quiet zone,
+        as PDF's default user space.
+    """
+    top = 2 * margin_size + matrix.rows * module_size
+    operators = [
+        '{0} {1} {2} {3} re'.format(
+            _number(margin_size + col * module_size),
+            _number(top - margin_size - (row + 1) * module_size),
+            _number(length * module_size),
+            _number(module_size)
+        )
+        for row, col, length in _runs(matrix)
+    ]
+    operators.append('f')
+    return '\n'.join(operators)
+
+
+def raster(matrix, module_size=5, margin_size=10, bpp=24):
+    """Returns an image of `matrix`.
+
+    The defaults are those of `encode`, so `raster(encode_matrix(data))` has
+    the same pixels as `encode(data)`.
+
+    Args:
+        matrix (Matrix): As returned by `encode_matrix`.
+        module_size (int): Pixels per module.
+        margin_size (int): Pixels of quiet zone around the symbol.
+        bpp (int): 24, 8 or 1 - as the `bpp` argument to `encode`.
+
+    Returns:
+        Encoded: with properties `(width, height, bpp, pixels)`.
+    """
+    if bpp not in (1, 8, 24):
+        raise PyLibDMTXError(
+            'Unsupported bits-per-pixel: [{0}] Should be one of {1}'.format(
+                bpp, [1, 8, 24]
+            )
+        )
+
+    channels = 3 if 24 == bpp else 1
+    dark, light = b'\x00' * channels, b'\xff' * channels
+    modules = {'1': dark * module_size, '0': light * module_size}
+    width = 2 * margin_size + matrix.cols * module_size
+    height = 2 * margin_size + matrix.rows * module_size
+    margin = light * margin_size
+    blank = [light * width] * margin_size
+
+    rows = list(blank)
+    for bits in _rows(matrix):
+        row = b''.join([modules[bit] for bit in bits])
+        rows.extend([margin + row + margin] * module_size)
+    rows.extend(blank)
+
+    pixels = b''.join(rows)
+    if 1 == bpp:
+        pixels = bytes(_pack_1bpp(pixels, width, height))
+    return Encoded(width=width, height=height, bpp=bpp, pixels=pixels)
@@ -0,0 +1,157 @@
+"""Reusable buffers for the conversions of pixels that `decode` can not avoid.
+
+libdmtx reads 8-bit pixels from one contiguous buffer, so a numpy array of
+another dtype, or one that is not contiguous, is converted into a new buffer
+on every call, as is a colour image that `pylibdmtx.proposals` reduces to
+grey. Given a `ScratchArena`, these conversions write into buffers that are
+returned to the arena when the call ends and reused by later calls on the
+same thread.
+
+    >>> from pylibdmtx.scratch import ScratchArena
+    >>> scratch = ScratchArena(max_bytes=256 * 2**20)
+    >>> for frame in frames:
+    ...     decode(frame, scratch=scratch, max_count=1)
+    >>> scratch.stats().reuse_rate
+    0.998
+"""
+import threading
+import weakref
+from collections import namedtuple
+
+__all__ = ['ScratchArena', 'ScratchStats']
+
+# Counters of a ScratchArena
+ScratchStats = namedtuple(
+    'ScratchStats',
+    'requests reuses allocations discards buffers bytes reuse_rate'
+)
+
+
+class _Pool(object):
+    """The free buffers of one thread, by bucket size. Held only by the
+    thread, so that it and its buffers are dropped when the thread exits.
+    """
+    def __init__(self):
+        self.free = {}
+        self.buffers = self.bytes = 0
+
+
+class ScratchArena(object):
+    """Buffers in buckets of powers of two bytes, in a pool for each thread.
+
+    Args:
+        max_bytes (int): Largest number of bytes of buffers that are kept for
+            reuse, by all threads that are alive. Buffers returned beyond
+            this are discarded.
+        min_bucket (int): Bytes of the smallest bucket.
+    """
+    def __init__(self, max_bytes=64 << 20, min_bucket=1 << 12):
+        if max_bytes < 0:
+            raise ValueError('Invalid max_bytes [{0}]'.format(max_bytes))
+        elif min_bucket < 1:
+            raise ValueError('Invalid min_bucket [{0}]'.format(min_bucket))
+        self.max_bytes = max_bytes
+        self.min_bucket = min_bucket
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # The pools of the threads that are alive
+        self._pools = weakref.WeakSet()
+        self._requests = self._reuses = self._allocations = 0
+        self._discards = 0
+
+    def _bucket(self, nbytes):
+        """Returns the size of the bucket for a request of `nbytes`.
+        """
+        size = self.min_bucket
+        while size < nbytes:
+            size <<= 1
+        return size
+
+    def _pool(self):
+        """Returns the pool of this thread.
+        """
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            pool = self._local.pool = _Pool()
+            with self._lock:
+                self._pools.add(pool)
+        return pool
+
+    def _totals(self):
+        """Returns the (buffers, bytes) kept for reuse, with the lock held.
+        """
+        pools = list(self._pools)
+        return (
+            sum(pool.buffers for pool in pools),
+            sum(pool.bytes for pool in pools)
+        )
+
+    def acquire(self, nbytes):
+        """Returns a writable buffer of at least `nbytes`, reused if this
+        thread has released one of the same bucket.
+
+        Returns:
+            bytearray: Of the size of the bucket, to be given to `release`
+            when done. Not a view of `nbytes`, as neither ctypes nor numpy
+            can use a memoryview as a buffer on Python 2.
+        """
+        size = self._bucket(nbytes)
+        pool = self._pool()
+        with self._lock:
+            self._requests += 1
+            free = pool.free.get(size)
+            if free:
+                buffer = free.pop()
+                self._reuses += 1
+                pool.buffers -= 1
+                pool.bytes -= size
+            else:
+                buffer = None
+                self._allocations += 1
+        if buffer is None:
+            buffer = bytearray(size)
+        return buffer
+
+    def release(self, buffer):
+        """Returns `buffer`, from `acquire`, to this thread's pool, unless
+        that would keep more than `max_bytes`. `buffer` must not be used
+        afterwards.
+        """
+        size = len(buffer)
+        pool = self._pool()
+        with self._lock:
+            if self._totals()[1] + size > self.max_bytes:
+                self._discards += 1
+            else:
+                pool.free.setdefault(size, []).append(buffer)
+                pool.buffers += 1
+                pool.bytes += size
+
+    def stats(self):
+        """Returns the counters of this arena.
+
+        Returns:
+            ScratchStats: `buffers` and `bytes` are those kept for reuse by
+            threads that are alive and `reuse_rate` is the fraction of
+            requests met by them.
+        """
+        with self._lock:
+            buffers, nbytes = self._totals()
+            return ScratchStats(
+                requests=self._requests, reuses=self._reuses,
+                allocations=self._allocations, discards=self._discards,
+                buffers=buffers, bytes=nbytes,
+                reuse_rate=(
+                    float(self._reuses) / self._requests
+                    if self._requests else 0.0
+                )
+            )
+
+    def clear(self):
+        """Discards all buffers kept for reuse and resets the counters.
+        """
+        with self._lock:
+            self._local = threading.local()
+            self._pools = weakref.WeakSet()
+            self._requests = self._reuses = self._allocations = 0
+            self._discards = 0
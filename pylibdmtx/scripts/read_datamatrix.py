@@ -2,32 +2,182 @@
 from __future__ import print_function
 
 import argparse
+import glob
+import json
+import os
+import re
 import sys
 
 import pylibdmtx
-from pylibdmtx.pylibdmtx import decode
+from pylibdmtx.reader import DECODE_ARGUMENTS, DECODE_TYPES, read_image
 
 
-def main(args=None):
+def _image_files(directory, recursive):
+    """Yields paths of files in `directory` that PIL can open, sorted by name.
+    """
+    from PIL import Image
+
+    extensions = Image.registered_extensions()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(root, name)
+        if not recursive:
+            break
+
+
+def _glob(pattern, recursive):
+    """Yields paths that match `pattern`, sorted within each directory. If
+    `recursive`, a '**' component of `pattern` matches any number of
+    directories.
+    """
+    components = pattern.replace(os.altsep or os.sep, os.sep).split(os.sep)
+    if not recursive or '**' not in components:
+        for path in sorted(glob.glob(pattern)):
+            yield path
+        return
+
+    index = components.index('**')
+    head = os.sep.join(components[:index])
+    if not head:
+        head = os.sep if index else os.curdir
+    tail = os.sep.join(components[index + 1:]) or '*'
+    roots = glob.glob(head) if glob.has_magic(head) else [head]
+    for root in sorted(roots):
+        for directory, dirs, files in os.walk(root):
+            dirs.sort()
+            # Escapes magic characters, as glob.escape
+            directory = re.sub(r'([*?[])', r'[\1]', directory)
+            for path in _glob(os.path.join(directory, tail), recursive):
+                # Without the './' of the current directory, as glob
+                yield path if index else os.path.normpath(path)
+
+
+def _paths(args, stdin):
+    """Yields paths of the images to read, from `args.image` and, if that is
+    empty or '-', from the lines of `stdin`.
+    """
+    if not args.image or ['-'] == args.image:
+        names = (line.strip() for line in stdin)
+    else:
+        names = args.image
+
+    for name in names:
+        if not name:
+            continue
+        elif os.path.isdir(name):
+            for path in _image_files(name, args.recursive):
+                yield path
+        elif not os.path.exists(name) and glob.has_magic(name):
+            for path in _glob(name, args.recursive):
+                if os.path.isdir(path):
+                    for path in _image_files(path, args.recursive):
+                        yield path
+                else:
+                    yield path
+        else:
+            yield name
+
+
+def _results(tasks, jobs):
+    """Yields the results of `read_image` for each of `tasks`, using `jobs`
+    processes. Results are in order of completion if `jobs` > 1.
+    """
+    if jobs > 1:
+        from multiprocessing import Pool
+
+        pool = Pool(jobs)
+        try:
+            for result in pool.imap_unordered(read_image, tasks, chunksize=1):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for task in tasks:
+            yield read_image(task)
+
+
+def main(args=None, stdin=None):
     if args is None:
         args = sys.argv[1:]
+    if stdin is None:
+        stdin = sys.stdin
 
     parser = argparse.ArgumentParser(
         description='Reads datamatrix barcodes in images'
     )
-    parser.add_argument('image', nargs='+')
+    parser.add_argument(
+        'image', nargs='*',
+        help="Image files, directories or glob patterns; '-' or none to read "
+             "a list of files, one per line, from stdin"
+    )
+    parser.add_argument(
+        '-r', '--recursive', action='store_true',
+        help="Read images in subdirectories; '**' in patterns matches any "
+             "number of directories"
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='Number of worker processes; default is 1'
+    )
+    parser.add_argument(
+        '--json', action='store_true',
+        help='Write a JSON object per image, with rects and timings'
+    )
+    for name, help in DECODE_ARGUMENTS:
+        parser.add_argument(
+            '--' + name.replace('_', '-'), type=DECODE_TYPES.get(name, int),
+            help=help
+        )
+    parser.add_argument(
+        '--accept', metavar='PATTERN',
+        help='Report only barcodes whose data matches this regular '
+             'expression, stopping at the first unless --max-count is given'
+    )
+    parser.add_argument(
+        '--vertices', action='store_true',
+        help='Report the four vertices of barcodes rather than a rect'
+    )
+    parser.add_argument(
+        '--pages', action='store_true',
+        help='Read every page of multi-page images, such as TIFF stacks, '
+             'loading one page at a time'
+    )
     parser.add_argument(
         '-v', '--version', action='version',
         version='%(prog)s ' + pylibdmtx.__version__
     )
     args = parser.parse_args(args)
+    if args.jobs < 1:
+        parser.error('--jobs should be at least 1')
 
-    from PIL import Image
+    kwargs = dict(
+        (name, getattr(args, name)) for name, _ in DECODE_ARGUMENTS
+        if getattr(args, name) is not None
+    )
+    if args.vertices:
+        kwargs['return_vertices'] = True
+    if args.accept:
+        kwargs['accept'] = args.accept
+
+    tasks = ((path, kwargs, args.pages) for path in _paths(args, stdin))
+    failed = False
+    for result, data in _results(tasks, args.jobs):
+        failed = failed or 'error' in result
+        if args.json:
+            print(json.dumps(result, sort_keys=True))
+        elif 'error' in result:
+            print('{0}: {1}'.format(result['path'], result['error']),
+                  file=sys.stderr)
+        else:
+            for value in data:
+                print(value)
+        sys.stdout.flush()
 
-    for image in args.image:
-        for barcode in decode(Image.open(image)):
-            print(barcode.data)
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
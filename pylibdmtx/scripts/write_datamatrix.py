@@ -2,7 +2,12 @@
 from __future__ import print_function
 
 import argparse
+import csv
+import io
 import sys
+import time
+
+from functools import partial
 
 import pylibdmtx
 from pylibdmtx.pylibdmtx import (
@@ -10,16 +15,117 @@ from pylibdmtx.pylibdmtx import (
 )
 
 
-def main(args=None):
+def _save(filename, data, **kwargs):
+    """Encodes the str `data` to a new image file.
+    """
+    from PIL import Image
+
+    encoded = encode(data.encode('utf-8'), **kwargs)
+    im = Image.frombytes('RGB', (encoded.width, encoded.height), encoded.pixels)
+    im.save(filename)
+
+
+def _write(row, **kwargs):
+    """Encodes `row` (filename, data) to a new image file. Runs in worker
+    processes, so returns (filename, error message or `None`) rather than
+    raising.
+    """
+    filename, data = row
+    try:
+        _save(filename, data, **kwargs)
+    except Exception as e:
+        return filename, '{0}: {1}'.format(type(e).__name__, e)
+    else:
+        return filename, None
+
+
+def _rows(stream, malformed):
+    """Yields (filename, data) from the CSV rows in `stream`. Rows that are
+    not of two columns are reported and their line numbers appended to the
+    list `malformed`. On Python 2, `stream` is of bytes, as csv reads only
+    bytes, and fields are decoded from UTF-8.
+    """
+    for line, row in enumerate(csv.reader(stream), start=1):
+        row = [
+            f.decode('utf-8') if isinstance(f, bytes) else f for f in row
+        ]
+        if not row:
+            continue
+        elif 2 != len(row):
+            malformed.append(line)
+            print(
+                'Line {0}: expected filename,data but got {1} columns'.format(
+                    line, len(row)
+                ),
+                file=sys.stderr
+            )
+        else:
+            yield tuple(row)
+
+
+def _bulk(stream, jobs, kwargs):
+    """Writes an image for each row of the CSV `stream`, using `jobs`
+    processes. Returns the number of rows that could not be written or were
+    malformed.
+    """
+    write = partial(_write, **kwargs)
+    start = time.time()
+    written = failed = 0
+    malformed = []
+    rows = _rows(stream, malformed)
+    if jobs > 1:
+        from multiprocessing import Pool
+
+        pool = Pool(jobs)
+        results = pool.imap_unordered(write, rows, chunksize=16)
+    else:
+        pool = None
+        results = (write(row) for row in rows)
+
+    try:
+        for filename, error in results:
+            if error:
+                failed += 1
+                print('{0}: {1}'.format(filename, error), file=sys.stderr)
+            else:
+                written += 1
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+    failed += len(malformed)
+
+    seconds = time.time() - start
+    print(
+        'Wrote {0} images in {1:.2f}s ({2:.1f} images/s); {3} failed'.format(
+            written, seconds, written / seconds if seconds else 0.0, failed
+        ),
+        file=sys.stderr
+    )
+    return failed
+
+
+def main(args=None, stdin=None):
     if args is None:
         args = sys.argv[1:]
 
     parser = argparse.ArgumentParser(
         description='Writes a datamatrix barcode to a new image file'
     )
-    parser.add_argument('file', help='Filename of the output image')
     parser.add_argument(
-        'data', help='Data to be written; will be utf-8 encoded'
+        'file', nargs='?', help='Filename of the output image'
+    )
+    parser.add_argument(
+        'data', nargs='?', help='Data to be written; will be utf-8 encoded'
+    )
+    parser.add_argument(
+        '--bulk', metavar='CSV',
+        help="Write an image for each filename,data row of this CSV file; "
+             "'-' for stdin"
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='Number of worker processes for --bulk; default is 1'
     )
     parser.add_argument(
         '--size',
@@ -31,20 +137,45 @@ def main(args=None):
         help="Encoding method; default is 'Ascii'",
         choices=ENCODING_SCHEME_NAMES
     )
+    parser.add_argument(
+        '--module-size', type=int, help='Pixels per module; default is 5'
+    )
+    parser.add_argument(
+        '--margin-size', type=int, help='Pixels of margin; default is 10'
+    )
     parser.add_argument(
         '-v', '--version', action='version',
         version='%(prog)s ' + pylibdmtx.__version__
     )
     args = parser.parse_args(args)
 
-    from PIL import Image
+    kwargs = {
+        'size': args.size,
+        'scheme': args.scheme,
+        'module_size': args.module_size,
+        'margin_size': args.margin_size,
+    }
 
-    encoded = encode(
-        args.data.encode('utf-8'), size=args.size, scheme=args.scheme
-    )
-    im = Image.frombytes('RGB', (encoded.width, encoded.height), encoded.pixels)
-    im.save(args.file)
+    if args.bulk:
+        if args.file or args.data:
+            parser.error('file and data can not be given with --bulk')
+        elif args.jobs < 1:
+            parser.error('--jobs should be at least 1')
+        elif '-' == args.bulk:
+            stream = stdin if stdin is not None else sys.stdin
+            return 1 if _bulk(stream, args.jobs, kwargs) else 0
+        elif sys.version_info[0] < 3:
+            with open(args.bulk, 'rb') as stream:
+                return 1 if _bulk(stream, args.jobs, kwargs) else 0
+        else:
+            with io.open(args.bulk, newline='', encoding='utf-8') as stream:
+                return 1 if _bulk(stream, args.jobs, kwargs) else 0
+    elif args.file is None or args.data is None:
+        parser.error('file and data are required unless --bulk is given')
+    else:
+        _save(args.file, args.data, **kwargs)
+        return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,691 @@
+#!/usr/bin/env python
+"""A local decode service, shared by the processes on a host.
+
+The service holds a pool of warm worker processes and listens on a Unix
+socket or a localhost TCP port. Requests are queued by priority -
+'interactive' requests are always taken before 'bulk' ones - and gathered
+into micro-batches, each of which is one round trip to a worker. A worker
+that exits, or that has not returned a batch a few seconds past the timeouts
+of its requests, is replaced and the requests of the batch fail.
+
+    python -m pylibdmtx.service --socket /tmp/pylibdmtx.sock --workers 4
+
+`DecodeClient.decode` has the signature of `decode`:
+
+    >>> client = DecodeClient('/tmp/pylibdmtx.sock')
+    >>> client.decode(image, max_count=1, priority='bulk')
+    >>> client.metrics()
+
+Messages are framed as a big-endian header of the lengths of a JSON object
+and of a binary body, followed by them. Decode requests carry pixels in the
+body.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import stat
+import struct
+import sys
+import threading
+import time
+from base64 import b64decode, b64encode
+from collections import deque
+from numbers import Real
+
+try:
+    import queue
+    import socketserver
+except ImportError:
+    # Python 2
+    import Queue as queue
+    import SocketServer as socketserver
+
+from .isolation import _Worker
+from .pylibdmtx_error import PyLibDMTXError
+
+__all__ = ['DecodeClient', 'DecodeService', 'PRIORITIES']
+
+# In the order in which queues are served
+PRIORITIES = ['interactive', 'bulk']
+
+# Lengths of the JSON header and of the body
+_FRAME = struct.Struct('>II')
+
+# Seconds beyond the timeouts of the requests in a batch after which it is
+# failed and its worker replaced, as the worker may be stuck in libdmtx
+_GRACE = 5.0
+
+# Hosts that a TCP service may listen on
+_LOCALHOST = ('127.0.0.1', 'localhost', '::1')
+
+# Arguments of decode that can be sent to the service
+_DECODE_ARGUMENTS = (
+    'timeout', 'gap_size', 'shrink', 'shape', 'deviation', 'threshold',
+    'min_edge', 'max_edge', 'corrections', 'max_count', 'return_vertices',
+    'accept', 'max_regions', 'max_failures', 'max_scan',
+)
+
+
+def _send(sock, header, body=b''):
+    header = json.dumps(header).encode('utf-8')
+    sock.sendall(_FRAME.pack(len(header), len(body)) + header + body)
+
+
+def _recv_exactly(sock, n):
+    chunks = []
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise EOFError()
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv(sock):
+    """Returns (header, body) of the next message on `sock`.
+
+    Raises:
+        EOFError: If `sock` was closed.
+    """
+    header_length, body_length = _FRAME.unpack(
+        _recv_exactly(sock, _FRAME.size)
+    )
+    header = json.loads(_recv_exactly(sock, header_length).decode('utf-8'))
+    return header, _recv_exactly(sock, body_length)
+
+
+def _is_path(address):
+    """Returns True if `address` is the path of a Unix socket, rather than
+    (host, port).
+    """
+    return not isinstance(address, (tuple, list))
+
+
+def _decode_kwargs(kwargs):
+    """Returns `kwargs` of a request, which should all be arguments of
+    `decode` that can be sent to the service.
+
+    Raises:
+        ValueError: If there are other arguments.
+    """
+    unknown = set(kwargs).difference(_DECODE_ARGUMENTS)
+    if unknown:
+        raise ValueError('Invalid arguments {0}'.format(sorted(unknown)))
+    return kwargs
+
+
+def _remove_socket(path):
+    """Removes the Unix socket at `path`, if there is one.
+
+    Raises:
+        PyLibDMTXError: If `path` is not a socket.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise PyLibDMTXError('Not a socket [{0}]'.format(path))
+    os.unlink(path)
+
+
+def _decode_batch(batch):
+    """Decodes each (pixels, width, height, kwargs) of `batch` in a worker
+    process. Returns a list of (True, list of Decoded) or (False, exception).
+    """
+    from .pylibdmtx import decode
+
+    results = []
+    for pixels, width, height, kwargs in batch:
+        try:
+            results.append((True, decode((pixels, width, height), **kwargs)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+def _serve(conn):
+    """The loop of a worker process: decodes each batch received on `conn`
+    and sends back its results.
+    """
+    from . import pylibdmtx  # noqa: F401
+
+    conn.send('ready')
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError:
+            break
+        if batch is None:
+            break
+
+        results = _decode_batch(batch)
+        try:
+            conn.send(results)
+        except Exception as e:
+            # Results that could not be pickled
+            conn.send([(False, PyLibDMTXError(str(e)))] * len(batch))
+    conn.close()
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _Request(object):
+    """A decode request waiting in a queue and then for its result.
+    """
+    def __init__(self, pixels, width, height, kwargs):
+        self.task = (pixels, width, height, kwargs)
+        self.queued = time.time()
+        self.started = None
+        self.done = threading.Event()
+        self.result = None
+
+
+class DecodeService(object):
+    """Serves decode requests from a pool of worker processes.
+
+    Args:
+        address: Path of a Unix socket, or (host, port) of a localhost TCP
+            socket. Port 0 picks a free port; see `address` once started.
+        workers (int): Number of worker processes.
+        batch_size (int): Maximum number of requests in a batch.
+        batch_wait (float): Seconds to wait for a batch to fill once it has
+            its first request.
+    """
+    def __init__(self, address, workers=None, batch_size=8, batch_wait=0.002):
+        if not _is_path(address) and address[0] not in _LOCALHOST:
+            raise ValueError(
+                'Invalid address [{0}]: should be a Unix socket path or a '
+                'localhost (host, port)'.format(address)
+            )
+        elif batch_size < 1:
+            raise ValueError('Invalid batch_size [{0}]'.format(batch_size))
+
+        self.address = address
+        self.workers = workers or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queues = dict((p, queue.Queue()) for p in PRIORITIES)
+        self._waiting = threading.Condition()
+        # A batch is only made when a worker is free to take it, so that
+        # queued requests keep their priority
+        self._in_flight = threading.Semaphore(self.workers)
+        self._batches = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=10000)
+        self._waits = deque(maxlen=10000)
+        self._counts = {'requests': 0, 'errors': 0, 'batches': 0}
+        self._workers = []
+        self._server = None
+        self._dispatcher = None
+        self._threads = []
+        self._stopping = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Starts the workers and listens for requests in background threads.
+
+        Raises:
+            PyLibDMTXError: If `address` is a path to something other than a
+                socket, or if a worker did not start.
+        """
+        if _is_path(self.address):
+            # Left by a service that did not stop
+            _remove_socket(self.address)
+        workers = [self._start_worker() for _ in range(self.workers)]
+        for worker in workers:
+            worker.wait_ready()
+        service = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                service._handle(self.request)
+
+        if _is_path(self.address):
+            base = socketserver.ThreadingUnixStreamServer
+        else:
+            base = socketserver.ThreadingTCPServer
+
+        # The servers of socketserver are old-style classes on Python 2
+        class Server(base):
+            daemon_threads = True
+
+        if not _is_path(self.address) and ':' in self.address[0]:
+            Server.address_family = socket.AF_INET6
+        self._server = Server(self.address, Handler)
+        if not _is_path(self.address):
+            self.address = self._server.server_address[:2]
+
+        self._dispatcher = threading.Thread(target=self._dispatch)
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever),
+            self._dispatcher,
+        ]
+        self._threads.extend(
+            threading.Thread(target=self._run, args=(worker,))
+            for worker in workers
+        )
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def serve_forever(self):
+        """Starts and blocks until interrupted.
+        """
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stops listening and stops the workers.
+        """
+        self._stopping = True
+        with self._waiting:
+            self._waiting.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.kill()
+        if self._dispatcher:
+            # No more batches once the dispatcher has returned
+            self._dispatcher.join()
+        for _ in workers:
+            self._batches.put(None)
+        self._fail_all(PyLibDMTXError('Decode service stopped'))
+        if self._server and _is_path(self.address):
+            _remove_socket(self.address)
+
+    def submit(self, pixels, width, height, kwargs, priority='interactive'):
+        """Queues a decode and returns the list of `Decoded`, blocking until
+        it is done.
+
+        Raises:
+            ValueError: If `priority` is not one of `PRIORITIES`.
+            PyLibDMTXError: If the worker that was decoding the request
+                exited, or if the request has a timeout and the worker did
+                not return long after it.
+        """
+        if priority not in self._queues:
+            raise ValueError('Invalid priority [{0}]'.format(priority))
+        timeout = kwargs.get('timeout')
+        if timeout is not None and not isinstance(timeout, Real):
+            raise ValueError('Invalid timeout [{0}]'.format(timeout))
+        request = _Request(pixels, width, height, kwargs)
+        self._queues[priority].put(request)
+        with self._waiting:
+            self._waiting.notify()
+        request.done.wait()
+
+        with self._lock:
+            self._counts['requests'] += 1
+            self._latencies.append(time.time() - request.queued)
+            self._waits.append(request.started - request.queued)
+            success, result = request.result
+            if not success:
+                self._counts['errors'] += 1
+
+        if success:
+            return result
+        else:
+            raise result
+
+    def _next(self, block):
+        """Returns the next request, taken from the highest priority queue
+        that is not empty, or `None`.
+        """
+        with self._waiting:
+            while not self._stopping:
+                for priority in PRIORITIES:
+                    try:
+                        return self._queues[priority].get_nowait()
+                    except queue.Empty:
+                        pass
+                if not block:
+                    return None
+                self._waiting.wait(0.1)
+        return None
+
+    def _dispatch(self):
+        """Gathers requests into batches and sends them to the workers.
+        """
+        while not self._stopping:
+            self._in_flight.acquire()
+            first = self._next(block=True)
+            if first is None:
+                self._in_flight.release()
+                continue
+
+            batch = [first]
+            deadline = time.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                request = self._next(block=False)
+                if request is not None:
+                    batch.append(request)
+                elif time.time() < deadline:
+                    time.sleep(self.batch_wait / 4.0)
+                else:
+                    break
+
+            with self._lock:
+                self._counts['batches'] += 1
+            self._batches.put(batch)
+
+    def _start_worker(self):
+        """Returns a new worker, or `None` if the service is stopping.
+        """
+        with self._lock:
+            if self._stopping:
+                return None
+            worker = _Worker(multiprocessing, _serve)
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker):
+        """Kills `worker` and returns its replacement, or `None` if the
+        service is stopping.
+        """
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        return self._start_worker()
+
+    def _run(self, worker):
+        """Sends batches to `worker` until the service stops, replacing the
+        worker if it exits or is past the deadline of its batch.
+        """
+        while worker is not None:
+            batch = self._batches.get()
+            if batch is None:
+                break
+            worker, results = self._decode(worker, batch)
+            self._done(batch, results)
+
+    def _decode(self, worker, batch):
+        """Decodes `batch` on `worker`. Returns the worker for the next
+        batch and a list of (True, list of Decoded) or (False, exception).
+        """
+        now = time.time()
+        for request in batch:
+            request.started = now
+        timeouts = [r.task[3].get('timeout') for r in batch]
+        if None in timeouts:
+            limit = None
+        else:
+            limit = sum(timeouts) / 1000.0 + _GRACE
+
+        try:
+            worker.wait_ready()
+            worker.conn.send([r.task for r in batch])
+            if worker.conn.poll(limit):
+                return worker, worker.conn.recv()
+            error = PyLibDMTXError('Decode did not return within its timeout')
+        except PyLibDMTXError as e:
+            # From wait_ready
+            error = e
+        except (EOFError, IOError, OSError):
+            error = PyLibDMTXError(
+                'A decode worker exited while the request was in progress'
+            )
+        if self._stopping:
+            error = PyLibDMTXError('Decode service stopped')
+        return self._replace(worker), [(False, error)] * len(batch)
+
+    def _done(self, batch, results):
+        """Gives `results` to the requests of `batch`.
+        """
+        self._in_flight.release()
+        for request, result in zip(batch, results):
+            request.result = result
+            request.done.set()
+
+    def _fail_all(self, error):
+        """Fails the requests that are in batches not yet taken by a worker
+        or are queued.
+        """
+        while True:
+            try:
+                batch = self._batches.get_nowait()
+            except queue.Empty:
+                break
+            if batch is not None:
+                for request in batch:
+                    request.started = time.time()
+                    request.result = (False, error)
+                    request.done.set()
+        for requests in self._queues.values():
+            while True:
+                try:
+                    request = requests.get_nowait()
+                except queue.Empty:
+                    break
+                request.started = time.time()
+                request.result = (False, error)
+                request.done.set()
+
+    def metrics(self):
+        """Returns a dict of queue depths, counts and latencies in
+        milliseconds over recent requests.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            waits = sorted(self._waits)
+            counts = dict(self._counts)
+        metrics = {
+            'queue_depth': dict(
+                (p, q.qsize()) for p, q in self._queues.items()
+            ),
+            'workers': self.workers,
+            'mean_batch_size': (
+                float(counts['requests']) / counts['batches']
+                if counts['batches'] else None
+            ),
+        }
+        metrics.update(counts)
+        for name, values in (('latency', latencies), ('queue_wait', waits)):
+            for label, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+                value = _percentile(values, fraction)
+                metrics['{0}_{1}_ms'.format(name, label)] = (
+                    None if value is None else 1000.0 * value
+                )
+        return metrics
+
+    def _handle(self, sock):
+        """Answers the requests on a connection until it is closed.
+        """
+        while True:
+            try:
+                header, body = _recv(sock)
+            except (EOFError, socket.error, ValueError):
+                return
+
+            try:
+                if 'metrics' == header.get('op'):
+                    response = {'ok': True, 'metrics': self.metrics()}
+                elif 'decode' == header.get('op'):
+                    decoded = self.submit(
+                        body, header['width'], header['height'],
+                        _decode_kwargs(header.get('kwargs', {})),
+                        header.get('priority', 'interactive')
+                    )
+                    response = {'ok': True, 'results': [
+                        {
+                            'data': b64encode(d.data).decode('ascii'),
+                            'rect': list(d.rect),
+                            'vertices': 'P0' == d.rect._fields[0],
+                        }
+                        for d in decoded
+                    ]}
+                else:
+                    raise ValueError(
+                        'Invalid op [{0}]'.format(header.get('op'))
+                    )
+            except Exception as e:
+                response = {
+                    'ok': False, 'type': type(e).__name__, 'error': str(e)
+                }
+
+            try:
+                _send(sock, response)
+            except (EOFError, socket.error):
+                return
+
+
+class DecodeClient(object):
+    """A client of a `DecodeService`. Safe to share between threads; requests
+    on one client are sent one at a time.
+
+    Args:
+        address: As given to `DecodeService`.
+    """
+    def __init__(self, address):
+        self.address = address
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _connect(self):
+        if _is_path(self.address):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.address)
+        else:
+            sock = socket.create_connection(tuple(self.address))
+        return sock
+
+    def _request(self, header, body=b''):
+        with self._lock:
+            if self._sock is None:
+                self._sock = self._connect()
+            try:
+                _send(self._sock, header, body)
+                response, _ = _recv(self._sock)
+            except (EOFError, socket.error):
+                self.close()
+                raise PyLibDMTXError('Connection to decode service lost')
+
+        if not response['ok']:
+            if 'ValueError' == response['type']:
+                raise ValueError(response['error'])
+            else:
+                raise PyLibDMTXError(response['error'])
+        return response
+
+    def decode(self, image, timeout=None, gap_size=None, shrink=1, shape=None,
+               deviation=None, threshold=None, min_edge=None, max_edge=None,
+               corrections=None, max_count=None, return_vertices=False,
+               accept=None, max_regions=None, max_failures=None,
+               max_scan=None, priority='interactive'):
+        """Decodes `image` in the service. Arguments are as for `decode`,
+        except that `accept` can only be a str regular expression.
+
+        Args:
+            priority (str): One of `PRIORITIES`.
+
+        Returns:
+            :obj:`list` of :obj:`Decoded`: As `decode`.
+        """
+        from .pylibdmtx import _pixel_data, Decoded, Rect, Rect_vertices
+
+        if accept is not None and not isinstance(accept, str):
+            raise PyLibDMTXError(
+                'Invalid accept [{0}]: the service accepts only str '
+                'regular expressions'.format(accept)
+            )
+
+        values = locals()
+        kwargs = dict(
+            (name, values[name]) for name in _DECODE_ARGUMENTS
+            if values[name] is not None
+        )
+        pixels, width, height, bpp = _pixel_data(image)
+        response = self._request(
+            {
+                'op': 'decode', 'width': width, 'height': height,
+                'kwargs': kwargs, 'priority': priority,
+            },
+            bytes(pixels)
+        )
+
+        results = []
+        for result in response['results']:
+            if result['vertices']:
+                rect = Rect_vertices(*(tuple(p) for p in result['rect']))
+            else:
+                rect = Rect(*result['rect'])
+            results.append(Decoded(b64decode(result['data']), rect))
+        return results
+
+    def metrics(self):
+        """Returns the metrics of the service, as `DecodeService.metrics`.
+        """
+        return self._request({'op': 'metrics'})['metrics']
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def main(args=None):
+    if args is None:
+        args = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Runs a local decode service')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--socket', help='Path of a Unix socket to listen on')
+    group.add_argument(
+        '--port', type=int, help='Localhost TCP port to listen on'
+    )
+    parser.add_argument(
+        '--workers', type=int,
+        help='Number of worker processes; default is the number of CPUs'
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=8,
+        help='Maximum number of requests in a batch'
+    )
+    parser.add_argument(
+        '--batch-wait', type=float, default=0.002,
+        help='Seconds to wait for a batch to fill'
+    )
+    args = parser.parse_args(args)
+
+    address = args.socket if args.socket else ('127.0.0.1', args.port)
+    service = DecodeService(
+        address, workers=args.workers, batch_size=args.batch_size,
+        batch_wait=args.batch_wait
+    )
+    print('Listening on {0}'.format(address), file=sys.stderr)
+    service.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Composition of many symbols into one greyscale sheet, such as a sheet of
+labels for printing.
+
+Each payload is encoded to its matrix of modules by `encode_matrix`, which is
+then written, scaled, straight into the sheet; there are no intermediate
+images. The sheet is any writable buffer of one byte per pixel - a
+`bytearray`, a C-contiguous `numpy.uint8` array of shape (height, width), an
+`mmap` - or a new `bytearray`.
+
+    >>> width, height = page_size('A4', dpi=600)
+    >>> pixels = sheet(payloads, columns=8, pitch=(600, 580), width=width,
+    ...                height=height, module_size=12, origin=(100, 150))
+    >>> Image.frombytes('L', (width, height), bytes(pixels)).save('sheet.png')
+"""
+import mmap
+
+from .pylibdmtx import encode_matrix
+from .pylibdmtx_error import PyLibDMTXError
+
+__all__ = ['PAGE_SIZES', 'page_size', 'sheet']
+
+# Width and height in millimetres
+PAGE_SIZES = {
+    'A3': (297.0, 420.0),
+    'A4': (210.0, 297.0),
+    'A5': (148.0, 210.0),
+    'Letter': (215.9, 279.4),
+}
+
+
+def page_size(name='A4', dpi=600):
+    """Returns the (width, height) in pixels of a page.
+
+    Args:
+        name (str): One of `PAGE_SIZES`.
+        dpi (int): Pixels per inch.
+    """
+    try:
+        width, height = PAGE_SIZES[name]
+    except KeyError:
+        raise PyLibDMTXError(
+            'Invalid page size [{0}]: should be one of {1}'.format(
+                name, sorted(PAGE_SIZES)
+            )
+        )
+    return int(round(width * dpi / 25.4)), int(round(height * dpi / 25.4))
+
+
+def _scaled_bytes(module_size, dark, light):
+    """Returns a list of the pixels of the eight modules in each byte of a
+    `Matrix`, scaled by `module_size`.
+    """
+    modules = [
+        [dark if value & (0x80 >> bit) else light for bit in range(8)]
+        for value in range(256)
+    ]
+    return [
+        bytes(bytearray(
+            pixel for pixel in row for _ in range(module_size)
+        ))
+        for row in modules
+    ]
+
+
+def _flat(out):
+    """Returns a flat, writable view of the bytes of the buffer `out`.
+
+    Raises:
+        PyLibDMTXError: If `out` is not a contiguous buffer of bytes.
+    """
+    if hasattr(out, 'reshape'):
+        # A numpy array, which has to be contiguous to be viewed as flat
+        if not out.flags['C_CONTIGUOUS']:
+            raise PyLibDMTXError('Invalid out: should be C-contiguous')
+        out = out.reshape(-1)
+    try:
+        view = memoryview(out)
+    except TypeError:
+        view = None
+    if view is None and isinstance(out, mmap.mmap):
+        # Python 2, where an mmap can be written to by slices
+        return out
+    elif view is None or view.format != 'B' or view.ndim != 1:
+        raise PyLibDMTXError('Invalid out: should be a buffer of bytes')
+    else:
+        return view
+
+
+def sheet(payloads, columns, pitch, width, height, module_size=5,
+          origin=(0, 0), out=None, scheme=None, size=None, dark=0,
+          light=255, quiet_zone=1):
+    """Encodes each of `payloads` into a greyscale sheet.
+
+    Symbols are laid out left to right and then top to bottom in a grid of
+    `columns`. The top-left module of symbol `i` is at
+    `origin + (i % columns * pitch[0], i // columns * pitch[1])`. Only the
+    pixels of the symbols are written, so other contents of `out` are kept.
+    Every payload is encoded and placed before any pixels are written, so
+    `out` is unchanged if any of them fails.
+
+    Args:
+        payloads: A sequence of bytes.
+        columns (int): Number of symbols in each row of the grid.
+        pitch (tuple): (x, y) pixels between the top-left of adjacent
+            symbols.
+        width (int): Width of the sheet in pixels.
+        height (int): Height of the sheet in pixels.
+        module_size (int): Pixels per module.
+        origin (tuple): (x, y) pixels of the top-left of the first symbol.
+        out: A writable buffer of `width * height` bytes, or `None` for a new
+            `bytearray` filled with `light`.
+        scheme (str): As for `encode`.
+        size (str): As for `encode`.
+        dark (int): Value of dark pixels.
+        light (int): Value of light pixels.
+        quiet_zone (int): Modules of light space that are needed between
+            adjacent symbols.
+
+    Returns:
+        The buffer `out` or a new `bytearray`.
+
+    Raises:
+        PyLibDMTXError: If a payload could not be encoded, if a symbol and
+            its quiet zone are larger than `pitch`, if a symbol would not
+            be within the sheet or if `out` is not a contiguous buffer of
+            bytes.
+    """
+    if columns < 1:
+        raise ValueError('Invalid columns [{0}]'.format(columns))
+    elif module_size < 1:
+        raise ValueError('Invalid module_size [{0}]'.format(module_size))
+    elif quiet_zone < 0:
+        raise ValueError('Invalid quiet_zone [{0}]'.format(quiet_zone))
+
+    if out is not None:
+        pixels = _flat(out)
+        if len(pixels) != width * height:
+            raise PyLibDMTXError(
+                'Inconsistent dimensions: buffer of {0} bytes is not width x '
+                'height = {1}'.format(len(pixels), width * height)
+            )
+
+    quiet = quiet_zone * module_size
+    placed = []
+    for index, data in enumerate(payloads):
+        matrix = encode_matrix(data, scheme=scheme, size=size)
+        symbol_width = matrix.cols * module_size
+        symbol_height = matrix.rows * module_size
+        row, column = divmod(index, columns)
+        left = origin[0] + column * pitch[0]
+        top = origin[1] + row * pitch[1]
+        if symbol_width + quiet > pitch[0] or symbol_height + quiet > pitch[1]:
+            raise PyLibDMTXError(
+                'Symbol {0} of {1} x {2} pixels and its quiet zone of {3} '
+                'pixels is larger than the pitch {4}'.format(
+                    index, symbol_width, symbol_height, quiet, pitch
+                )
+            )
+        elif (left < 0 or top < 0 or left + symbol_width > width or
+                top + symbol_height > height):
+            raise PyLibDMTXError(
+                'Symbol {0} at ({1}, {2}) is not within the sheet'.format(
+                    index, left, top
+                )
+            )
+        placed.append((matrix, left, top))
+
+    if out is None:
+        out = bytearray([light]) * (width * height)
+        pixels = _flat(out)
+    scaled = _scaled_bytes(module_size, dark, light)
+    for matrix, left, top in placed:
+        symbol_width = matrix.cols * module_size
+        row_bytes = (matrix.cols + 7) // 8
+        bits = bytearray(matrix.bits)
+        offset = top * width + left
+        for y in range(matrix.rows):
+            line = b''.join(
+                scaled[b] for b in bits[y * row_bytes:(y + 1) * row_bytes]
+            )[:symbol_width]
+            for _ in range(module_size):
+                pixels[offset:offset + symbol_width] = line
+                offset += width
+
+    return out
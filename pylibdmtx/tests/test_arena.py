@@ -0,0 +1,50 @@
+import unittest
+
+from ctypes import c_char_p
+
+from pylibdmtx.arena import PayloadArena
+
+
+class TestPayloadArena(unittest.TestCase):
+    def test_write(self):
+        arena = PayloadArena(chunk_size=8)
+        first = arena.write(c_char_p(b'abc\x00de'), 6)
+        second = arena.write(c_char_p(b'fghij'), 5)
+        self.assertEqual(b'abc\x00de', first.tobytes())
+        self.assertEqual(b'fghij', second.tobytes())
+        self.assertEqual(11, len(arena))
+        self.assertEqual(2, arena.count)
+        self.assertEqual(16, arena.capacity)
+        self.assertEqual(b'abc\x00defghij', arena.getvalue())
+        self.assertEqual(b'fghij', arena.getvalue(1))
+
+    def test_large_payload(self):
+        arena = PayloadArena(chunk_size=4)
+        view = arena.write(c_char_p(b'0123456789'), 10)
+        self.assertEqual(b'0123456789', view.tobytes())
+        self.assertEqual(10, arena.capacity)
+
+    def test_pop(self):
+        arena = PayloadArena(chunk_size=8)
+        arena.write(c_char_p(b'abc'), 3)
+        arena.write(c_char_p(b'rejected'), 8)
+        arena.pop()
+        arena.write(c_char_p(b'de'), 2)
+        self.assertEqual(b'abcde', arena.getvalue())
+        self.assertEqual(5, len(arena))
+
+    def test_reset_reuses_memory(self):
+        arena = PayloadArena(chunk_size=8)
+        view = arena.write(c_char_p(b'abc'), 3)
+        arena.reset()
+        self.assertEqual(0, len(arena))
+        arena.write(c_char_p(b'xyz'), 3)
+        self.assertEqual(b'xyz', view.tobytes())
+        self.assertEqual(8, arena.capacity)
+
+    def test_invalid_chunk_size(self):
+        self.assertRaises(ValueError, PayloadArena, chunk_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
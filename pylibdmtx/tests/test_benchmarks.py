@@ -0,0 +1,127 @@
+import json
+import sys
+import unittest
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from pylibdmtx.benchmarks import corpus, load, proposals, schemes, suite
+from pylibdmtx.pylibdmtx import decode
+
+
+class TestSchemes(unittest.TestCase):
+    def test_run(self):
+        "Every scheme is measured for every payload"
+        payloads = [('digits', b'0123456789'), ('binary', b'\x80\x81')]
+        results = schemes.run(1, payloads=payloads)
+
+        self.assertEqual(2 * len(schemes.ENCODING_SCHEME_NAMES), len(results))
+        digits = dict((r['scheme'], r) for r in results[:8])
+        # Five ASCII digit-pair codewords fill a 12x12 symbol
+        self.assertEqual(12, digits['AutoBest']['rows'])
+        self.assertIn('error', dict(
+            (r['scheme'], r) for r in results[8:]
+        )['X12'])
+
+    def test_main_json(self):
+        sys.stdout, old_stdout = StringIO(), sys.stdout
+        try:
+            schemes.main(['--repeat', '1', '--json'])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = old_stdout
+
+        results = json.loads(output)
+        self.assertEqual(
+            len(schemes.PAYLOADS) * len(schemes.ENCODING_SCHEME_NAMES),
+            len(results)
+        )
+
+
+class TestCorpus(unittest.TestCase):
+    def test_deterministic(self):
+        "The same seed gives the same images"
+        first, second = corpus.generate(1), corpus.generate(1)
+        self.assertEqual(
+            [s.name for s in first], [s.name for s in second]
+        )
+        for a, b in zip(first, second):
+            self.assertEqual(a.payloads, b.payloads)
+            self.assertEqual(a.image.tobytes(), b.image.tobytes())
+
+    def test_clean_samples_decode(self):
+        samples = dict((s.name, s) for s in corpus.generate())
+        for name in ('clean', 'scale-2', 'canvas-4'):
+            sample = samples[name]
+            self.assertEqual(
+                sorted(sample.payloads),
+                sorted(d.data for d in decode(sample.image))
+            )
+
+    def test_cluttered(self):
+        samples = corpus.cluttered(count=2, size=(800, 600), symbols=2)
+        self.assertEqual(['cluttered-0', 'cluttered-1'],
+                         [s.name for s in samples])
+        self.assertEqual((800, 600), samples[0].image.size)
+        self.assertEqual(2, len(samples[0].payloads))
+
+
+class TestProposals(unittest.TestCase):
+    def test_run(self):
+        samples = corpus.cluttered(count=1)
+        result = proposals.run(samples, 1)[0]
+        self.assertEqual('cluttered-0', result['sample'])
+        self.assertEqual(3, result['expected'])
+        self.assertGreater(result['proposals'], 0)
+        self.assertLess(result['proposal_area'], 0.5)
+        self.assertEqual(1.0, result['recall'])
+
+
+class TestSuite(unittest.TestCase):
+    def test_decode_results(self):
+        samples = corpus.generate()
+        results = suite.decode_results(samples, 1)
+        cases = set(r['case'] for r in results)
+        self.assertEqual(
+            set(['corpus', 'bpp', 'input', 'shrink', 'timeout', 'max_count']),
+            cases
+        )
+        clean = [r for r in results if r['sample'] == 'clean']
+        self.assertTrue(all(1 == r['correct'] for r in clean))
+
+    def test_encode_results_and_compare(self):
+        results = {'results': suite.encode_results(
+            1, payloads=[b'hello'], schemes=['Ascii', 'X12'], sizes=['24x24']
+        )}
+        self.assertEqual(2, len(results['results']))
+        self.assertIn('error', results['results'][1])
+
+        comparison = suite.compare(results, results)
+        self.assertEqual(1, len(comparison))
+        self.assertEqual(1.0, comparison[0][3])
+
+
+class TestLoad(unittest.TestCase):
+    def test_threads(self):
+        results = load.run('encode', 'thread', [1, 2], 0.2)
+        self.assertEqual([1, 2], [r['workers'] for r in results])
+        self.assertEqual(1.0, results[0]['efficiency'])
+        for result in results:
+            self.assertGreater(result['calls'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_processes(self):
+        results = load.run('decode', 'process', [2], 0.2)
+        self.assertEqual(1, len(results))
+        self.assertGreater(results[0]['calls'], 0)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, load.measure, 'read', 'thread', 1, 0.1)
+        self.assertRaises(ValueError, load.measure, 'decode', 'fibre', 1, 0.1)
+        self.assertRaises(ValueError, load.measure, 'decode', 'thread', 0, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
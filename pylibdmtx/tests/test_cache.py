@@ -0,0 +1,111 @@
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    # Python 2
+    from mock import patch
+
+import numpy as np
+
+from pylibdmtx.cache import CacheStats, EncodeCache
+from pylibdmtx.pylibdmtx import encode
+
+
+class TestEncodeCache(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(patch.stopall)
+        self.encode = patch(
+            'pylibdmtx.cache.encode', autospec=True, side_effect=encode
+        ).start()
+
+    def test_memory_hit(self):
+        cache = EncodeCache()
+        first = cache.encode(b'hello world')
+        second = cache.encode(b'hello world')
+
+        self.assertEqual(encode(b'hello world'), first)
+        self.assertEqual(first, second)
+        self.assertEqual(1, self.encode.call_count)
+        self.assertEqual(
+            CacheStats(
+                hits=1, disk_hits=0, misses=1, evictions=0, entries=1,
+                bytes=100 * 100 * 3, hit_rate=0.5
+            ),
+            cache.stats()
+        )
+
+    def test_options_are_part_of_key(self):
+        cache = EncodeCache()
+        cache.encode(b'hello world')
+        cache.encode(b'hello world', size='36x36')
+        cache.encode(b'hello world', bpp=8)
+        cache.encode(b'hello world', scheme='Base256')
+        self.assertEqual(4, self.encode.call_count)
+
+    def test_byte_size_eviction(self):
+        # Room for two 100 x 100 8bpp images
+        cache = EncodeCache(max_bytes=2 * 100 * 100)
+        for data in (b'hello world', b'hello there', b'hello again'):
+            cache.encode(data, bpp=8)
+
+        stats = cache.stats()
+        self.assertEqual((1, 2, 2 * 100 * 100), stats[3:6])
+
+        # Least recently used entry was evicted
+        cache.encode(b'hello again', bpp=8)
+        cache.encode(b'hello world', bpp=8)
+        self.assertEqual(4, self.encode.call_count)
+
+    def test_too_large_not_cached(self):
+        cache = EncodeCache(max_bytes=10)
+        cache.encode(b'hello world')
+        self.assertEqual(0, cache.stats().entries)
+
+    def test_output_is_a_copy(self):
+        cache = EncodeCache()
+        array = cache.encode(b'hello world', bpp=8, output='numpy').pixels
+        array[:] = 0
+        self.assertEqual(
+            encode(b'hello world', bpp=8).pixels,
+            cache.encode(b'hello world', bpp=8, output='memoryview').pixels
+        )
+        self.assertIsInstance(array, np.ndarray)
+
+    def test_disk_store(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        EncodeCache(directory=directory).encode(b'hello world', bpp=1)
+
+        # A second cache, as in another process, reads the on-disk store
+        cache = EncodeCache(directory=directory)
+        encoded = cache.encode(b'hello world', bpp=1)
+
+        self.assertEqual(encode(b'hello world', bpp=1), encoded)
+        self.assertEqual(1, self.encode.call_count)
+        self.assertEqual((0, 1, 0), cache.stats()[:3])
+
+    def test_disk_write_error(self):
+        "The result is returned if it can not be stored"
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = EncodeCache(directory=directory)
+        with patch('tempfile.mkstemp', side_effect=OSError(28, 'No space')):
+            encoded = cache.encode(b'hello world')
+        self.assertEqual(encode(b'hello world'), encoded)
+        self.assertEqual(1, cache.stats().entries)
+
+    def test_clear(self):
+        cache = EncodeCache()
+        cache.encode(b'hello world')
+        cache.clear()
+        self.assertEqual(
+            CacheStats(0, 0, 0, 0, 0, 0, 0.0), cache.stats()
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from pylibdmtx.capacity import (
+    best_scheme, codewords, fits, smallest_size, SCHEMES, SYMBOL_SIZES
+)
+
+
+class TestCapacity(unittest.TestCase):
+    def test_symbol_sizes(self):
+        self.assertEqual(30, len(SYMBOL_SIZES))
+        self.assertEqual(('10x10', 10, 10, 3), SYMBOL_SIZES[0])
+        self.assertEqual(('144x144', 144, 144, 1558), SYMBOL_SIZES[23])
+        self.assertEqual(('16x48', 16, 48, 49), SYMBOL_SIZES[-1])
+
+    def test_ascii(self):
+        # Digits are paired, extended ASCII needs an upper shift
+        self.assertEqual(11, codewords(b'hello world'))
+        self.assertEqual(3, codewords(b'12345'))
+        self.assertEqual(5, codewords(b'\xe9t\xe9'))
+
+    def test_c40_text(self):
+        # Latch, two codewords per three values and unlatch to pad
+        self.assertEqual(1 + 2 + 1, codewords(b'ABC', 'C40', '12x12'))
+        self.assertEqual(1 + 2 + 1, codewords(b'abc', 'Text', '12x12'))
+        # No unlatch if the symbol is full
+        self.assertEqual(1 + 2, codewords(b'ABC', 'C40', '10x10'))
+        # Shifted characters need two values
+        self.assertEqual(1 + 4 + 1, codewords(b'A.B,', 'C40', '16x16'))
+        # Two leftover values are padded with a shift
+        self.assertEqual(1 + 2 + 2, codewords(b'ABCDE', 'C40', '16x16'))
+        # One leftover value is unlatched and written as ASCII
+        self.assertEqual(1 + 2 + 1 + 1, codewords(b'ABCD', 'C40', '16x16'))
+
+    def test_x12(self):
+        self.assertEqual(1 + 4 + 1, codewords(b'AB*12>', 'X12', '16x16'))
+        self.assertIsNone(codewords(b'abc', 'X12'))
+
+    def test_edifact(self):
+        # Latch, three codewords per four characters and unlatch
+        self.assertEqual(1 + 3 + 1, codewords(b'ABCD', 'Edifact', '16x16'))
+        self.assertEqual(1 + 3 + 2, codewords(b'ABCDE', 'Edifact', '16x16'))
+        # ASCII with an implicit unlatch to fill the last codewords
+        self.assertEqual(1 + 3, codewords(b'ABCD', 'Edifact', '12x12'))
+        self.assertEqual(1 + 3 + 1, codewords(b'ABCDE', 'Edifact', '12x12'))
+        self.assertIsNone(codewords(b'abc', 'Edifact'))
+
+    def test_base256(self):
+        self.assertEqual(1 + 1 + 11, codewords(b'hello world', 'Base256'))
+        self.assertEqual(1 + 2 + 300, codewords(b'x' * 300, 'Base256'))
+
+    def test_fits(self):
+        self.assertTrue(fits(b'hello world', size='16x16'))
+        self.assertFalse(fits(b'hello world', size='14x14'))
+        self.assertFalse(fits(b' ' * 50, size='10x10'))
+        self.assertTrue(fits(b'hello world', 'Base256', '18x18'))
+        self.assertFalse(fits(b'', 'Ascii'))
+
+    def test_smallest_size(self):
+        self.assertEqual('16x16', smallest_size(b'hello world'))
+        self.assertEqual('18x18', smallest_size(b'hello world', 'Base256'))
+        self.assertEqual(
+            '8x32', smallest_size(b'hello world', 'Text', 'RectAuto')
+        )
+        self.assertEqual('12x12', smallest_size(b'0123456789', 'AutoBest'))
+        self.assertIsNone(smallest_size(b'x' * 2000))
+
+    def test_best_scheme(self):
+        self.assertEqual('Ascii', best_scheme(b'0123456789'))
+        self.assertEqual('C40', best_scheme(b'ABCDEFGHIJKLMNOP'))
+        self.assertEqual('Text', best_scheme(b'hello world example'))
+        self.assertEqual('X12', best_scheme(b'ABC*XYZ>QRS*TUV'))
+        self.assertEqual(
+            'Base256', best_scheme(bytes(bytearray(range(128, 256))))
+        )
+        self.assertIsNone(best_scheme(b'x' * 4000))
+        self.assertIn(best_scheme(b'hello'), SCHEMES)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, codewords, b'', 'asdf')
+        self.assertRaises(ValueError, codewords, b'', 'Ascii', '9x9')
+
+
+if __name__ == '__main__':
+    unittest.main()
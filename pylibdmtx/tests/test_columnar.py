@@ -0,0 +1,119 @@
+import unittest
+
+from pathlib import Path
+
+import numpy as np
+
+from PIL import Image
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from pylibdmtx.arena import PayloadArena
+from pylibdmtx.columnar import ColumnarDecoded, GEOMETRY_DTYPE, _Builder
+from pylibdmtx.pylibdmtx import decode, decode_batch
+
+
+TESTDATA = Path(__file__).parent
+
+
+class TestColumnar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.datamatrix = Image.open(str(TESTDATA.joinpath('datamatrix.png')))
+        cls.empty = Image.open(str(TESTDATA.joinpath('empty.png')))
+        cls.images = [cls.datamatrix, cls.empty, cls.datamatrix]
+
+    def test_decode_batch(self):
+        self.assertEqual(
+            [decode(image) for image in self.images],
+            decode_batch(self.images)
+        )
+
+    def test_columnar(self):
+        res = decode_batch(self.images, columnar=True)
+
+        self.assertIsInstance(res, ColumnarDecoded)
+        self.assertEqual(4, len(res))
+        self.assertEqual([0, 0, 2, 2], res.image_index.tolist())
+        self.assertEqual([0, 11, 23, 34, 46], res.offsets.tolist())
+        self.assertEqual(b'StegosaurusPlesiosaurus' * 2, res.payloads)
+        self.assertEqual(GEOMETRY_DTYPE, res.geometry.dtype)
+        self.assertEqual(b'Plesiosaurus', res.data(1))
+
+        expected = decode(self.datamatrix)
+        vertices = decode(self.datamatrix, return_vertices=True)
+        self.assertEqual(expected, [res.decoded(0), res.decoded(1)])
+        self.assertEqual(
+            vertices, [res.decoded(2, True), res.decoded(3, True)]
+        )
+        self.assertTrue(np.all(res.geometry['rows'] > 0))
+
+    def test_columnar_max_count(self):
+        res = decode_batch(self.images, columnar=True, max_count=1)
+        self.assertEqual([0, 2], res.image_index.tolist())
+
+    def test_decode_batch_arena(self):
+        arena = PayloadArena(chunk_size=16)
+        res = decode_batch(self.images, arena=arena)
+        self.assertEqual(
+            [decode(image) for image in self.images],
+            [[d._replace(data=bytes(d.data)) for d in r] for r in res]
+        )
+        self.assertIsInstance(res[0][0].data, memoryview)
+        self.assertEqual(4, arena.count)
+
+    def test_columnar_arena_accept(self):
+        "Rejected data is not written to the arena"
+        arena = PayloadArena()
+        res = decode_batch(
+            self.images, columnar=True, arena=arena, accept=b'^Pl'
+        )
+        self.assertEqual(b'Plesiosaurus' * 2, res.payloads)
+        self.assertEqual(2, arena.count)
+
+    def test_columnar_empty(self):
+        res = decode_batch([self.empty], columnar=True)
+        self.assertEqual(0, len(res))
+        self.assertEqual([0], res.offsets.tolist())
+
+    def test_columnar_large_offsets(self):
+        "Offsets past 2 GiB, which overflow a C long on Windows"
+        class Payload(object):
+            def __len__(self):
+                return 2 ** 31
+
+        builder = _Builder()
+        for index in range(2):
+            builder.append(index, Payload(), [(0, 0)] * 4, 10, 10)
+        self.assertEqual(
+            [0, 2 ** 31, 2 ** 32], builder.build().offsets.tolist()
+        )
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow not installed')
+    def test_to_arrow(self):
+        table = decode_batch(self.images, columnar=True).to_arrow()
+        self.assertEqual(
+            [b'Stegosaurus', b'Plesiosaurus'] * 2,
+            table.column('data').to_pylist()
+        )
+        self.assertEqual([5, 298, 5, 298], table.column('left').to_pylist())
+
+    @unittest.skipIf(pandas is None, 'pandas not installed')
+    def test_to_pandas(self):
+        frame = decode_batch(self.images, columnar=True).to_pandas()
+        self.assertEqual([0, 0, 2, 2], frame['image_index'].tolist())
+        self.assertEqual(
+            [b'Stegosaurus', b'Plesiosaurus'] * 2, list(frame['data'])
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
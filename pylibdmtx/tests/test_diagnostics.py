@@ -0,0 +1,66 @@
+import unittest
+
+from ctypes import cast
+from pathlib import Path
+
+from PIL import Image
+
+from pylibdmtx import diagnostics
+from pylibdmtx.pylibdmtx import (
+    decode, encode, _image, _pixel_data, _PACK_ORDER
+)
+from pylibdmtx.wrapper import c_ubyte_p
+
+
+TESTDATA = Path(__file__).parent
+
+
+class TestDiagnostics(unittest.TestCase):
+    def setUp(self):
+        diagnostics.reset()
+        diagnostics.enable(report_leaks=False)
+        self.addCleanup(diagnostics.reset)
+        self.addCleanup(diagnostics.disable)
+
+    def test_decode(self):
+        image = Image.open(str(TESTDATA.joinpath('datamatrix.png')))
+        self.assertEqual(2, len(decode(image)))
+
+        stats = diagnostics.stats()
+        self.assertEqual({}, diagnostics.leaks())
+        self.assertEqual(1, stats['DmtxImage'].created)
+        self.assertEqual(1, stats['DmtxDecode'].destroyed)
+        self.assertEqual(2, stats['DmtxMessage'].created)
+        self.assertEqual(0, stats['DmtxDecode'].bytes)
+        # The per-pixel cache of the decoder
+        self.assertGreaterEqual(
+            stats['DmtxDecode'].peak_bytes, image.width * image.height
+        )
+        self.assertGreaterEqual(
+            stats['DmtxImage'].peak_bytes, image.width * image.height * 3
+        )
+
+    def test_encode(self):
+        encode(b'hello world')
+        stats = diagnostics.stats()['DmtxEncode']
+        self.assertEqual((0, 1, 1, 1), stats[:4])
+        self.assertGreater(stats.peak_bytes, 100 * 100 * 3)
+
+    def test_leak(self):
+        "Live objects are reported"
+        pixels, width, height, bpp = _pixel_data((b'\xff' * 100, 10, 10))
+        with _image(
+            cast(pixels, c_ubyte_p), width, height, _PACK_ORDER[bpp]
+        ):
+            self.assertEqual({'DmtxImage': 1}, diagnostics.leaks())
+            self.assertIn('DmtxImage', diagnostics.summary())
+        self.assertEqual({}, diagnostics.leaks())
+
+    def test_disabled(self):
+        diagnostics.disable()
+        encode(b'hello world')
+        self.assertEqual(0, diagnostics.stats()['DmtxEncode'].created)
+
+
+if __name__ == '__main__':
+    unittest.main()
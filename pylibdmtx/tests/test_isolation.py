@@ -0,0 +1,61 @@
+import unittest
+
+from pathlib import Path
+
+from PIL import Image
+
+from pylibdmtx.isolation import IsolatedDecoder
+from pylibdmtx.pylibdmtx import decode
+from pylibdmtx.pylibdmtx_error import PyLibDMTXError, PyLibDMTXTimeout
+
+
+TESTDATA = Path(__file__).parent
+
+
+class TestIsolatedDecoder(unittest.TestCase):
+    def setUp(self):
+        self.image = Image.open(str(TESTDATA.joinpath('datamatrix.png')))
+        self.decoder = IsolatedDecoder(workers=2, hard_timeout=30)
+        self.addCleanup(self.decoder.close)
+
+    def test_decode(self):
+        self.assertEqual(
+            decode(self.image), self.decoder.decode(self.image)
+        )
+        self.assertEqual(
+            decode(self.image, max_count=1),
+            self.decoder.decode(self.image, max_count=1)
+        )
+
+    def test_hard_timeout(self):
+        "The worker is killed and replaced"
+        self.assertRaises(
+            PyLibDMTXTimeout, self.decoder.decode, self.image,
+            hard_timeout=1e-6
+        )
+        self.assertEqual(1, self.decoder.kills)
+        # Replaced by a working process
+        for _ in range(3):
+            self.assertEqual(2, len(self.decoder.decode(self.image)))
+
+    def test_timeout_is_an_error(self):
+        self.assertTrue(issubclass(PyLibDMTXTimeout, PyLibDMTXError))
+
+    def test_decode_error(self):
+        "Errors in the worker are raised in the caller"
+        self.assertRaises(
+            ValueError, self.decoder.decode, self.image, max_count=0
+        )
+        self.assertEqual(2, len(self.decoder.decode(self.image)))
+
+    def test_closed(self):
+        self.decoder.close()
+        self.assertRaises(PyLibDMTXError, self.decoder.decode, self.image)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, IsolatedDecoder, workers=0)
+        self.assertRaises(ValueError, IsolatedDecoder, hard_timeout=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
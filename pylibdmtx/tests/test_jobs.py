@@ -0,0 +1,119 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pathlib import Path
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    # Python 2
+    from mock import patch
+
+from pylibdmtx import jobs
+
+
+DATAMATRIX = str(Path(__file__).parent.joinpath('datamatrix.png'))
+EMPTY = str(Path(__file__).parent.joinpath('empty.png'))
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'output')
+        self.manifest = os.path.join(self.directory, 'manifest.txt')
+        with open(self.manifest, 'w') as f:
+            f.write('\n'.join([DATAMATRIX, EMPTY] * 3 + ['missing.png']))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def shard(self, index):
+        path = os.path.join(
+            self.output, 'shards', 'chunk-{0:08d}.jsonl'.format(index)
+        )
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_run(self):
+        summary = jobs.run(self.manifest, self.output, chunk_size=3)
+        self.assertEqual(
+            {'written': 3, 'skipped': 0, 'images': 7, 'errors': 1}, summary
+        )
+        first = self.shard(0)
+        self.assertEqual([DATAMATRIX, EMPTY, DATAMATRIX],
+                         [r['path'] for r in first])
+        self.assertEqual(['Stegosaurus', 'Plesiosaurus'],
+                         [b['data'] for b in first[0]['barcodes']])
+        self.assertIn('error', self.shard(2)[0])
+        self.assertEqual(
+            {'done': 3, 'in_progress': 0}, jobs.progress(self.output)
+        )
+
+    def test_resume(self):
+        "Done chunks are skipped; expired claims are taken over"
+        jobs.run(self.manifest, self.output, chunk_size=3)
+        os.remove(os.path.join(self.output, 'shards', 'chunk-00000001.jsonl'))
+
+        # Chunk 1 is still claimed
+        summary = jobs.run(self.manifest, self.output, chunk_size=3)
+        self.assertEqual(0, summary['written'])
+        self.assertEqual(
+            {'done': 2, 'in_progress': 1}, jobs.progress(self.output)
+        )
+
+        claim = os.path.join(self.output, 'claims', 'chunk-00000001.0')
+        expired = time.time() - 60
+        os.utime(claim, (expired, expired))
+        summary = jobs.run(self.manifest, self.output, chunk_size=3, lease=30)
+        self.assertEqual(
+            {'written': 1, 'skipped': 2, 'images': 3, 'errors': 0}, summary
+        )
+        self.assertTrue(os.path.exists(claim[:-1] + '1'))
+        self.assertEqual(3, len(self.shard(1)))
+
+    def test_csv_and_workers(self):
+        manifest = os.path.join(self.directory, 'manifest.csv')
+        with open(manifest, 'w') as f:
+            f.write('id,image\n1,{0}\n2,{1}\n'.format(DATAMATRIX, EMPTY))
+        summary = jobs.run(
+            manifest, self.output, chunk_size=1, jobs=2, path_column='image',
+            max_count=1
+        )
+        self.assertEqual(2, summary['written'])
+        self.assertEqual(1, len(self.shard(0)[0]['barcodes']))
+
+    def test_manifest_non_ascii(self):
+        manifest = os.path.join(self.directory, 'manifest.csv')
+        path = u'Esp\xe9cimen.png'
+        with io.open(manifest, 'w', encoding='utf-8') as f:
+            f.write(u'id,image\n1,{0}\n'.format(path))
+        self.assertEqual([path], list(jobs._manifest(manifest, 'image')))
+
+    def test_heartbeat(self):
+        "The claim is touched while its images are decoded"
+        claim = os.path.join(self.directory, 'claim')
+        with open(claim, 'w'):
+            pass
+        expired = time.time() - 60
+        os.utime(claim, (expired, expired))
+        with patch('pylibdmtx.jobs._HEARTBEAT', 0.01):
+            with jobs._heartbeat(claim):
+                time.sleep(0.1)
+        self.assertGreater(os.stat(claim).st_mtime, expired + 30)
+
+    def test_invalid(self):
+        self.assertRaises(
+            ValueError, jobs.run, self.manifest, self.output, chunk_size=0
+        )
+        self.assertRaises(
+            ValueError, jobs.run, self.manifest, self.output, jobs=0
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
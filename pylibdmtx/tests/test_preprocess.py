@@ -0,0 +1,119 @@
+import unittest
+
+from pathlib import Path
+
+import numpy as np
+
+from PIL import Image
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    # Python 2
+    from mock import patch
+
+from pylibdmtx.preprocess import (
+    compare, Crop, Downsample, Invert, Normalise, Pipeline, Stage, Threshold
+)
+from pylibdmtx.pylibdmtx import decode
+
+
+TESTDATA = Path(__file__).parent
+
+
+class TestPreprocess(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        datamatrix = Image.open(str(TESTDATA.joinpath('datamatrix.png')))
+        cls.rgb = np.asarray(datamatrix.convert('RGB'))
+        cls.grey = np.asarray(datamatrix.convert('L'))
+        cls.expected = decode(cls.grey)
+
+    def test_decode(self):
+        "Rects in the coordinates of the image"
+        pipeline = Pipeline([Crop(200, 0, 200, 108), Normalise()])
+        self.assertEqual(self.expected[1:], pipeline.decode(self.rgb))
+
+        res = Pipeline([Downsample(2)]).decode(self.grey)
+        self.assertEqual(
+            [d.data for d in self.expected], [d.data for d in res]
+        )
+        for decoded, expected in zip(res, self.expected):
+            for value, expected_value in zip(decoded.rect, expected.rect):
+                self.assertAlmostEqual(expected_value, value, delta=2)
+
+    def test_timings(self):
+        pipeline = Pipeline([Downsample(2), Threshold(), Invert()])
+        pipeline.decode(self.grey)
+        self.assertEqual(
+            ['grey', 'Downsample', 'Threshold', 'Invert', 'decode'],
+            [name for name, seconds in pipeline.timings]
+        )
+        self.assertTrue(all(s >= 0 for _, s in pipeline.timings))
+
+    def test_input_unchanged(self):
+        "In-place stages work on a copy of the caller's pixels"
+        grey = self.grey.copy()
+        res = Pipeline([Crop(0, 0, 100, 100), Invert()])(grey)
+        self.assertTrue(np.array_equal(self.grey, grey))
+        self.assertTrue(np.array_equal(255 - grey[8:, :100], res))
+
+    def test_buffers_reused(self):
+        pipeline = Pipeline([Downsample(2), Normalise(), Threshold()])
+        first = pipeline(self.rgb)
+        nbytes = pipeline.nbytes
+        self.assertIs(first, pipeline(self.rgb))
+        self.assertEqual(nbytes, pipeline.nbytes)
+
+    def test_no_copies(self):
+        "Views of arrays, and the pipeline's buffers, are not copied"
+        self.assertTrue(np.shares_memory(self.grey, Pipeline([])(self.grey)))
+
+        pipeline = Pipeline([Downsample(2)])
+        with patch('pylibdmtx.pylibdmtx.decode', return_value=[]) as decode:
+            pipeline.decode(self.rgb)
+        pixels, width, height = decode.call_args[0][0]
+        self.assertTrue(np.shares_memory(pixels, pipeline(self.rgb)))
+
+    def test_downsample(self):
+        pixels = np.arange(35, dtype=np.uint8).reshape(5, 7)
+        res = Pipeline([Downsample(2)])(pixels)
+        expected = pixels[:4, :6].reshape(2, 2, 3, 2).mean(axis=(1, 3))
+        self.assertTrue(np.array_equal(np.floor(expected + 0.5), res))
+
+    def test_threshold(self):
+        pixels = np.full((20, 20), 200, dtype=np.uint8)
+        pixels[5:8, 5:8] = 150
+        pixels[12, 12] = 195
+        res = Pipeline([Threshold(block=9, offset=10)])(pixels)
+        expected = np.full((20, 20), 255, dtype=np.uint8)
+        expected[5:8, 5:8] = 0
+        self.assertTrue(np.array_equal(expected, res))
+
+    def test_normalise(self):
+        pixels = np.linspace(100, 140, 400).astype(np.uint8).reshape(20, 20)
+        res = Pipeline([Normalise(0, 100)])(pixels)
+        self.assertEqual((0, 255), (res.min(), res.max()))
+
+    def test_compare(self):
+        "The inverted image is read only with Invert"
+        inverted = 255 - self.grey
+        trials = compare([inverted], [Downsample(2), Invert()])
+        self.assertEqual(4, len(trials))
+        self.assertEqual(1, trials[0].decoded)
+        self.assertEqual(
+            sorted(trials, key=lambda t: (-t.decoded, t.seconds)), trials
+        )
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Pipeline, [Stage()])
+        self.assertRaises(ValueError, Downsample, 0)
+        self.assertRaises(ValueError, Normalise, 50, 50)
+        self.assertRaises(ValueError, Threshold, 0)
+        self.assertRaises(
+            ValueError, Pipeline([Crop(500, 0, 10, 10)]), self.grey
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
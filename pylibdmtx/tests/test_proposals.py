@@ -0,0 +1,65 @@
+import unittest
+
+from pathlib import Path
+
+import numpy as np
+
+from PIL import Image
+
+from pylibdmtx import proposals
+from pylibdmtx.proposals import propose, Proposal
+from pylibdmtx.pylibdmtx import decode
+
+
+TESTDATA = Path(__file__).parent
+
+
+class TestProposals(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        datamatrix = Image.open(str(TESTDATA.joinpath('datamatrix.png')))
+
+        # The two symbols towards the middle of a large, cluttered canvas
+        canvas = np.full((800, 1200), 255, dtype=np.uint8)
+        canvas[300:408, 400:800] = np.asarray(datamatrix.convert('L'))
+        canvas[100:102, 50:1150] = 0
+        canvas[600:700:6, 100:300] = 0
+        cls.canvas = canvas
+        cls.expected = decode(canvas)
+
+    def test_propose(self):
+        res = propose(self.canvas)
+        self.assertEqual(2, len(res))
+        self.assertTrue(all(isinstance(p, Proposal) for p in res))
+        for decoded in self.expected:
+            rect = decoded.rect
+            self.assertTrue(any(
+                p.left <= rect.left and p.top <= rect.top and
+                rect.left + rect.width <= p.left + p.width and
+                rect.top + rect.height <= p.top + p.height
+                for p in res
+            ))
+
+    def test_propose_blank(self):
+        blank = np.full((200, 200), 255, dtype=np.uint8)
+        self.assertEqual([], propose(blank))
+
+    def test_decode(self):
+        self.assertEqual(
+            sorted(self.expected), sorted(proposals.decode(self.canvas))
+        )
+
+    def test_decode_fallback(self):
+        "Nothing is proposed if every cell must be dark"
+        self.assertEqual([], proposals.decode(self.canvas, min_dark=1.01))
+        self.assertEqual(
+            sorted(self.expected),
+            sorted(proposals.decode(self.canvas, min_dark=1.01, fallback=True))
+        )
+
+    def test_invalid_cell(self):
+        self.assertRaises(ValueError, propose, self.canvas, cell=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,7 @@
+import os
+import re
+import shutil
+import tempfile
 import unittest
 
 from pathlib import Path
@@ -22,10 +26,14 @@ try:
 except ImportError:
     imageio = None
 
+from pylibdmtx.capacity import fits, smallest_size, SCHEMES
 from pylibdmtx.pylibdmtx import (
-    decode, encode, Decoded, Encoded, Rect, EXTERNAL_DEPENDENCIES
+    decode, decode_pages, encode, encode_matrix, verify, Decoded, Encoded,
+    Rect,
+    ENCODING_SIZE_NAMES, EXTERNAL_DEPENDENCIES, _fast_scheme
 )
 from pylibdmtx.pylibdmtx_error import PyLibDMTXError
+from pylibdmtx.wrapper import DmtxScheme
 
 
 TESTDATA = Path(__file__).parent
@@ -66,6 +74,173 @@ class TestDecode(unittest.TestCase):
         res = decode(self.datamatrix, max_count=1)
         self.assertEqual(self.EXPECTED[:1], res)
 
+    def test_decode_accept(self):
+        "Skip barcodes that are not accepted and stop at the first that is"
+        for accept in (
+            b'^Ple', u'^Ple', re.compile(b'^Ple'), re.compile(u'^Pl'),
+            lambda data: data.startswith(b'Ple'),
+        ):
+            self.assertEqual(
+                self.EXPECTED[1:], decode(self.datamatrix, accept=accept)
+            )
+
+        self.assertEqual(
+            self.EXPECTED,
+            decode(self.datamatrix, accept=b'saurus', max_count=2)
+        )
+        self.assertEqual([], decode(self.datamatrix, accept=b'^01'))
+
+    def test_decode_accept_stops_scanning(self):
+        "No region is searched for after the first accepted barcode"
+        from pylibdmtx.wrapper import dmtxRegionFindNext
+        with patch(
+            'pylibdmtx.pylibdmtx.dmtxRegionFindNext', wraps=dmtxRegionFindNext
+        ) as find_next:
+            decode(self.datamatrix, accept=b'Stego')
+        self.assertEqual(1, find_next.call_count)
+
+    def test_decode_invalid_accept(self):
+        self.assertRaisesRegex(
+            PyLibDMTXError, 'Invalid accept', decode, self.datamatrix,
+            accept=1
+        )
+
+    def test_decode_roi(self):
+        "Search only the right half of `datamatrix.png`"
+        res = decode(self.datamatrix, roi=(200, 0, 200, 108))
+        self.assertEqual(self.EXPECTED[1:], res)
+
+        res = decode(self.datamatrix, roi=(200, 0, 200, 108), shrink=2)
+        self.assertEqual([b'Plesiosaurus'], [d.data for d in res])
+
+    def test_decode_rois(self):
+        "Search each of a list of regions"
+        rois = [(200, 0, 200, 108), (0, 0, 110, 108)]
+        res = decode(self.datamatrix, roi=rois)
+        self.assertEqual(self.EXPECTED[::-1], res)
+        self.assertEqual([], decode(self.datamatrix, roi=[]))
+
+    def test_decode_overlapping_rois(self):
+        "A barcode within more than one region is returned once"
+        rois = [(200, 0, 200, 108), (100, 0, 300, 108), (0, 0, 400, 108)]
+        res = decode(self.datamatrix, roi=rois)
+        self.assertEqual(self.EXPECTED[::-1], res)
+
+    def test_decode_invalid_roi(self):
+        self.assertRaisesRegex(
+            PyLibDMTXError, r'Invalid roi \[\(400, 0, 10, 10\)\]',
+            decode, self.datamatrix, roi=(400, 0, 10, 10)
+        )
+
+    def test_decode_max_regions(self):
+        "No region is searched for after the limit"
+        from pylibdmtx.wrapper import dmtxRegionFindNext
+        with patch(
+            'pylibdmtx.pylibdmtx.dmtxRegionFindNext', wraps=dmtxRegionFindNext
+        ) as find_next:
+            res = decode(self.datamatrix, max_regions=1)
+        self.assertEqual(1, find_next.call_count)
+        self.assertLessEqual(len(res), 1)
+
+        self.assertEqual(
+            self.EXPECTED, decode(self.datamatrix, max_failures=100)
+        )
+
+    def test_decode_max_scan(self):
+        "The same results for the same effort"
+        self.assertEqual(self.EXPECTED, decode(self.datamatrix, max_scan=1))
+        res = decode(self.datamatrix, max_scan=0.1)
+        self.assertEqual(res, decode(self.datamatrix, max_scan=0.1))
+        self.assertLessEqual(len(res), 2)
+
+    def test_decode_invalid_limits(self):
+        for kwargs in (
+            {'max_regions': 0}, {'max_failures': 0}, {'max_scan': 0},
+            {'max_scan': 1.5},
+        ):
+            self.assertRaises(ValueError, decode, self.datamatrix, **kwargs)
+
+    def test_scan_grid(self):
+        "Cross patterns visited and the end of a limited scan"
+        from pylibdmtx.pylibdmtx import _limit_scan, _scan_visited
+        from pylibdmtx.wrapper import DmtxScanGrid
+
+        # The first level of libdmtx's scan grid of a 640 x 480 image
+        grid = DmtxScanGrid(
+            minExtent=1, maxExtent=1023, total=1, extent=1023,
+            jumpSize=1024, pixelTotal=2045, startPos=511, xCenter=511,
+            yCenter=511
+        )
+        self.assertEqual(0, _scan_visited(grid))
+        self.assertEqual(17477, _limit_scan(grid, 0.05))
+        # Ends after the eighth level, of 128 x 128 cross patterns
+        self.assertEqual(7, grid.minExtent)
+
+        # The first cross pattern in the second row of the third level
+        grid.total, grid.extent, grid.jumpSize = 16, 255, 256
+        grid.startPos = grid.xCenter = 127
+        grid.yCenter = 127 + 256
+        self.assertEqual(1 + 4 + 4, _scan_visited(grid))
+
+    def test_decode_scratch(self):
+        "Conversions of numpy arrays into reused buffers"
+        from pylibdmtx.scratch import ScratchArena
+
+        scratch = ScratchArena()
+        pixels = np.asarray(self.datamatrix).astype(np.int32)
+        for _ in range(3):
+            self.assertEqual(self.EXPECTED, decode(pixels, scratch=scratch))
+        stats = scratch.stats()
+        self.assertEqual((3, 2), (stats.requests, stats.reuses))
+
+        # Pixels given as a writable buffer are not the arena's
+        pixels = bytearray(self.datamatrix.tobytes())
+        res = decode(
+            (pixels, self.datamatrix.width, self.datamatrix.height),
+            scratch=scratch
+        )
+        self.assertEqual(self.EXPECTED, res)
+        self.assertEqual(3, scratch.stats().requests)
+
+        # Unsupported pixels are refused before a buffer is taken
+        self.assertRaises(
+            PyLibDMTXError, decode, np.zeros((10, 10, 5), dtype=np.int32),
+            scratch=scratch
+        )
+        self.assertEqual(3, scratch.stats().requests)
+
+    def test_decode_pages(self):
+        "Every page of a multi-page TIFF, including a black-and-white page"
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'pages.tif')
+            self.datamatrix.convert('L').save(
+                path, save_all=True, append_images=[
+                    self.empty.convert('L'), self.datamatrix.convert('1')
+                ]
+            )
+            expected = [(0, d) for d in self.EXPECTED]
+            expected += [(2, d) for d in self.EXPECTED]
+            for workers in (1, 2):
+                self.assertEqual(
+                    expected, list(decode_pages(path, workers=workers))
+                )
+            # A unicode path on Python 2
+            self.assertEqual(expected, list(decode_pages(u'' + path)))
+            self.assertEqual(
+                [(0, self.EXPECTED[0]), (2, self.EXPECTED[0])],
+                list(decode_pages(path, max_count=1))
+            )
+        finally:
+            shutil.rmtree(directory)
+
+    def test_decode_pages_sequence(self):
+        images = [self.empty, self.datamatrix]
+        self.assertEqual(
+            [(1, d) for d in self.EXPECTED], list(decode_pages(images))
+        )
+        self.assertRaises(ValueError, next, decode_pages(images, workers=0))
+
     def test_decode_tuple(self):
         "Read barcodes in pixels"
         pixels = self.datamatrix.copy().convert('RGB').tobytes()
@@ -193,6 +368,157 @@ class TestEncode(unittest.TestCase):
 
         self._assert_encoded_data(data, encoded)
 
+    def test_encode_decode_nul_bytes(self):
+        "Binary data that contains NUL bytes is not truncated by decode"
+        data = b'\x00\x01binary\x00data\xff\x00'
+        encoded = encode(data, scheme='Base256')
+        image = (encoded.pixels, encoded.width, encoded.height)
+        self.assertEqual(data, decode(image)[0].data)
+
+    def test_encode_module_and_margin_size(self):
+        data = b'hello world'
+        encoded = encode(data, module_size=2, margin_size=4)
+
+        # 16x16 symbol
+        self.assertEqual(
+            Encoded(width=40, height=40, bpp=24, pixels=None),
+            encoded._replace(pixels=None)
+        )
+        self._assert_encoded_data(data, encoded)
+
+    def test_encode_8bpp(self):
+        data = b'hello world'
+        encoded = encode(data, bpp=8)
+
+        self.assertEqual(
+            Encoded(width=100, height=100, bpp=8, pixels=None),
+            encoded._replace(pixels=None)
+        )
+        self.assertEqual(100 * 100, len(encoded.pixels))
+        image = Image.frombytes('L', (100, 100), encoded.pixels)
+        self.assertEqual(data, decode(image)[0].data)
+
+    def test_encode_1bpp(self):
+        data = b'hello world'
+        encoded = encode(data, bpp=1, module_size=3)
+
+        # 16 modules x 3 pixels + 2 x 10 margin = 68 pixels, 9 bytes per row
+        self.assertEqual(
+            Encoded(width=68, height=68, bpp=1, pixels=None),
+            encoded._replace(pixels=None)
+        )
+        self.assertEqual(9 * 68, len(encoded.pixels))
+        image = Image.frombytes('1', (68, 68), encoded.pixels)
+        self.assertEqual(data, decode(image.convert('L'))[0].data)
+
+    def test_encode_output_memoryview(self):
+        data = b'hello world'
+        encoded = encode(data, output='memoryview')
+
+        self.assertIsInstance(encoded.pixels, memoryview)
+        self.assertFalse(encoded.pixels.readonly)
+        self.assertEqual(encode(data).pixels, encoded.pixels.tobytes())
+
+    def test_encode_output_numpy(self):
+        data = b'hello world'
+        rgb = encode(data, output='numpy')
+        grey = encode(data, bpp=8, output='numpy')
+        packed = encode(data, bpp=1, output='numpy')
+
+        self.assertEqual((100, 100, 3), rgb.pixels.shape)
+        self.assertEqual((100, 100), grey.pixels.shape)
+        self.assertEqual((100, 13), packed.pixels.shape)
+        self.assertTrue(np.array_equal(rgb.pixels[..., 0], grey.pixels))
+        self.assertEqual(data, decode(grey.pixels)[0].data)
+
+    def test_invalid_bpp(self):
+        self.assertRaisesRegex(
+            PyLibDMTXError,
+            (
+                r'Unsupported bits-per-pixel: \[16\] Should be one of '
+                r'\[1, 8, 24\]'
+            ),
+            encode, b' ', bpp=16
+        )
+
+    def test_invalid_output(self):
+        self.assertRaisesRegex(
+            PyLibDMTXError,
+            r"Invalid output \[list\]: should be one of \['bytes'",
+            encode, b' ', output='list'
+        )
+
+    def test_invalid_module_size(self):
+        self.assertRaisesRegex(
+            ValueError, r'Invalid module_size \[0\]',
+            encode, b' ', module_size=0
+        )
+
+    def test_encode_scheme_case_insensitive(self):
+        data = b'hello world'
+        self.assertEqual(
+            encode(data, scheme='Base256'), encode(data, scheme='base256')
+        )
+
+    def test_encode_auto_best(self):
+        data = b'0109501101530003172512311012345'
+        encoded = encode(data, scheme='AutoBest')
+        self._assert_encoded_data(data, encoded)
+
+        # No single scheme gives a smaller symbol
+        for scheme in ('Ascii', 'C40', 'Text', 'Base256'):
+            self.assertLessEqual(
+                encoded.width, encode(data, scheme=scheme).width
+            )
+
+    def test_encode_auto_fast(self):
+        for data in (
+            b'0123456789', b'HELLO WORLD', b'hello world',
+            bytes(bytearray(range(128, 160)))
+        ):
+            self._assert_encoded_data(data, encode(data, scheme='AutoFast'))
+
+    def test_fast_scheme(self):
+        self.assertEqual(
+            [
+                DmtxScheme.DmtxSchemeAscii, DmtxScheme.DmtxSchemeC40,
+                DmtxScheme.DmtxSchemeText, DmtxScheme.DmtxSchemeX12,
+                DmtxScheme.DmtxSchemeBase256,
+            ],
+            [
+                _fast_scheme(b'0123456789', None),
+                _fast_scheme(b'ABCDEFGHIJKLMNOP', None),
+                _fast_scheme(b'hello world example', None),
+                _fast_scheme(b'ABC*XYZ>QRS*TUV', None),
+                _fast_scheme(bytes(bytearray(range(128, 256))), None),
+            ]
+        )
+
+    def test_capacity_matches_encode(self):
+        "capacity.smallest_size is the symbol that encode picks"
+        for data, scheme in (
+            (b'hello world', 'Ascii'), (b'0123456789', 'Ascii'),
+            (b'hello world', 'Base256'), (b'x' * 300, 'Base256'),
+            (b'ABCDEFGHIJKL', 'C40'), (b'hello world!', 'Text'),
+        ):
+            matrix = encode_matrix(data, scheme=scheme)
+            self.assertEqual(
+                '{0}x{1}'.format(matrix.rows, matrix.cols),
+                smallest_size(data, scheme)
+            )
+
+    def test_capacity_fits_are_encodable(self):
+        "Every fit reported by capacity.fits can be encoded"
+        payloads = (
+            b'A', b'AB', b'ABCD', b'ABCDE', b'hello world', b'A.B,C', b'12345',
+            b'PART*0012345>REV*B', b'\xe9t\xe9', b'NHMUK 010123456',
+        )
+        for scheme in SCHEMES:
+            for data in payloads:
+                for size in ENCODING_SIZE_NAMES[3:]:
+                    if fits(data, scheme, size):
+                        encode_matrix(data, scheme=scheme, size=size)
+
     def test_invalid_scheme(self):
         self.assertRaisesRegex(
             PyLibDMTXError,
@@ -216,5 +542,42 @@ class TestEncode(unittest.TestCase):
         )
 
 
+class TestVerify(unittest.TestCase):
+    def setUp(self):
+        # assertRaisesRegexp was a deprecated alias removed in Python 3.11
+        if not hasattr(self, 'assertRaisesRegex'):
+            self.assertRaisesRegex = self.assertRaisesRegexp
+
+    def test_verify(self):
+        data = b'hello world'
+        for bpp, output in ((24, 'bytes'), (8, 'numpy'), (1, 'memoryview')):
+            encoded = encode(data, bpp=bpp, output=output)
+            self.assertTrue(verify(encoded, data))
+            self.assertFalse(verify(encoded, b'hello worle'))
+
+    def test_verify_sizes(self):
+        data = b'\x00binary\x00'
+        for size in ('RectAuto', '32x32'):
+            encoded = encode(
+                data, scheme='Base256', size=size, module_size=3,
+                margin_size=4
+            )
+            self.assertTrue(
+                verify(encoded, data, module_size=3, margin_size=4)
+            )
+
+    def test_verify_blank(self):
+        encoded = encode(b'hello world', bpp=8)
+        blank = encoded._replace(pixels=b'\xff' * len(encoded.pixels))
+        self.assertFalse(verify(blank, b'hello world'))
+
+    def test_verify_wrong_geometry(self):
+        self.assertRaisesRegex(
+            PyLibDMTXError,
+            r'Image of 100 x 100 is not of a symbol with module_size \[3\]',
+            verify, encode(b'hello world'), b'hello world', module_size=3
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
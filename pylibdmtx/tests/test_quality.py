@@ -0,0 +1,86 @@
+import unittest
+
+from pathlib import Path
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    # Python 2
+    from mock import patch
+
+import numpy as np
+
+from PIL import Image, ImageFilter
+
+from pylibdmtx import quality
+from pylibdmtx.quality import estimate, screen, Quality
+from pylibdmtx.pylibdmtx import decode
+
+
+TESTDATA = Path(__file__).parent
+
+
+class TestQuality(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.datamatrix = Image.open(str(TESTDATA.joinpath('datamatrix.png')))
+        cls.grey = np.asarray(cls.datamatrix.convert('L'))
+
+    def test_estimate(self):
+        res = estimate(self.datamatrix)
+        self.assertIsInstance(res, Quality)
+        self.assertEqual(res, estimate(self.grey))
+        self.assertEqual(1.0, res.contrast)
+        self.assertGreater(res.saturation, 0.5)
+
+    def test_alpha(self):
+        "The alpha of grey images is not taken as grey"
+        self.assertEqual(
+            estimate(self.grey), estimate(self.datamatrix.convert('LA'))
+        )
+
+    def test_blur(self):
+        "Sharpness falls as the blur widens"
+        sharpness = [
+            estimate(self.datamatrix.filter(ImageFilter.BoxBlur(radius)))[0]
+            for radius in (0, 1, 2, 4)
+        ]
+        self.assertEqual(sorted(sharpness, reverse=True), sharpness)
+        self.assertLess(sharpness[-1], 0.15)
+
+    def test_motion_blur(self):
+        "Blur along the rows alone"
+        kernel = np.ones(9) / 9.0
+        blurred = np.array([
+            np.convolve(row, kernel, mode='same') for row in self.grey
+        ]).astype(np.uint8)
+        self.assertLess(
+            estimate(blurred).sharpness, estimate(self.grey).sharpness / 2
+        )
+
+    def test_overexposed(self):
+        overexposed = np.clip(self.grey * 0.1 + 235, 0, 255).astype(np.uint8)
+        passes, res = screen(overexposed)
+        self.assertFalse(passes)
+        self.assertLess(res.contrast, 0.2)
+
+    def test_blank(self):
+        blank = np.full((100, 100), 255, dtype=np.uint8)
+        self.assertEqual(Quality(0.0, 0.0, 1.0), estimate(blank))
+
+    def test_decode(self):
+        self.assertEqual(decode(self.grey), quality.decode(self.grey))
+
+        blurred = np.asarray(
+            self.datamatrix.convert('L').filter(ImageFilter.BoxBlur(4))
+        )
+        with patch('pylibdmtx.pylibdmtx.decode') as mock_decode:
+            self.assertEqual([], quality.decode(blurred))
+        self.assertEqual(0, mock_decode.call_count)
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, estimate, self.grey, size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
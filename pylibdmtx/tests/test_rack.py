@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+
+from pylibdmtx.pylibdmtx import encode
+from pylibdmtx.rack import ATTEMPTS, decode_rack, well_names
+
+
+class TestRack(unittest.TestCase):
+    PITCH = 100
+
+    @classmethod
+    def setUpClass(cls):
+        "A 24-well rack with an empty well D6, offset by (30, 20)"
+        cls.names = well_names(4, 6)
+        cls.image = np.full((4 * cls.PITCH + 40, 6 * cls.PITCH + 60), 255,
+                            dtype=np.uint8)
+        for row, names in enumerate(cls.names):
+            for column, name in enumerate(names):
+                if 'D6' != name:
+                    encoded = encode(
+                        'TUBE-{0}'.format(name).encode('ascii'),
+                        module_size=4, margin_size=8, bpp=8
+                    )
+                    symbol = np.frombuffer(
+                        encoded.pixels, dtype=np.uint8
+                    ).reshape(encoded.height, encoded.width)
+                    top = 20 + row * cls.PITCH + 5
+                    left = 30 + column * cls.PITCH + 5
+                    cls.image[top:top + encoded.height,
+                              left:left + encoded.width] = symbol
+
+    def test_well_names(self):
+        self.assertEqual([['A1', 'A2'], ['B1', 'B2']], well_names(2, 2))
+        self.assertEqual([['A2', 'A1'], ['B2', 'B1']],
+                         well_names(2, 2, mirror=True))
+
+    def test_decode_rack(self):
+        res = decode_rack(self.image, wells=24, bounds=(30, 20, 600, 400))
+        self.assertEqual(sum(self.names, []), list(res.keys()))
+        self.assertIsNone(res['D6'])
+        for name, decoded in res.items():
+            if 'D6' != name:
+                self.assertEqual(
+                    'TUBE-{0}'.format(name).encode('ascii'), decoded.data
+                )
+
+        # Rects are in the coordinates of the whole image
+        rect = res['A1'].rect
+        self.assertTrue(30 <= rect.left < 30 + self.PITCH)
+
+    def test_decode_rack_mirror(self):
+        res = decode_rack(
+            self.image, wells=(4, 6), bounds=(30, 20, 600, 400), mirror=True,
+            size='ShapeAuto', workers=2
+        )
+        self.assertEqual(b'TUBE-A1', res['A6'].data)
+        self.assertIsNone(res['D1'])
+
+    def test_single_attempt(self):
+        "Clean wells are read by the first, quickest attempt"
+        res = decode_rack(
+            self.image, wells=24, bounds=(30, 20, 600, 400),
+            attempts=ATTEMPTS[:1]
+        )
+        self.assertEqual(23, sum(1 for d in res.values() if d is not None))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, decode_rack, self.image, wells=25)
+        self.assertRaises(ValueError, decode_rack, self.image, workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
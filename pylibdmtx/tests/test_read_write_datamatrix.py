@@ -1,4 +1,7 @@
+import io
+import json
 import os
+import shutil
 import sys
 import tempfile
 import unittest
@@ -6,6 +9,12 @@ import unittest
 from pathlib import Path
 from contextlib import contextmanager
 
+try:
+    from unittest.mock import patch
+except ImportError:
+    # Python 2
+    from mock import patch
+
 # TODO Would io.StringIO not work in all cases?
 try:
     from cStringIO import StringIO
@@ -53,6 +62,167 @@ class TestReadWriteDatamatrix(unittest.TestCase):
         finally:
             os.unlink(tmpfile.name)
 
+    def test_read_datamatrix_pages(self):
+        "Barcodes in every page, with the index of their page"
+        from PIL import Image
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'pages.tif')
+            image = Image.open(
+                str(Path(__file__).parent.joinpath('datamatrix.png'))
+            ).convert('L')
+            blank = Image.new('L', image.size, 255)
+            image.save(path, save_all=True, append_images=[blank, image])
+            with capture_stdout() as stdout:
+                main_read(['--json', '--pages', '--max-count', '1', path])
+        finally:
+            shutil.rmtree(directory)
+
+        result = json.loads(stdout.getvalue())
+        self.assertEqual(
+            [('Stegosaurus', 0), ('Stegosaurus', 2)],
+            [(b['data'], b['page']) for b in result['barcodes']]
+        )
+
+    def test_read_datamatrix_json(self):
+        "JSON lines with rects and timings"
+        path = str(Path(__file__).parent.joinpath('datamatrix.png'))
+        with capture_stdout() as stdout:
+            main_read(['--json', '--max-count', '1', path])
+
+        result = json.loads(stdout.getvalue())
+        self.assertEqual(path, result['path'])
+        self.assertEqual(
+            [{
+                'data': 'Stegosaurus', 'base64': 'U3RlZ29zYXVydXM=',
+                'rect': {'left': 5, 'top': 6, 'width': 96, 'height': 95},
+            }],
+            result['barcodes']
+        )
+        self.assertGreaterEqual(result['seconds'], result['decode_seconds'])
+
+    def test_read_datamatrix_accept(self):
+        path = str(Path(__file__).parent.joinpath('datamatrix.png'))
+        with capture_stdout() as stdout:
+            main_read(['--accept', '^Ple', path])
+        self.assertEqual("b'Plesiosaurus'", stdout.getvalue().strip())
+
+    def test_read_datamatrix_error(self):
+        "Files that can not be read are reported and do not stop reading"
+        path = str(Path(__file__).parent.joinpath('datamatrix.png'))
+        with capture_stdout() as stdout:
+            status = main_read(['--json', 'missing.png', path])
+
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(1, status)
+        self.assertEqual(['missing.png', path], [r['path'] for r in results])
+        self.assertIn('error', results[0])
+        self.assertEqual(2, len(results[1]['barcodes']))
+
+    def test_read_datamatrix_directory_stdin_jobs(self):
+        "Directories, file lists on stdin and worker processes"
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        os.mkdir(os.path.join(directory, 'sub'))
+        src = str(Path(__file__).parent.joinpath('datamatrix.png'))
+        paths = [
+            os.path.join(directory, 'a.png'),
+            os.path.join(directory, 'sub', 'b.png'),
+        ]
+        for path in paths:
+            shutil.copy(src, path)
+        with open(os.path.join(directory, 'notes.txt'), 'w') as f:
+            f.write('not an image')
+
+        with capture_stdout() as stdout:
+            main_read(['--json', directory])
+        self.assertEqual(1, len(stdout.getvalue().splitlines()))
+
+        with capture_stdout() as stdout:
+            main_read(['--json', '-r', '-j', '2', directory])
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(sorted(paths), sorted(r['path'] for r in results))
+
+        with capture_stdout() as stdout:
+            main_read(['--json', '-'], stdin=StringIO('\n'.join(paths)))
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(paths, [r['path'] for r in results])
+
+    def test_write_datamatrix_bulk(self):
+        "Bulk writing from CSV on stdin"
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        rows = [
+            (os.path.join(directory, 'a.png'), 'Stegosaurus'),
+            (os.path.join(directory, 'b.png'), 'Plesiosaurus, Ichthyosaurus'),
+            (os.path.join(directory, 'missing', 'c.png'), 'Not written'),
+        ]
+        stdin = StringIO('\n'.join(
+            '{0},"{1}"'.format(filename, data) for filename, data in rows
+        ))
+
+        stderr = StringIO()
+        with patch('sys.stderr', stderr):
+            status = main_write(
+                ['--bulk', '-', '-j', '2', '--size', '44x44'], stdin=stdin
+            )
+
+        self.assertEqual(1, status)
+        self.assertIn('Wrote 2 images', stderr.getvalue())
+        self.assertIn('c.png', stderr.getvalue())
+        for filename, data in rows[:2]:
+            with capture_stdout() as stdout:
+                main_read([filename])
+            self.assertEqual(
+                repr(data.encode('utf-8')), stdout.getvalue().strip()
+            )
+
+    def test_write_datamatrix_bulk_non_ascii(self):
+        "Bulk writing of UTF-8 data from a CSV file"
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'a.png')
+        data = u'Esp\xe9cimen \u2013 M\xe1laga'
+        manifest = os.path.join(directory, 'rows.csv')
+        with io.open(manifest, 'w', encoding='utf-8') as f:
+            f.write(u'{0},{1}\n'.format(filename, data))
+
+        with patch('sys.stderr', StringIO()):
+            self.assertEqual(0, main_write(['--bulk', manifest]))
+        with capture_stdout() as stdout:
+            main_read([filename])
+        self.assertEqual(
+            repr(data.encode('utf-8')), stdout.getvalue().strip()
+        )
+
+    def test_write_datamatrix_bulk_malformed(self):
+        "Malformed rows are reported and the others written"
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'a.png')
+        stdin = StringIO('{0}\n{1},Stegosaurus\n'.format(
+            os.path.join(directory, 'b.png'), filename
+        ))
+
+        stderr = StringIO()
+        with patch('sys.stderr', stderr):
+            status = main_write(['--bulk', '-'], stdin=stdin)
+
+        self.assertEqual(1, status)
+        self.assertIn('Line 1:', stderr.getvalue())
+        self.assertIn('Wrote 1 images', stderr.getvalue())
+        self.assertIn('1 failed', stderr.getvalue())
+        self.assertTrue(os.path.isfile(filename))
+
+    def test_write_datamatrix_bulk_arguments(self):
+        "--bulk is exclusive of file and data"
+        with patch('sys.stderr', StringIO()):
+            self.assertRaises(
+                SystemExit, main_write, ['--bulk', '-', 'x.png', 'data']
+            )
+            self.assertRaises(SystemExit, main_write, ['x.png'])
+
 
 if __name__ == '__main__':
     unittest.main()
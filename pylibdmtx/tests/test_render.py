@@ -0,0 +1,82 @@
+import unittest
+
+from PIL import Image
+
+from pylibdmtx.pylibdmtx import decode, encode, encode_matrix, Matrix
+from pylibdmtx.pylibdmtx_error import PyLibDMTXError
+from pylibdmtx.render import pdf_path, raster, svg, svg_path
+
+
+# Rows '101' and '010'
+MATRIX = Matrix(rows=2, cols=3, bits=b'\xa0\x40')
+
+
+class TestEncodeMatrix(unittest.TestCase):
+    def test_encode_matrix(self):
+        matrix = encode_matrix(b'hello world')
+        self.assertEqual((16, 16), (matrix.rows, matrix.cols))
+        self.assertEqual(16 * 2, len(matrix.bits))
+
+        # Solid left edge of the finder pattern is dark in every row
+        self.assertTrue(all(b & 0x80 for b in matrix.bits[::2]))
+
+    def test_encode_matrix_rect(self):
+        matrix = encode_matrix(b'hello', size='8x18')
+        self.assertEqual((8, 18), (matrix.rows, matrix.cols))
+        self.assertEqual(8 * 3, len(matrix.bits))
+
+
+class TestRender(unittest.TestCase):
+    def test_raster_matches_encode(self):
+        data = b'hello world'
+        matrix = encode_matrix(data)
+        for bpp in (24, 8, 1):
+            self.assertEqual(encode(data, bpp=bpp), raster(matrix, bpp=bpp))
+
+    def test_raster_scaled(self):
+        data = b'hello world'
+        encoded = raster(encode_matrix(data), module_size=3, margin_size=6)
+        self.assertEqual((60, 60, 24), encoded[:3])
+        image = Image.frombytes('RGB', (60, 60), encoded.pixels)
+        self.assertEqual(data, decode(image)[0].data)
+
+    def test_raster_small(self):
+        encoded = raster(MATRIX, module_size=1, margin_size=1, bpp=8)
+        self.assertEqual(
+            b'\xff' * 5 + b'\xff\x00\xff\x00\xff' + b'\xff\xff\x00\xff\xff' +
+            b'\xff' * 5,
+            encoded.pixels
+        )
+
+    def test_raster_invalid_bpp(self):
+        self.assertRaises(PyLibDMTXError, raster, MATRIX, bpp=32)
+
+    def test_svg_path(self):
+        self.assertEqual(
+            'M2 2h1v1h-1zM4 2h1v1h-1zM3 3h1v1h-1z', svg_path(MATRIX)
+        )
+
+    def test_svg_path_runs(self):
+        matrix = Matrix(rows=1, cols=9, bits=b'\xe0\x80')
+        self.assertEqual(
+            'M0 0h3v1h-3zM8 0h1v1h-1z', svg_path(matrix, margin_size=0)
+        )
+
+    def test_svg(self):
+        document = svg(MATRIX, module_size=0.5, light=None)
+        self.assertTrue(document.startswith(
+            '<svg xmlns="http://www.w3.org/2000/svg" width="5.5" '
+            'height="5" viewBox="0 0 5.5 5"'
+        ))
+        self.assertNotIn('<rect', document)
+        self.assertIn(svg_path(MATRIX, 0.5), document)
+
+    def test_pdf_path(self):
+        self.assertEqual(
+            '1 1.5 0.5 0.5 re\n2 1.5 0.5 0.5 re\n1.5 1 0.5 0.5 re\nf',
+            pdf_path(MATRIX, module_size=0.5, margin_size=1)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import gc
+import threading
+import unittest
+
+from pylibdmtx.scratch import ScratchArena, ScratchStats
+
+
+class TestScratchArena(unittest.TestCase):
+    def test_acquire(self):
+        scratch = ScratchArena(min_bucket=16)
+        buffer = scratch.acquire(20)
+        self.assertIsInstance(buffer, bytearray)
+        # Rounded up to a power of two
+        self.assertEqual(32, len(buffer))
+
+    def test_reuse(self):
+        scratch = ScratchArena(min_bucket=16)
+        buffer = scratch.acquire(20)
+        scratch.release(buffer)
+        self.assertIs(buffer, scratch.acquire(30))
+        self.assertIsNot(buffer, scratch.acquire(20))
+        self.assertEqual(
+            ScratchStats(
+                requests=3, reuses=1, allocations=2, discards=0, buffers=0,
+                bytes=0, reuse_rate=1 / 3.0
+            ),
+            scratch.stats()
+        )
+
+    def test_max_bytes(self):
+        "Buffers beyond the limit are discarded"
+        scratch = ScratchArena(max_bytes=64, min_bucket=16)
+        buffers = [scratch.acquire(n) for n in (20, 20, 40)]
+        for buffer in buffers:
+            scratch.release(buffer)
+        stats = scratch.stats()
+        self.assertEqual(
+            (1, 2, 64), (stats.discards, stats.buffers, stats.bytes)
+        )
+
+    def test_per_thread(self):
+        "A buffer released by one thread is not reused by another"
+        scratch = ScratchArena(min_bucket=16)
+        scratch.release(scratch.acquire(16))
+        acquired = []
+        thread = threading.Thread(
+            target=lambda: acquired.append(scratch.acquire(16))
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(0, scratch.stats().reuses)
+        scratch.acquire(16)
+        self.assertEqual(1, scratch.stats().reuses)
+
+    def test_thread_exit(self):
+        "The buffers of a thread that has exited are not counted"
+        scratch = ScratchArena(max_bytes=16, min_bucket=16)
+        thread = threading.Thread(
+            target=lambda: scratch.release(scratch.acquire(16))
+        )
+        thread.start()
+        thread.join()
+        del thread
+        gc.collect()
+        self.assertEqual((0, 0), scratch.stats()[4:6])
+        scratch.release(scratch.acquire(16))
+        self.assertEqual(0, scratch.stats().discards)
+
+    def test_clear(self):
+        scratch = ScratchArena()
+        scratch.release(scratch.acquire(10))
+        scratch.clear()
+        self.assertEqual(ScratchStats(0, 0, 0, 0, 0, 0, 0.0), scratch.stats())
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, ScratchArena, max_bytes=-1)
+        self.assertRaises(ValueError, ScratchArena, min_bucket=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
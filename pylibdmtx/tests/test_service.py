@@ -0,0 +1,140 @@
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import unittest
+
+from pathlib import Path
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    # Python 2
+    from mock import patch
+
+from PIL import Image
+
+from pylibdmtx.pylibdmtx import decode
+from pylibdmtx.pylibdmtx_error import PyLibDMTXError
+from pylibdmtx.service import DecodeClient, DecodeService
+
+
+TESTDATA = Path(__file__).parent
+
+
+class TestDecodeService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.datamatrix = Image.open(str(TESTDATA.joinpath('datamatrix.png')))
+
+    def _service(self, address, workers=2):
+        service = DecodeService(address, workers=workers)
+        service.start()
+        self.addCleanup(service.stop)
+        client = DecodeClient(service.address)
+        self.addCleanup(client.close)
+        return service, client
+
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        service, client = self._service(os.path.join(directory, 'sock'))
+
+        self.assertEqual(
+            decode(self.datamatrix), client.decode(self.datamatrix)
+        )
+        self.assertEqual(
+            decode(self.datamatrix, max_count=1, return_vertices=True),
+            client.decode(
+                self.datamatrix, max_count=1, return_vertices=True,
+                priority='bulk'
+            )
+        )
+
+    def test_tcp_concurrent(self):
+        service, client = self._service(('127.0.0.1', 0))
+        expected = decode(self.datamatrix, accept='^Ple')
+        results = []
+
+        def read(priority):
+            with DecodeClient(service.address) as c:
+                for _ in range(5):
+                    results.append(
+                        c.decode(self.datamatrix, accept='^Ple',
+                                 priority=priority)
+                    )
+
+        threads = [
+            threading.Thread(target=read, args=(priority,))
+            for priority in ('interactive', 'bulk', 'bulk', 'bulk')
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([expected] * 20, results)
+        metrics = client.metrics()
+        self.assertEqual(20, metrics['requests'])
+        self.assertEqual({'interactive': 0, 'bulk': 0}, metrics['queue_depth'])
+        self.assertGreaterEqual(metrics['latency_p99_ms'], 0)
+
+    def test_errors(self):
+        service, client = self._service(('127.0.0.1', 0))
+        self.assertRaises(
+            ValueError, client.decode, self.datamatrix, max_count=0
+        )
+        self.assertRaises(
+            ValueError, client.decode, self.datamatrix, priority='urgent'
+        )
+        self.assertRaises(
+            PyLibDMTXError, client.decode, self.datamatrix, accept=len
+        )
+        self.assertRaises(
+            ValueError, client._request, {
+                'op': 'decode', 'width': 1, 'height': 1,
+                'kwargs': {'arena': None},
+            },
+            b'\xff'
+        )
+        # The connection is still usable
+        self.assertEqual(2, len(client.decode(self.datamatrix)))
+
+    def test_worker_exit(self):
+        service, client = self._service(('127.0.0.1', 0), workers=1)
+        service._workers[0].kill()
+        self.assertRaises(PyLibDMTXError, client.decode, self.datamatrix)
+        # Exited workers are replaced
+        self.assertEqual(2, len(client.decode(self.datamatrix)))
+
+    @unittest.skipUnless(hasattr(signal, 'SIGSTOP'), 'No SIGSTOP')
+    def test_stuck_worker(self):
+        service, client = self._service(('127.0.0.1', 0), workers=1)
+        stuck = service._workers[0].process
+        os.kill(stuck.pid, signal.SIGSTOP)
+        with patch('pylibdmtx.service._GRACE', 0.1):
+            self.assertRaises(
+                PyLibDMTXError, client.decode, self.datamatrix, timeout=1
+            )
+        # Stuck workers are killed and replaced
+        self.assertFalse(stuck.is_alive())
+        self.assertEqual(2, len(client.decode(self.datamatrix)))
+
+    def test_not_a_socket(self):
+        "A file in the place of the socket is not removed"
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'sock')
+        with open(path, 'w') as f:
+            f.write('Stegosaurus')
+
+        self.assertRaises(PyLibDMTXError, DecodeService(path).start)
+        self.assertTrue(os.path.isfile(path))
+
+    def test_localhost_only(self):
+        self.assertRaises(ValueError, DecodeService, ('0.0.0.0', 8000))
+
+
+if __name__ == '__main__':
+    unittest.main()
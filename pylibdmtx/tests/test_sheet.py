@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from pylibdmtx.pylibdmtx import decode, encode
+from pylibdmtx.pylibdmtx_error import PyLibDMTXError
+from pylibdmtx.sheet import page_size, sheet
+
+
+PAYLOADS = [b'Stegosaurus', b'Plesiosaurus', b'Ichthyosaurus', b'Iguanodon']
+
+
+class TestSheet(unittest.TestCase):
+    def test_sheet(self):
+        "Symbols are written at their offsets and can be read"
+        pixels = sheet(
+            PAYLOADS, columns=2, pitch=(120, 120), width=260, height=260,
+            module_size=5, origin=(20, 20)
+        )
+        self.assertIsInstance(pixels, bytearray)
+        self.assertEqual(260 * 260, len(pixels))
+        self.assertEqual(
+            sorted(PAYLOADS),
+            sorted(d.data for d in decode((bytes(pixels), 260, 260)))
+        )
+
+        # Top-left symbol is the image from encode without its margin
+        encoded = encode(PAYLOADS[0], margin_size=0, bpp=8)
+        array = np.frombuffer(bytes(pixels), dtype=np.uint8).reshape(260, 260)
+        symbol = array[20:20 + encoded.height, 20:20 + encoded.width]
+        self.assertEqual(encoded.pixels, symbol.tobytes())
+
+    def test_numpy_out(self):
+        "Writes into an existing array, leaving other pixels"
+        out = np.full((200, 300), 128, dtype=np.uint8)
+        res = sheet(
+            PAYLOADS[:2], columns=2, pitch=(150, 150), width=300, height=200,
+            module_size=4, origin=(10, 10), out=out
+        )
+        self.assertIs(out, res)
+        self.assertEqual(128, out[0, 0])
+        self.assertEqual(0, out[10, 10])
+        self.assertEqual(2, len(decode(out)))
+
+    def test_too_large(self):
+        self.assertRaisesRegex(
+            PyLibDMTXError, 'larger than the pitch', sheet, PAYLOADS,
+            columns=2, pitch=(50, 50), width=200, height=200
+        )
+        # A symbol of 18 x 18 modules fills the pitch, without a quiet zone
+        self.assertRaisesRegex(
+            PyLibDMTXError, 'larger than the pitch', sheet, PAYLOADS,
+            columns=2, pitch=(90, 90), width=200, height=200
+        )
+        self.assertRaisesRegex(
+            PyLibDMTXError, 'not within the sheet', sheet, PAYLOADS,
+            columns=4, pitch=(100, 100), width=200, height=200
+        )
+        self.assertRaisesRegex(
+            PyLibDMTXError, 'Inconsistent dimensions', sheet, PAYLOADS,
+            columns=2, pitch=(100, 100), width=200, height=200,
+            out=bytearray(10)
+        )
+        self.assertRaisesRegex(
+            PyLibDMTXError, 'should be a buffer of bytes', sheet, PAYLOADS,
+            columns=2, pitch=(100, 100), width=200, height=200,
+            out=np.zeros((200, 200), dtype=np.uint16)
+        )
+
+    def test_unchanged_on_error(self):
+        "No pixels are written if any symbol can not be placed"
+        out = bytearray(200 * 200)
+        self.assertRaises(
+            PyLibDMTXError, sheet, PAYLOADS, columns=3, pitch=(100, 100),
+            width=200, height=200, out=out
+        )
+        self.assertEqual(bytearray(200 * 200), out)
+
+    def test_page_size(self):
+        self.assertEqual((4961, 7016), page_size('A4', 600))
+        self.assertEqual((2550, 3300), page_size('Letter', 300))
+        self.assertRaises(PyLibDMTXError, page_size, 'B5')
+
+
+if __name__ == '__main__':
+    unittest.main()
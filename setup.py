@@ -31,7 +31,10 @@ setup_data = {
     'description': pylibdmtx.__doc__,
     'long_description': readme(),
     'long_description_content_type': 'text/x-rst',
-    'packages': ['pylibdmtx', 'pylibdmtx.scripts', 'pylibdmtx.tests'],
+    'packages': [
+        'pylibdmtx', 'pylibdmtx.benchmarks', 'pylibdmtx.scripts',
+        'pylibdmtx.tests'
+    ],
     'test_suite': 'pylibdmtx.tests',
     'scripts': [
         'pylibdmtx/scripts/{0}.py'.format(script) for script in SCRIPTS